@@ -6,11 +6,48 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 from datetime import datetime, timedelta
+import os
+import sys
 import time
-import random
 import warnings
+from urllib.parse import urlencode
+from crypto_engine import (EXPORT_FORMATS, MARKET_CAP, MARKET_EQUAL, SCENARIOS, SPEEDS, STRATEGIES,
+                           TICK_FIELDS, Backtester, CorrelationEngine, DataPlane, HistoryQuery, IndexBuilder,
+                           MarketIndexEngine, MarketSimulator, PatternDetector, ReplayEngine,
+                           RiskScorer, SamplingProfiler, SegmentStore, SharedTickHistory, SparklineCache,
+                           StressTestEngine, TickBusPublisher, TickHistory, compact_figure, export_file,
+                           frame_batches, get_data_api, get_data_plane, get_figure_cache, get_portfolio_book,
+                           get_precompute_scheduler, get_snapshot_writer, get_tick_bus, get_tracer,
+                           hierarchical_clusters, indicators, moving_average_grid, payload_size, read_snapshot,
+                           rsi_grid, technical_figure, traced)
 warnings.filterwarnings('ignore')
 
+# Répertoire du stockage persistant (historique et ticks), conservé entre deux déploiements
+DATA_DIR = os.environ.get('CRYPTO_DASHBOARD_DATA',
+                          os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'))
+TICK_COLUMNS = ['timestamp', 'symbole', 'prix', 'change_pct', 'volume_journalier', 'market_cap']
+# Sources du rejeu : libellé -> table du stockage
+REPLAY_SOURCES = {'Ticks enregistrés': 'ticks', 'Clôtures journalières': 'bars'}
+# Export optionnel des mesures : journal JSON des spans et endpoint Prometheus local
+TRACE_LOG = os.environ.get('CRYPTO_DASHBOARD_TRACE_LOG')
+METRICS_PORT = os.environ.get('CRYPTO_DASHBOARD_METRICS_PORT')
+# Graine de simulation : mêmes données pour toutes les sessions et tous les lancements
+SEED = os.environ.get('CRYPTO_DASHBOARD_SEED')
+# Plan de données partagé : fichier projeté en mémoire écrit par le producteur (`python Dashboard.py --producer`)
+PLANE_PATH = os.environ.get('CRYPTO_DASHBOARD_PLANE')
+# Bus de ticks : socket Unix sur lequel le producteur diffuse les lots aux nœuds abonnés
+BUS_PATH = os.environ.get('CRYPTO_DASHBOARD_BUS')
+# API HTTP en lecture seule (instantané, historique, indicateurs) servie par le processus
+API_PORT = os.environ.get('CRYPTO_DASHBOARD_API_PORT')
+# Redémarrage à chaud : état et caches dérivés repris d'un instantané du stockage ('0' pour désactiver)
+WARM_START = os.environ.get('CRYPTO_DASHBOARD_WARM_START', '1') != '0'
+SNAPSHOT_FILE = 'etat.snapshot'
+# Au-delà, le bouton de téléchargement (fichier lu en entier en mémoire par Streamlit) cède la place à /export
+EXPORT_BUTTON_ROWS = 500000
+# Profondeur (jours) de l'historique gardé en mémoire ; le stockage garde tout et le sert à la demande
+# (mode colonnaire, rejeu, export, API). Un an au moins pour les fenêtres de corrélation et de stress
+HISTORY_DAYS = max(int(os.environ.get('CRYPTO_DASHBOARD_HISTORY_DAYS', 1095)), 366)
+
 # Configuration de la page
 st.set_page_config(
     page_title="Dashboard Top 40 Cryptomonnaies - Marché des Crypto-actifs",
@@ -98,11 +135,53 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 class CryptoDashboard:
-    def __init__(self):
+    def __init__(self, seed=None, plane=None, bus=None):
         self.cryptos = self.define_cryptos()
-        self.historical_data = self.initialize_historical_data()
-        self.current_data = self.initialize_current_data()
-        self.market_data = self.initialize_market_data()
+        self.debug = False  # Mesure aussi la taille sérialisée des figures (panneau de debug)
+        self.plane = plane  # Worker : historique et ticks lus dans le plan de données partagé
+        self._plane_ticks = 0
+        self.bus = bus  # Nœud abonné : ticks reçus du bus et appliqués à l'état local
+        self._bus_seq = 0
+        self.api = None  # API HTTP du processus : reçoit l'état courant après chaque avance
+        self.simulator = MarketSimulator(seed)
+        # Une simulation à graine a son propre stockage, pour ne pas reprendre d'autres données
+        self.store = SegmentStore(DATA_DIR if seed is None else os.path.join(DATA_DIR, f'seed-{seed}'))
+        self.query = HistoryQuery(self.store)
+        # Un worker du plan de données reprend déjà l'état du producteur : pas d'instantané
+        self.snapshot_writer = (get_snapshot_writer(os.path.join(self.store.root, SNAPSHOT_FILE))
+                                if WARM_START and plane is None else None)
+        snapshot = self.load_snapshot()
+        self.warm_start = snapshot is not None
+        self.history_version = 1  # Incrémentée à chaque modification de l'historique
+        self._cache = {}
+        self.historical_data = self.initialize_historical_data(snapshot)
+        self.correlation_engine = CorrelationEngine(windows=(30, 90, 365))
+        self.stress_engine = StressTestEngine()
+        self.risk_scorer = RiskScorer()
+        self.pattern_detector = PatternDetector()
+        self.index_builder = IndexBuilder(
+            self.cryptos.keys(),
+            [c['total_supply'] for c in self.cryptos.values()],
+            [c['categorie'] for c in self.cryptos.values()]
+        )
+        self.current_data = self.initialize_current_data(snapshot)
+        self.live_version = 0  # Incrémentée à chaque mise à jour des prix en temps réel
+        # Worker : les ticks sont lus dans le tampon partagé écrit par le producteur
+        self.tick_history = TickHistory(self.cryptos.keys()) if plane is None else SharedTickHistory(plane)
+        self.sparklines = SparklineCache()
+        if snapshot is not None:
+            self.tick_history.load(snapshot[1]['ticks_temps'], snapshot[1]['ticks_valeurs'])
+        # Reprise des ticks enregistrés depuis la dernière clôture
+        elif not self.tick_history.restore(self.store.read('ticks', start=self.historical_data['date'].max())):
+            self.tick_history.record(self.current_data['prix'].to_numpy(), self.current_data['volume_journalier'].to_numpy())
+        # Carnet commun aux sessions du processus, positions enregistrées dans le stockage
+        self.portfolios = get_portfolio_book(self.cryptos.keys(), self.store)
+        if snapshot is not None:
+            self.portfolios.load_pnl(snapshot[0]['utilisateurs'], snapshot[1]['pnl_temps'], snapshot[1]['pnl_valeurs'])
+        self.replay = ReplayEngine(self.store)  # Curseurs de rejeu de la session
+        self.market_data = self.initialize_market_data(snapshot)
+        if snapshot is not None:
+            self.catch_up_ticks(snapshot[0]['dernier_tick'])
         
     def define_cryptos(self):
         """Définit les 40 principales cryptomonnaies avec leurs caractéristiques"""
@@ -682,85 +761,165 @@ class CryptoDashboard:
             }
         }
     
-    def initialize_historical_data(self):
+    @traced()
+    def initialize_historical_data(self, snapshot=None):
         """Initialise les données historiques des cryptomonnaies"""
+        if self.plane is not None:
+            return self.plane_history()
+        if snapshot is not None:
+            return self.resume_history(*snapshot)
+        
+        # Reprise de la fenêtre récente de l'historique enregistré ; les jours manquants sont ajoutés ensuite
+        last_stored = self.store.last_time('bars')
+        if last_stored is not None:
+            return self.store.read('bars', start=min(self.history_start(), last_stored.normalize()))
+        
         dates = pd.date_range('2020-01-01', datetime.now(), freq='D')
+        start = self.history_start()
+        kept = []
+        
+        # Écriture mois par mois : seuls les mois de la fenêtre restent en mémoire
+        for _, month in pd.Series(dates).groupby(dates.to_period('M')):
+            data = []
+            for date in month:
+                data.extend(self.generate_daily_data(date))
+            month_data = pd.DataFrame(data)
+            self.store.append('bars', month_data)
+            if month.iloc[-1] >= start:
+                kept.append(month_data)
+        
+        return pd.concat(kept, ignore_index=True)
+    
+    def history_start(self):
+        """Première journée gardée en mémoire : début du mois situé HISTORY_DAYS jours avant aujourd'hui"""
+        # Alignée sur le mois, la fenêtre ne glisse qu'une fois par mois (moteurs incrémentaux reconstruits alors)
+        return (pd.Timestamp(datetime.now()) - pd.Timedelta(days=HISTORY_DAYS)).to_period('M').to_timestamp()
+    
+    def trim_history(self, frame):
+        """Retire de l'historique en mémoire les journées antérieures à la fenêtre (elles restent stockées)"""
+        start = self.history_start()
+        if frame.empty or frame['date'].iloc[0] >= start:
+            return frame
+        return frame[frame['date'] >= start].reset_index(drop=True)
+    
+    def generate_daily_data(self, date):
+        """Génère les données d'une journée pour toutes les cryptomonnaies"""
+        rng = self.simulator.stream('historique', date)
+        n = len(self.cryptos)
+        
+        # Prix de base
+        base_price = np.array([info['prix_base'] for info in self.cryptos.values()])
+        
+        # Impact des événements majeurs du marché crypto
+        market_impact = np.ones(n)
+        
+        # Bull run 2020-2021
+        if date.year == 2020 and date.month >= 10:
+            market_impact *= rng.uniform(1.02, 1.15, n)
+        elif date.year == 2021 and date.month <= 5:
+            market_impact *= rng.uniform(1.05, 1.25, n)
+        # Crash de mai 2021
+        elif date.year == 2021 and date.month == 5 and date.day >= 19:
+            market_impact *= rng.uniform(0.7, 0.9, n)
+        # Reprise mi-2021
+        elif date.year == 2021 and date.month >= 7 and date.month <= 10:
+            market_impact *= rng.uniform(1.05, 1.15, n)
+        # Crash de novembre 2021
+        elif date.year == 2021 and date.month >= 11:
+            market_impact *= rng.uniform(0.8, 0.95, n)
+        # Bear market 2022
+        elif date.year == 2022:
+            market_impact *= rng.uniform(0.85, 1.05, n)
+        # Reprise 2023
+        elif date.year == 2023:
+            if date.month >= 10:
+                market_impact *= rng.uniform(1.05, 1.2, n)
+            else:
+                market_impact *= rng.uniform(0.95, 1.1, n)
+        # Bull market 2024
+        elif date.year == 2024:
+            market_impact *= rng.uniform(1.02, 1.15, n)
+        
+        # Volatilité quotidienne basée sur le profil de volatilité
+        daily_volatility = rng.normal(1, [info['volatilite'] / 100 for info in self.cryptos.values()])
+        
+        # Tendance saisonnière (effet "Uptober", etc.)
+        seasonal = np.ones(n)
+        if date.month == 10:  # "Uptober"
+            seasonal *= rng.uniform(1.01, 1.05, n)
+        elif date.month == 12:  # Rallye de fin d'année
+            seasonal *= rng.uniform(1.01, 1.03, n)
+        elif date.month in [1, 2]:  # "Januarry"
+            seasonal *= rng.uniform(0.98, 1.02, n)
+        
+        # Effet Bitcoin halving (mai 2020, mai 2024)
+        if (date.year == 2020 and date.month == 5) or (date.year == 2024 and date.month == 5):
+            market_impact *= rng.uniform(1.1, 1.3, n)
+        
+        prix_actuel = base_price * market_impact * daily_volatility * seasonal
+        volume = rng.uniform(100000, 5000000, n)
+        
         data = []
+        for i, (symbole, info) in enumerate(self.cryptos.items()):
+            data.append({
+                'date': date,
+                'symbole': symbole,
+                'nom': info['nom'],
+                'categorie': info['categorie'],
+                'prix': prix_actuel[i],
+                'volume': volume[i],
+                'volatilite_jour': abs(daily_volatility[i] - 1) * 100
+            })
         
-        for date in dates:
-            for symbole, info in self.cryptos.items():
-                # Prix de base
-                base_price = info['prix_base']
-                
-                # Impact des événements majeurs du marché crypto
-                market_impact = 1.0
-                
-                # Bull run 2020-2021
-                if date.year == 2020 and date.month >= 10:
-                    market_impact *= random.uniform(1.02, 1.15)
-                elif date.year == 2021 and date.month <= 5:
-                    market_impact *= random.uniform(1.05, 1.25)
-                # Crash de mai 2021
-                elif date.year == 2021 and date.month == 5 and date.day >= 19:
-                    market_impact *= random.uniform(0.7, 0.9)
-                # Reprise mi-2021
-                elif date.year == 2021 and date.month >= 7 and date.month <= 10:
-                    market_impact *= random.uniform(1.05, 1.15)
-                # Crash de novembre 2021
-                elif date.year == 2021 and date.month >= 11:
-                    market_impact *= random.uniform(0.8, 0.95)
-                # Bear market 2022
-                elif date.year == 2022:
-                    market_impact *= random.uniform(0.85, 1.05)
-                # Reprise 2023
-                elif date.year == 2023:
-                    if date.month >= 10:
-                        market_impact *= random.uniform(1.05, 1.2)
-                    else:
-                        market_impact *= random.uniform(0.95, 1.1)
-                # Bull market 2024
-                elif date.year == 2024:
-                    market_impact *= random.uniform(1.02, 1.15)
-                
-                # Volatilité quotidienne basée sur le profil de volatilité
-                daily_volatility = random.normalvariate(1, info['volatilite']/100)
-                
-                # Tendance saisonnière (effet "Uptober", etc.)
-                seasonal = 1.0
-                if date.month == 10:  # "Uptober"
-                    seasonal *= random.uniform(1.01, 1.05)
-                elif date.month == 12:  # Rallye de fin d'année
-                    seasonal *= random.uniform(1.01, 1.03)
-                elif date.month in [1, 2]:  # "Januarry"
-                    seasonal *= random.uniform(0.98, 1.02)
-                
-                # Effet Bitcoin halving (mai 2020, mai 2024)
-                if (date.year == 2020 and date.month == 5) or (date.year == 2024 and date.month == 5):
-                    market_impact *= random.uniform(1.1, 1.3)
-                
-                prix_actuel = base_price * market_impact * daily_volatility * seasonal
-                
-                data.append({
-                    'date': date,
-                    'symbole': symbole,
-                    'nom': info['nom'],
-                    'categorie': info['categorie'],
-                    'prix': prix_actuel,
-                    'volume': random.uniform(100000, 5000000),
-                    'volatilite_jour': abs(daily_volatility - 1) * 100
-                })
+        return data
+    
+    def extend_historical_data(self):
+        """Ajoute à l'historique les journées écoulées depuis la dernière date connue"""
+        if self.plane is not None:
+            # Le producteur ajoute les journées ; le worker reprend la version publiée
+            if self.plane.n_days * len(self.plane.symbols) == len(self.historical_data):
+                return False
+            self.historical_data = self.plane_history()
+            self.history_version += 1
+            self.refresh_index_reference()
+            return True
+        
+        last_date = self.historical_data['date'].max()
+        new_dates = pd.date_range(last_date + timedelta(days=1), datetime.now(), freq='D')
+        if len(new_dates) == 0:
+            return False
+        
+        # Journées déjà enregistrées par une autre session ou un autre processus : reprises, pas régénérées
+        stored = self.store.read('bars', start=new_dates[0])
+        if not stored.empty:
+            new_dates = new_dates[new_dates > stored['date'].max()]
+        
+        data = []
+        for date in new_dates:
+            data.extend(self.generate_daily_data(date))
         
-        return pd.DataFrame(data)
+        new_data = pd.DataFrame(data)
+        self.store.append('bars', new_data)
+        self.historical_data = self.trim_history(pd.concat(
+            [f for f in (self.historical_data, stored, new_data) if not f.empty], ignore_index=True))
+        self.history_version += 1
+        self.refresh_index_reference()
+        return True
     
-    def initialize_current_data(self):
+    @traced()
+    def initialize_current_data(self, snapshot=None):
         """Initialise les données courantes"""
+        if snapshot is not None:
+            return snapshot[1]['courant'].to_pandas()
+        
         current_data = []
+        rng = self.simulator.stream('courant', self.historical_data['date'].max())
         for symbole, info in self.cryptos.items():
             # Dernières données historiques
             last_data = self.historical_data[self.historical_data['symbole'] == symbole].iloc[-1]
             
             # Variations simulées
-            change_pct = random.uniform(-5.0, 5.0)
+            change_pct = rng.uniform(-5.0, 5.0)
             
             current_data.append({
                 'symbole': symbole,
@@ -776,46 +935,428 @@ class CryptoDashboard:
                 'date_creation': info['date_creation'],
                 'total_supply': info['total_supply'],
                 'market_cap': last_data['prix'] * (info['total_supply'] if info['total_supply'] else 1000000000) / 1000000000,  # En milliards
-                'spread': random.uniform(0.01, 0.5)
+                'spread': rng.uniform(0.01, 0.5)
             })
         
-        return pd.DataFrame(current_data)
+        current_data = pd.DataFrame(current_data)
+        
+        # Reprise des derniers ticks enregistrés s'ils sont postérieurs à la dernière clôture
+        last_ticks = self.store.latest('ticks')
+        if not last_ticks.empty:
+            last_ticks = last_ticks[last_ticks['timestamp'] >= self.historical_data['date'].max()]
+            current_data = current_data.set_index('symbole')
+            current_data.update(last_ticks.set_index('symbole')[TICK_COLUMNS[2:]])
+            current_data = current_data.reset_index()
+        
+        return current_data
     
-    def initialize_market_data(self):
+    @traced()
+    def initialize_market_data(self, snapshot=None):
         """Initialise les données des marchés crypto"""
-        indices = {
-            'Crypto Fear & Greed Index': {'valeur': 65, 'change': 0, 'secteur': 'Sentiment'},
-            'Bitcoin Dominance': {'valeur': 48.5, 'change': 0, 'secteur': 'BTC'},
-            'Ethereum Dominance': {'valeur': 18.2, 'change': 0, 'secteur': 'ETH'},
-            'DeFi TVL': {'valeur': 85.3, 'change': 0, 'secteur': 'DeFi'},
-            'NFT Volume': {'valeur': 2.8, 'change': 0, 'secteur': 'NFT'},
-            'Stablecoin Supply': {'valeur': 125.5, 'change': 0, 'secteur': 'Stablecoins'}
-        }
+        self.index_engine = MarketIndexEngine(
+            self.current_data['symbole'], self.current_data['categorie'])
+        self.index_engine.reset(self.current_data['market_cap'],
+                                self.current_data['volume_journalier'],
+                                self.current_data['change_pct'])
+        self.refresh_index_reference()
+        if snapshot is not None:
+            self.index_engine.history.extend(snapshot[1]['indices_temps'], snapshot[1]['indices_valeurs'])
+        self.index_engine.record()
         
-        return {'indices': indices}
+        return {'indices': self.index_engine.snapshot()}
     
-    def update_live_data(self):
-        """Met à jour les données en temps réel"""
-        for idx in self.current_data.index:
-            symbole = self.current_data.loc[idx, 'symbole']
-            
-            # Mise à jour des prix
-            if random.random() < 0.7:  # 70% de chance de changement
-                variation = random.uniform(-2.0, 2.0)
-                
-                self.current_data.loc[idx, 'prix'] *= (1 + variation/100)
-                self.current_data.loc[idx, 'change_pct'] = variation
-                
-                # Mise à jour du volume
-                self.current_data.loc[idx, 'volume_journalier'] *= random.uniform(0.8, 1.2)
-                
-                # Mise à jour de la capitalisation boursière
-                if self.current_data.loc[idx, 'total_supply']:
-                    self.current_data.loc[idx, 'market_cap'] = (
-                        self.current_data.loc[idx, 'prix'] * 
-                        self.current_data.loc[idx, 'total_supply'] / 1000000000
-                    )
+    def refresh_index_reference(self):
+        """Recale la référence des indices sur la dernière clôture historique"""
+        symbols = self.index_engine.symbols
+        dernier_prix = self.get_history_matrix('prix').ffill().iloc[-1].reindex(symbols)
+        supply = [self.cryptos[s]['total_supply'] or 1000000000 for s in symbols]
+        self.index_engine.set_baseline(
+            dernier_prix.to_numpy() * supply / 1000000000,
+            [self.cryptos[s]['volume_journalier'] for s in symbols]
+        )
+        
+        # Sentiment : performance sur 30 jours et volatilité récente vs moyenne, pondérées par capitalisation
+        summary = self.get_summary_stats().reindex(symbols)
+        poids = dernier_prix.to_numpy() * supply
+        poids = poids / poids.sum()
+        self.index_engine.set_context(
+            momentum_30d=float(np.nansum(summary['performance_30j'].to_numpy() * poids)),
+            volatility_ratio=float(np.nansum((summary['volatilite_30j'] / summary['volatilite_moyenne']).to_numpy() * poids))
+        )
+    
+    @traced()
+    def update_live_data(self, timestamp=None):
+        """Met à jour les données en temps réel (tirages déterminés par la graine et l'horodatage du tick)"""
+        timestamp = pd.Timestamp.now() if timestamp is None else pd.Timestamp(timestamp)
+        rng = self.simulator.stream('ticks', timestamp)
+        n = len(self.current_data)
+        self.live_version += 1
+        
+        # Mise à jour des prix : 70% de chance de changement par cryptomonnaie
+        moved = rng.random(n) < 0.7
+        variation = rng.uniform(-2.0, 2.0, n)[moved]
+        volume_factor = rng.uniform(0.8, 1.2, n)[moved]
+        changed = self.current_data.index[moved]
+        
+        self.current_data.loc[changed, 'prix'] *= (1 + variation/100)
+        self.current_data.loc[changed, 'change_pct'] = variation
+        
+        # Mise à jour du volume
+        self.current_data.loc[changed, 'volume_journalier'] *= volume_factor
+        
+        # Historique intraday borné et persistance des ticks du lot
+        self.tick_history.record(self.current_data['prix'].to_numpy(), self.current_data['volume_journalier'].to_numpy(),
+                                 timestamp.value)
+        rows = self.apply_changes(changed)
+        ticks = rows.assign(timestamp=timestamp)[TICK_COLUMNS]
+        self.store.append('ticks', ticks)
+        return ticks
+    
+    @traced()
+    def apply_replay_batch(self, batch):
+        """Intègre un lot de ticks rejoués aux données courantes, sans les réenregistrer"""
+        self.live_version += 1
+        symbols = self.current_data['symbole']
+        batch = batch[batch['symbole'].isin(symbols)].drop_duplicates(['timestamp', 'symbole'], keep='last')
+        if batch.empty:
+            return
+        
+        # Un tick d'historique intraday par horodatage ; un symbole absent garde sa dernière valeur
+        wide = batch.set_index(['timestamp', 'symbole'])
+        prices, volumes = (
+            wide[colonne].unstack().reindex(columns=symbols).ffill()
+            .fillna(pd.Series(self.current_data[colonne].to_numpy(), index=symbols))
+            for colonne in ('prix', 'volume_journalier')
+        )
+        for t, price_row, volume_row in zip(prices.index.as_unit('ns').asi8, prices.to_numpy(), volumes.to_numpy()):
+            self.tick_history.record(price_row, volume_row, int(t))
+        
+        # Données courantes : dernière valeur de chaque symbole du lot
+        last = batch.drop_duplicates('symbole', keep='last').set_index('symbole')
+        changed = self.current_data.index[symbols.isin(last.index)]
+        values = last.reindex(self.current_data.loc[changed, 'symbole'])
+        self.current_data.loc[changed, 'prix'] = values['prix'].to_numpy()
+        self.current_data.loc[changed, 'change_pct'] = values['change_pct'].fillna(0).to_numpy()
+        self.current_data.loc[changed, 'volume_journalier'] = values['volume_journalier'].fillna(
+            self.current_data.loc[changed, 'volume_journalier']).to_numpy()
+        self.apply_changes(changed)
+    
+    def apply_changes(self, changed):
+        """Recalcule capitalisation et indices pour les lignes modifiées ; retourne ces lignes"""
+        # Mise à jour de la capitalisation boursière (même convention qu'à l'initialisation)
+        total_supply = self.current_data.loc[changed, 'total_supply']
+        self.current_data.loc[changed, 'market_cap'] = (
+            self.current_data.loc[changed, 'prix'] *
+            total_supply.where(total_supply.notna() & (total_supply != 0), 1000000000) / 1000000000
+        )
+        rows = self.current_data.loc[changed]
+        
+        # Indices de marché : seules les lignes modifiées sont réintégrées
+        self.index_engine.apply_tick(
+            self.current_data.index.get_indexer(changed),
+            rows['market_cap'], rows['volume_journalier'], rows['change_pct']
+        )
+        self.market_data['indices'] = self.index_engine.snapshot()
+        return rows
     
+    def plane_history(self):
+        """Historique publié dans le plan de données (colonnes numériques sans copie)"""
+        return self.plane.history_frame({s: c['nom'] for s, c in self.cryptos.items()},
+                                        {s: c['categorie'] for s, c in self.cryptos.items()})
+    
+    def publish(self, plane):
+        """Producteur : publie les nouvelles journées et le dernier tick dans le plan de données"""
+        plane.append_bars(self.historical_data)
+        plane.record_tick(self.tick_history.last(1)[0][-1],
+                          self.current_data.set_index('symbole').reindex(plane.symbols)[list(TICK_FIELDS)].to_numpy())
+    
+    @traced()
+    def load_snapshot(self):
+        """Instantané de l'état projeté en mémoire, s'il existe et porte sur les mêmes cryptomonnaies"""
+        if self.snapshot_writer is None:
+            return None
+        snapshot = read_snapshot(self.snapshot_writer.path)
+        if snapshot is None or snapshot[0]['symboles'] != list(self.cryptos):
+            return None
+        return snapshot
+    
+    def resume_history(self, meta, sections):
+        """Historique de l'instantané, complété des journées enregistrées depuis ; caches dérivés repris s'il est à jour"""
+        history = sections['historique'].to_pandas()
+        newer = self.store.read('bars', start=history['date'].max() + timedelta(days=1))
+        if not newer.empty or history['date'].iloc[0] < self.history_start():
+            # Journées ajoutées par un autre processus, ou fenêtre glissée : les caches dérivés sont périmés
+            return self.trim_history(pd.concat([f for f in (history, newer) if not f.empty], ignore_index=True))
+        
+        watermark = tuple(meta['filigrane'])
+        self._cache.update({
+            (('matrix', 'prix'), self.history_version): sections['matrice_prix'].to_pandas(),
+            (('matrix', 'volatilite_jour'), self.history_version): sections['matrice_volatilite'].to_pandas(),
+            ('summary_stats', self.history_version): sections['statistiques'].to_pandas(),
+            ('watermark', self.history_version): watermark,
+        })
+        figures = sections['figures']
+        get_figure_cache().restore(watermark, zip(*(figures[c].to_pylist() for c in figures.column_names)))
+        return history
+    
+    def catch_up_ticks(self, since):
+        """Applique les ticks enregistrés après l'instantané (fin du processus précédent, autres processus)"""
+        since = pd.Timestamp(since)
+        ticks = self.store.read('ticks', start=since)
+        ticks = ticks[ticks['timestamp'] > since]
+        if ticks.empty:
+            return 0
+        # Au-delà de la capacité de l'historique intraday, seul le dernier tick de chaque symbole compte
+        kept = np.sort(ticks['timestamp'].unique())[-self.tick_history.capacity:]
+        recent = ticks['timestamp'] >= kept[0]
+        self.apply_replay_batch(pd.concat([ticks[~recent].drop_duplicates('symbole', keep='last'), ticks[recent]]))
+        return len(ticks)
+    
+    def snapshot_state(self):
+        """Sections et métadonnées de l'instantané : état courant, historiques intraday et caches dérivés.
+
+        Non capturés et reconstruits à la demande depuis les matrices reprises : moteur de
+        corrélation, indices de référence, figures chartistes et scores de risque. Leurs
+        états incrémentaux sont internes aux moteurs et se recalculent en quelques dizaines
+        de millisecondes, à l'ouverture de leur onglet. Les positions des portefeuilles
+        sont relues dans le stockage ; seul leur P&L intraday est capturé ici.
+        """
+        watermark = self.data_watermark()
+        times, prices, volumes = self.tick_history.last()
+        index_times, index_values = self.index_engine.history.last()
+        users, pnl_times, pnl_values = self.portfolios.pnl_state()
+        sections = {
+            'historique': self.historical_data,
+            'courant': self.current_data.copy(),
+            'ticks_temps': times.copy(),
+            'ticks_valeurs': np.stack([prices, volumes], axis=-1),
+            'indices_temps': index_times.copy(),
+            'indices_valeurs': index_values.copy(),
+            'pnl_temps': pnl_times,
+            'pnl_valeurs': pnl_values,
+            'matrice_prix': self.get_history_matrix('prix'),
+            'matrice_volatilite': self.get_history_matrix('volatilite_jour'),
+            'statistiques': self.get_summary_stats(),
+            'figures': pd.DataFrame(get_figure_cache().export(watermark), columns=['graphique', 'empreinte', 'json']),
+        }
+        meta = {
+            'symboles': list(self.cryptos),
+            'utilisateurs': users,
+            'filigrane': list(watermark),
+            'dernier_tick': int(times[-1]) if len(times) else 0,
+            'ecrit_le': datetime.now().isoformat(),
+        }
+        return sections, meta
+    
+    def advance_live_data(self):
+        """Avance les données courantes : ticks du bus ou du producteur, ticks rejoués échus ou simulation"""
+        if self.bus is not None:
+            batch, self._bus_seq = self.bus.since(self._bus_seq)
+            if not batch.empty:
+                self.apply_replay_batch(batch)
+        elif self.plane is not None:
+            batch, self._plane_ticks = self.plane.ticks_since(self._plane_ticks)
+            if not batch.empty:
+                self.apply_replay_batch(batch)
+        elif self.replay.active:
+            batch = self.replay.due()
+            if batch is not None:
+                self.apply_replay_batch(batch)
+        else:
+            self.update_live_data()
+    
+    def open_replay(self):
+        """Ouvre un curseur de rejeu avec les réglages de la sidebar"""
+        self.replay.open(table=REPLAY_SOURCES[st.session_state['rejeu_source']],
+                         start=st.session_state['rejeu_debut'], speed=st.session_state['rejeu_vitesse'])
+
+    def schedule_precompute(self):
+        """Planifie en arrière-plan les graphiques par symbole du filigrane courant, symbole affiché en tête"""
+        selected = st.session_state.get('crypto_technique')
+        get_precompute_scheduler().schedule(self.data_watermark(), self.get_history_matrix('prix'),
+                                            priority=[selected] if selected else ())
+
+    def wait_precomputed(self, symbol):
+        """Attente d'un graphique précalculé : relance la page dès qu'il est disponible"""
+        if not get_precompute_scheduler().pending('analyse_technique', symbol, self.data_watermark()):
+            st.rerun()
+        st.info(f"⏳ Indicateurs de {symbol} en cours de calcul en arrière-plan…")
+
+    def export_buttons(self, key, batches, name, rows=0, route=None):
+        """Boutons d'export CSV / Parquet : les lots de `batches()` sont lus et encodés au clic, hors du script.
+
+        Streamlit garde en mémoire le fichier entier d'un bouton de téléchargement : au-delà de
+        EXPORT_BUTTON_ROWS lignes, l'export est renvoyé vers la route /export de l'API (paramètres
+        `route`), qui écrit le fichier en flux à mémoire constante.
+        """
+        if rows > EXPORT_BUTTON_ROWS:
+            if API_PORT and route is not None:
+                liens = '\n'.join(f"- {fmt.upper()} : `http://localhost:{API_PORT}/export?{urlencode({**route, 'format': fmt})}`"
+                                   for fmt in EXPORT_FORMATS)
+                st.info(f"Sélection de {rows:,} lignes : export en flux par l'API du dashboard\n{liens}")
+            else:
+                st.info(f"Sélection de {rows:,} lignes, trop volumineuse pour un téléchargement dans la page : "
+                        "réduisez la période ou les symboles, ou activez l'API (CRYPTO_DASHBOARD_API_PORT) "
+                        "pour un export en flux par /export.")
+            return
+        for column, fmt in zip(st.columns(len(EXPORT_FORMATS)), EXPORT_FORMATS):
+            column.download_button(f"⬇️ Exporter en {fmt.upper()}", data=lambda fmt=fmt: export_file(batches(), fmt),
+                                   file_name=f"{name}.{fmt}", mime=EXPORT_FORMATS[fmt], key=f"export_{key}_{fmt}")
+
+    def _cached(self, key, builder):
+        """Mémorise un calcul dérivé de l'historique pour la version courante"""
+        cache_key = (key, self.history_version)
+        if cache_key not in self._cache:
+            # Les résultats des versions précédentes ne servent plus
+            self._cache = {k: v for k, v in self._cache.items() if k[1] == self.history_version}
+            self._cache[cache_key] = builder()
+        return self._cache[cache_key]
+
+    def get_history_matrix(self, colonne='prix'):
+        """Retourne une colonne de l'historique au format dates x symboles"""
+        if self.plane is not None and list(self.cryptos) == self.plane.symbols:
+            # Vue sans copie sur le plan de données, limitée aux journées de la version courante
+            days = len(self.historical_data) // len(self.cryptos)
+            return self._cached(('matrix', colonne), lambda: pd.DataFrame(
+                self.plane.history(colonne, days)[1],
+                index=pd.DatetimeIndex(self.historical_data['date'].to_numpy()[::len(self.cryptos)], name='date'),
+                columns=pd.Index(self.plane.symbols, name='symbole'), copy=False
+            ))
+        return self._cached(('matrix', colonne), lambda: (
+            self.historical_data
+            .pivot(index='date', columns='symbole', values=colonne)
+            .reindex(columns=list(self.cryptos.keys()))
+        ))
+
+    def compute_summary_stats(self, windows=(30, 90, 365)):
+        """Calcule en une passe vectorisée les statistiques de performance et de volatilité par cryptomonnaie"""
+        prix = self.get_history_matrix('prix')
+        volatilite = self.get_history_matrix('volatilite_jour')
+        dates = prix.index
+
+        premier_prix = prix.bfill().iloc[0]
+        dernier_prix = prix.ffill().iloc[-1]
+
+        summary = pd.DataFrame(index=prix.columns)
+        summary.index.name = 'symbole'
+        summary['categorie'] = [self.cryptos[s]['categorie'] for s in prix.columns]
+        summary['prix_debut'] = premier_prix
+        summary['prix_fin'] = dernier_prix
+        summary['performance'] = (dernier_prix / premier_prix - 1) * 100
+
+        # Performances sur fenêtres glissantes (premier prix de la fenêtre vs dernier prix)
+        for days in windows:
+            debut = dates.searchsorted(pd.Timestamp(datetime.now() - timedelta(days=days)))
+            debut = min(debut, len(dates) - 1)
+            prix_fenetre = prix.iloc[debut:].bfill().iloc[0]
+            summary[f'performance_{days}j'] = (dernier_prix / prix_fenetre - 1) * 100
+
+        # Volatilité moyenne historique et dispersion sur les 30 derniers jours
+        summary['volatilite_moyenne'] = volatilite.mean()
+        recent = dates > (datetime.now() - timedelta(days=30))
+        summary['volatilite_30j'] = volatilite[recent].std()
+
+        # Drawdown par rapport au plus haut historique
+        valeurs = prix.ffill().to_numpy()
+        plus_haut = np.fmax.accumulate(valeurs, axis=0)
+        drawdown = (valeurs / plus_haut - 1) * 100
+        summary['drawdown_max'] = np.nanmin(drawdown, axis=0)
+        summary['drawdown_actuel'] = drawdown[-1]
+
+        return summary
+
+    def get_correlation_engine(self):
+        """Retourne le moteur de corrélation synchronisé avec la version courante de l'historique"""
+        return self._cached('correlation', lambda: self.correlation_engine.sync(self.get_history_matrix('prix')))
+
+    def data_watermark(self):
+        """Filigrane de l'historique, identique pour toutes les sessions qui partagent les mêmes données"""
+        return self._cached('watermark', lambda: (
+            str(self.historical_data['date'].max()),
+            len(self.historical_data),
+            int(pd.util.hash_pandas_object(self.historical_data['prix'], index=False).sum())
+        ))
+
+    def cached_figure(self, chart_id, params, builder):
+        """Figure mémorisée par signature (graphique, paramètres) et filigrane des données.
+
+        Le JSON est partagé entre sessions ; chaque session garde la figure reconstruite
+        pour la version courante de son historique. Les séries sont encodées en tableaux
+        typés (dates en pas régulier, prix en float32) pour alléger la charge envoyée.
+        """
+        return self._cached(('figure', chart_id, params), lambda: get_figure_cache().get_figure(
+            chart_id, params, self.data_watermark(), lambda: compact_figure(builder())))
+
+    def get_benchmark_indices(self):
+        """Retourne les indices de référence (marché et catégories), prolongés avec les nouveaux jours"""
+        return self._cached('indices_reference', lambda: self.index_builder.update(self.get_history_matrix('prix')))
+
+    def run_stress_test(self, scenario, horizon, seed, n_paths, window=365):
+        """Simule le portefeuille pondéré par capitalisation sous un scénario de stress"""
+        engine = self.get_correlation_engine()
+        symbols = engine.symbols
+        # Pondération figée sur la dernière clôture pour que le résultat reste en cache
+        dernier_prix = self.get_history_matrix('prix').ffill().iloc[-1]
+        weights = [dernier_prix[s] * (self.cryptos[s]['total_supply'] or 1000000000) for s in symbols]
+        
+        return self.stress_engine.run(
+            scenario, horizon, seed, n_paths,
+            symbols=symbols,
+            categories=[self.cryptos[s]['categorie'] for s in symbols],
+            mean_returns=engine.mean_returns(window),
+            cov=engine.covariance(window),
+            weights=weights,
+            data_key=(self.history_version, window)
+        )
+
+    def compute_risk_features(self, window=30):
+        """Rassemble les mesures d'entrée du scoring de risque pour chaque cryptomonnaie"""
+        engine = self.get_correlation_engine()
+        summary = self.get_summary_stats()
+        current = self.current_data.set_index('symbole')
+        
+        features = pd.DataFrame(index=current.index)
+        # Volatilité réalisée annualisée (%) à partir de la covariance des rendements
+        variance = pd.Series(np.diag(engine.covariance(window).to_numpy()), index=engine.symbols)
+        features['volatilite'] = np.sqrt(variance.reindex(features.index) * 365) * 100
+        features['drawdown_max'] = summary['drawdown_max'].reindex(features.index)
+        features['volume_journalier'] = current['volume_journalier']
+        features['volume_reference'] = [self.cryptos[s]['volume_journalier'] for s in features.index]
+        features['spread'] = current['spread']
+        features['categorie'] = current['categorie']
+        features['annee_creation'] = current['date_creation']
+        return features
+
+    def get_risk_scores(self):
+        """Retourne les scores de risque, recalculés seulement pour les actifs modifiés"""
+        return self.risk_scorer.update(
+            self.compute_risk_features(),
+            version=(self.history_version, self.live_version)
+        )
+
+    def get_summary_stats(self):
+        """Retourne la table de statistiques, calculée une seule fois par version des données"""
+        return self._cached('summary_stats', self.compute_summary_stats)
+
+    def get_columnar_summary(self):
+        """Volatilités et performance totale par symbole, agrégées par le moteur colonnaire sur le stockage"""
+        def build():
+            totals = self.query.aggregate(['symbole', 'categorie'], [
+                ('volatilite_jour', 'mean'), ('prix', 'first'), ('prix', 'last'), ('date', 'min')])
+            recent = self.query.aggregate('symbole', [('volatilite_jour', 'stddev'), ('volatilite_jour', 'count')],
+                                          start=datetime.now() - timedelta(days=30))
+            summary = totals.merge(recent, on='symbole', how='left')
+            # Écart-type d'échantillon, comme pandas (Arrow calcule celui de la population)
+            n = summary['volatilite_jour_count']
+            summary['volatilite_30j'] = summary['volatilite_jour_stddev'] * np.sqrt(n / (n - 1)).where(n > 1)
+            summary['volatilite_moyenne'] = summary['volatilite_jour_mean']
+            summary['performance'] = (summary['prix_last'] / summary['prix_first'] - 1) * 100
+            summary['debut'] = summary['date_min']
+            # Même ordre que les autres vues : celui des cartes
+            summary = summary.set_index('symbole').reindex(list(self.cryptos.keys())).reset_index()
+            return summary[['symbole', 'categorie', 'volatilite_moyenne', 'volatilite_30j', 'performance', 'debut']]
+        return self._cached('summary_colonnaire', build)
+
     def display_header(self):
         """Affiche l'en-tête du dashboard"""
         st.markdown(
@@ -836,6 +1377,14 @@ class CryptoDashboard:
         current_time = datetime.now().strftime('%H:%M:%S')
         st.sidebar.markdown(f"**🕐 Dernière mise à jour: {current_time}**")
     
+    def get_sparklines(self, days=30):
+        """SVG des 30 dernières clôtures suivies du prix courant, retracés seulement pour les symboles modifiés"""
+        recent = self._cached(('sparklines', days), lambda: self.get_history_matrix('prix').iloc[-days:].to_numpy())
+        live = self.current_data['prix'].to_numpy()  # Même ordre que les colonnes de l'historique
+        symbols = self.current_data['symbole'].tolist()
+        versions = [(self.history_version, p) for p in live]
+        return self.sparklines.render(symbols, np.vstack([recent, live]), versions)
+    
     def display_crypto_cards(self):
         """Affiche les cartes de cryptomonnaies principales"""
         st.markdown('<h3 class="section-header">💰 PRIX DES CRYPTOMONNAIES EN TEMPS RÉEL</h3>', 
@@ -843,6 +1392,7 @@ class CryptoDashboard:
         
         # Grouper par catégorie
         categories = self.current_data['categorie'].unique()
+        sparklines = self.get_sparklines()
         
         for categorie in categories:
             st.markdown(f'<h4 style="color: #F7931A; margin-top: 1rem;">{categorie}</h4>', 
@@ -873,6 +1423,7 @@ class CryptoDashboard:
                             <div class="crypto-change {change_class}">
                                 {crypto['change_pct']:+.2f}%
                             </div>
+                            <div style="margin-top: 0.5rem;">{sparklines[crypto['symbole']]}</div>
                             <div style="margin-top: 1rem; font-size: 0.8rem;">
                                 📊 Vol: ${crypto['volume_journalier']:.1f}B<br>
                                 📈 Volatilité: {crypto['volatilite']:.1f}%<br>
@@ -886,7 +1437,8 @@ class CryptoDashboard:
         st.markdown('<h3 class="section-header">📊 INDICATEURS MARCHÉ</h3>', 
                    unsafe_allow_html=True)
         
-        # Calcul des métriques globales
+        # Calcul des métriques globales (variations vs hier simulées, fixes pour la journée)
+        rng = self.simulator.stream('metriques', self.historical_data['date'].max())
         avg_change = self.current_data['change_pct'].mean()
         total_volume = self.current_data['volume_journalier'].sum()
         total_market_cap = self.current_data['market_cap'].sum()
@@ -907,14 +1459,14 @@ class CryptoDashboard:
             st.metric(
                 "Volume Total Journalier",
                 f"${total_volume:,.1f}B",
-                f"{random.randint(-15, 25)}% vs hier"
+                f"{rng.integers(-15, 26)}% vs hier"
             )
         
         with col3:
             st.metric(
                 "Capitalisation Totale",
                 f"${total_market_cap:,.0f}B",
-                f"{random.randint(-5, 10)}% vs hier"
+                f"{rng.integers(-5, 11)}% vs hier"
             )
         
         with col4:
@@ -924,123 +1476,230 @@ class CryptoDashboard:
                 f"{strongest_crypto['change_pct']:+.2f}%"
             )
     
-    def create_price_overview(self):
+    @traced()
+    def create_price_overview(self, controls=None):
         """Crée la vue d'ensemble des prix"""
+        columnar = controls is not None and controls['query_mode'] == 'Colonnaire (disque)'
+        
         st.markdown('<h3 class="section-header">📈 ANALYSE DES PRIX HISTORIQUES</h3>', 
                    unsafe_allow_html=True)
         
-        tab1, tab2, tab3, tab4 = st.tabs([
+        sections = [
             "Évolution Historique", 
             "Analyse par Catégorie", 
             "Volatilité", 
             "Performances Relatives"
-        ])
+        ]
+        # Navigation paresseuse : seul le sous-onglet affiché construit ses graphiques (open vaut None sinon)
+        if controls is not None and controls['lazy_tabs']:
+            tab1, tab2, tab3, tab4 = st.tabs(sections, key='prix_onglet', on_change='rerun')
+        else:
+            tab1, tab2, tab3, tab4 = st.tabs(sections)
         
-        with tab1:
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                # Sélection des cryptomonnaies à afficher
-                selected_cryptos = st.multiselect(
-                    "Sélectionnez les cryptomonnaies:",
-                    list(self.cryptos.keys()),
-                    default=['BTC/USD', 'ETH/USD', 'BNB/USD', 'XRP/USD', 'SOL/USD']
-                )
-            
-            with col2:
-                # Période d'analyse
-                period = st.selectbox(
-                    "Période d'analyse:",
-                    ['1 mois', '3 mois', '6 mois', '1 an', '2 ans', 'Toute la période'],
-                    index=3
-                )
+        if tab1.open is not False:
+            with tab1:
+                col1, col2 = st.columns(2)
+            
+                with col1:
+                    # Sélection des cryptomonnaies à afficher
+                    selected_cryptos = st.multiselect(
+                        "Sélectionnez les cryptomonnaies:",
+                        list(self.cryptos.keys()),
+                        default=['BTC/USD', 'ETH/USD', 'BNB/USD', 'XRP/USD', 'SOL/USD']
+                    )
             
-            # Filtrage des données
-            filtered_data = self.historical_data[
-                self.historical_data['symbole'].isin(selected_cryptos)
-            ]
+                with col2:
+                    # Période d'analyse
+                    period = st.selectbox(
+                        "Période d'analyse:",
+                        ['1 mois', '3 mois', '6 mois', '1 an', '2 ans', 'Toute la période'],
+                        index=3
+                    )
             
-            if period != 'Toute la période':
-                if 'mois' in period:
-                    months = int(period.split()[0])
-                    cutoff_date = datetime.now() - timedelta(days=30 * months)
-                else:
-                    years = int(period.split()[0])
-                    cutoff_date = datetime.now() - timedelta(days=365 * years)
-                filtered_data = filtered_data[filtered_data['date'] >= cutoff_date]
-            
-            fig = px.line(filtered_data, 
-                         x='date', 
-                         y='prix',
-                         color='symbole',
-                         title=f'Évolution des Prix des Cryptomonnaies ({period})',
-                         color_discrete_sequence=px.colors.qualitative.Bold)
-            fig.update_layout(yaxis_title="Prix (USD)")
-            st.plotly_chart(fig, width='stretch')
+                cutoff_date = None
+                if period != 'Toute la période':
+                    if 'mois' in period:
+                        months = int(period.split()[0])
+                        cutoff_date = datetime.now() - timedelta(days=30 * months)
+                    else:
+                        years = int(period.split()[0])
+                        cutoff_date = datetime.now() - timedelta(days=365 * years)
+            
+                def build_price_chart():
+                    # Filtrage des données
+                    if columnar:
+                        # Symboles et dates filtrés à la lecture, agrégés par jour quelle que soit la granularité stockée
+                        filtered_data = self.query.series('prix', symbols=selected_cryptos, start=cutoff_date)
+                    else:
+                        filtered_data = self.historical_data[
+                            self.historical_data['symbole'].isin(selected_cryptos)
+                        ]
+                        if cutoff_date is not None:
+                            filtered_data = filtered_data[filtered_data['date'] >= cutoff_date]
+                
+                    fig = px.line(filtered_data, 
+                                 x='date', 
+                                 y='prix',
+                                 color='symbole',
+                                 title=f'Évolution des Prix des Cryptomonnaies ({period})',
+                                 color_discrete_sequence=px.colors.qualitative.Bold)
+                    fig.update_layout(yaxis_title="Prix (USD)")
+                    return fig
+            
+                self.plotly_chart(self.cached_figure('evolution_prix', (tuple(selected_cryptos), period, columnar),
+                                                     build_price_chart))
+                # Export des lignes stockées avec les mêmes filtres (symboles, date de début) poussés dans le lecteur
+                route = {'table': 'bars', 'symbols': ','.join(selected_cryptos)}
+                if cutoff_date is not None:
+                    route['start'] = f"{cutoff_date:%Y-%m-%d}"
+                rows = self._cached(('export_lignes', tuple(selected_cryptos), period),
+                                    lambda: self.query.count(symbols=selected_cryptos, start=cutoff_date))
+                self.export_buttons('evolution', lambda: self.query.batches(symbols=selected_cryptos, start=cutoff_date),
+                                    'historique_prix', rows=rows, route=route)
         
-        with tab2:
-            # Analyse par catégorie
-            fig = px.box(self.historical_data, 
-                        x='categorie', 
-                        y='prix',
-                        title='Distribution des Prix par Catégorie',
-                        color='categorie')
-            st.plotly_chart(fig, width='stretch')
+        if tab2.open is not False:
+            with tab2:
+                # Analyse par catégorie
+                categories = tuple(controls['categories_selectionnees']) if columnar else None
+            
+                def build_category_chart():
+                    if columnar:
+                        # Quartiles calculés par le moteur colonnaire : seules 5 valeurs par catégorie sont transférées
+                        quartiles = self.query.quantiles('categorie', 'prix', categories=categories)
+                        fig = go.Figure()
+                        for _, row in quartiles.iterrows():
+                            fig.add_trace(go.Box(
+                                name=row['categorie'], x=[row['categorie']],
+                                lowerfence=[row['q0']], q1=[row['q25']], median=[row['q50']],
+                                q3=[row['q75']], upperfence=[row['q100']]
+                            ))
+                        fig.update_layout(title='Distribution des Prix par Catégorie', yaxis_title='prix')
+                        return fig
+                    return px.box(self.historical_data, 
+                                 x='categorie', 
+                                 y='prix',
+                                 title='Distribution des Prix par Catégorie',
+                                 color='categorie')
+            
+                self.plotly_chart(self.cached_figure('distribution_categories', (columnar, categories),
+                                                     build_category_chart))
         
-        with tab3:
-            col1, col2 = st.columns(2)
+        # Statistiques précalculées, partagées par les onglets suivants
+        summary = self.get_summary_stats().reset_index()
+        # Mode colonnaire : volatilités et performances agrégées sur tout l'historique stocké,
+        # au-delà de la fenêtre gardée en mémoire
+        overview = self.get_columnar_summary() if columnar else summary
+        origine = overview['debut'].min() if columnar else self.historical_data['date'].min()
+        
+        if tab3.open is not False:
+            with tab3:
+                col1, col2 = st.columns(2)
+            
+                with col1:
+                    # Volatilité historique
+                    self.plotly_chart(self.cached_figure('volatilite_moyenne', (columnar,), lambda: px.bar(
+                        overview, 
+                        x='symbole', 
+                        y='volatilite_moyenne',
+                        title='Volatilité Historique Moyenne (%)',
+                        color='symbole',
+                        color_discrete_sequence=px.colors.qualitative.Bold)))
+            
+                with col2:
+                    # Volatilité récente (30 derniers jours)
+                    self.plotly_chart(self.cached_figure('volatilite_30j', (columnar,), lambda: px.scatter(
+                        overview.dropna(subset=['volatilite_30j']), 
+                        x='symbole', 
+                        y='volatilite_30j',
+                        size='volatilite_30j',
+                        title='Volatilité Récente (30 jours)',
+                        color='symbole',
+                        size_max=40)))
+        
+        if tab4.open is not False:
+            with tab4:
+                # Performance relative
+                self.plotly_chart(self.cached_figure('performance_totale', (columnar,), lambda: px.bar(
+                    overview, 
+                    x='symbole', 
+                    y='performance',
+                    color='categorie',
+                    title=f"Performance Totale depuis {origine:%m/%Y} (%)",
+                    color_discrete_sequence=px.colors.qualitative.Bold)))
+            
+                # Comparaison aux indices de référence, en base 100 au début de la période
+                st.subheader("Comparaison aux Indices de Référence")
+                col1, col2 = st.columns(2)
+            
+                with col1:
+                    compared = st.multiselect(
+                        "Cryptomonnaies comparées au marché:",
+                        list(self.cryptos.keys()),
+                        default=['BTC/USD', 'ETH/USD']
+                    )
             
-            with col1:
-                # Volatilité historique
-                volatilite_data = self.historical_data.groupby('symbole')['volatilite_jour'].mean().reset_index()
-                fig = px.bar(volatilite_data, 
-                            x='symbole', 
-                            y='volatilite_jour',
-                            title='Volatilité Historique Moyenne (%)',
-                            color='symbole',
-                            color_discrete_sequence=px.colors.qualitative.Bold)
-                st.plotly_chart(fig, width='stretch')
+                with col2:
+                    debut = st.date_input(
+                        "Depuis le:",
+                        value=self.historical_data['date'].min().date(),
+                        min_value=self.historical_data['date'].min().date(),
+                        max_value=self.historical_data['date'].max().date()
+                    )
             
-            with col2:
-                # Volatilité récente (30 derniers jours)
-                recent_data = self.historical_data[
-                    self.historical_data['date'] > (datetime.now() - timedelta(days=30))
-                ]
-                recent_vol = recent_data.groupby('symbole')['volatilite_jour'].std().reset_index()
+                indices = self.get_benchmark_indices()
+            
+                def build_benchmark_chart():
+                    series = pd.concat([
+                        indices[[MARKET_CAP, MARKET_EQUAL]],
+                        self.get_history_matrix('prix')[compared].ffill()
+                    ], axis=1)
+                    series = series[series.index >= pd.Timestamp(debut)]
+                    base = series.bfill().iloc[0]
+                    rebased = (series / base * 100).reset_index(names='date').melt(
+                        id_vars='date', var_name='serie', value_name='base_100')
+                    fig = px.line(rebased, x='date', y='base_100', color='serie',
+                                  title='Performance vs Indices de Marché (base 100)',
+                                  color_discrete_sequence=px.colors.qualitative.Bold)
+                    fig.update_layout(yaxis_title="Base 100")
+                    return fig
+            
+                self.plotly_chart(self.cached_figure('comparaison_indices', (tuple(compared), debut),
+                                                     build_benchmark_chart))
+            
+                col1, col2 = st.columns(2)
+            
+                with col1:
+                    # Sous-indices par catégorie (pondérés par capitalisation, plafonnés)
+                    def build_sub_indices_chart():
+                        categories = indices.drop(columns=[MARKET_CAP, MARKET_EQUAL])
+                        fig = px.line(categories.reset_index(names='date'), x='date', y=list(categories.columns),
+                                      title='Sous-Indices par Catégorie', log_y=True)
+                        fig.update_layout(yaxis_title="Niveau (base 1000)", legend_title="Catégorie")
+                        return fig
                 
-                fig = px.scatter(recent_vol, 
-                               x='symbole', 
-                               y='volatilite_jour',
-                               size='volatilite_jour',
-                               title='Volatilité Récente (30 jours)',
-                               color='symbole',
-                               size_max=40)
-                st.plotly_chart(fig, width='stretch')
-        
-        with tab4:
-            # Performance relative
-            performance_data = []
-            for symbole in self.cryptos.keys():
-                crypto_data = self.historical_data[self.historical_data['symbole'] == symbole]
-                if len(crypto_data) > 0:
-                    start_price = crypto_data.iloc[0]['prix']
-                    end_price = crypto_data.iloc[-1]['prix']
-                    performance = ((end_price - start_price) / start_price) * 100
-                    performance_data.append({
-                        'symbole': symbole,
-                        'performance': performance,
-                        'categorie': self.cryptos[symbole]['categorie']
-                    })
-            
-            performance_df = pd.DataFrame(performance_data)
-            fig = px.bar(performance_df, 
-                        x='symbole', 
-                        y='performance',
-                        color='categorie',
-                        title='Performance Totale depuis 2020 (%)',
-                        color_discrete_sequence=px.colors.qualitative.Bold)
-            st.plotly_chart(fig, width='stretch')
+                    self.plotly_chart(self.cached_figure('sous_indices', (), build_sub_indices_chart))
+            
+                with col2:
+                    # Composition actuelle de l'indice de marché
+                    def build_weights_chart():
+                        poids = self.index_builder.weights().loc[MARKET_CAP]
+                        poids = (poids[poids > 0] * 100).sort_values(ascending=False).head(15)
+                        fig = px.bar(x=poids.index, y=poids.values,
+                                     title='Poids dans l\'Indice de Marché (%, plafonnés)')
+                        fig.update_layout(xaxis_title="Symbole", yaxis_title="Poids (%)")
+                        return fig
+                
+                    self.plotly_chart(self.cached_figure('poids_indice', (), build_weights_chart))
+            
+                # Tableau récapitulatif
+                st.dataframe(
+                    summary[['symbole', 'categorie', 'performance', 'performance_30j',
+                             'performance_90j', 'performance_365j', 'volatilite_moyenne',
+                             'volatilite_30j', 'drawdown_max', 'drawdown_actuel']].round(2),
+                    width='stretch'
+                )
     
+    @traced()
     def create_blockchain_analysis(self):
         """Analyse des blockchains"""
         st.markdown('<h3 class="section-header">⛓️ ANALYSE DES BLOCKCHAINS</h3>', 
@@ -1161,7 +1820,7 @@ class CryptoDashboard:
                         title='Adresses Actives (en milliers)',
                         color='Blockchain',
                         color_discrete_sequence=px.colors.qualitative.Bold)
-            st.plotly_chart(fig, width='stretch')
+            self.plotly_chart(fig)
             
             # Tableau des métriques
             st.subheader("Tableau Comparatif des Métriques")
@@ -1200,121 +1859,92 @@ class CryptoDashboard:
             - Roadmap: AggLayer, Polygon Miden
             """)
     
+    @traced()
     def create_technical_analysis(self):
         """Analyse technique avancée"""
         st.markdown('<h3 class="section-header">🔬 ANALYSE TECHNIQUE AVANCÉE</h3>', 
                    unsafe_allow_html=True)
         
-        tab1, tab2, tab3 = st.tabs(["Indicateurs Techniques", "Patterns de Trading", "Signaux"])
+        tab1, tab2, tab3, tab4 = st.tabs(["Indicateurs Techniques", "Patterns de Trading", "Signaux", "Backtest"])
         
         with tab1:
             crypto_selectionnee = st.selectbox("Sélectionnez une cryptomonnaie:", 
-                                             list(self.cryptos.keys()))
+                                             list(self.cryptos.keys()), key='crypto_technique')
             
             if crypto_selectionnee:
-                crypto_data = self.historical_data[
-                    self.historical_data['symbole'] == crypto_selectionnee
-                ].copy()
-                
-                # Calcul des indicateurs techniques
-                crypto_data['MA20'] = crypto_data['prix'].rolling(window=20).mean()
-                crypto_data['MA50'] = crypto_data['prix'].rolling(window=50).mean()
-                crypto_data['RSI'] = self.calculate_rsi(crypto_data['prix'])
-                crypto_data['Bollinger_High'], crypto_data['Bollinger_Low'] = self.calculate_bollinger_bands(crypto_data['prix'])
-                
-                fig = make_subplots(rows=3, cols=1, 
-                                  shared_xaxes=True, 
-                                  vertical_spacing=0.05,
-                                  subplot_titles=('Prix et Moyennes Mobiles', 'Bandes de Bollinger', 'RSI'),
-                                  row_heights=[0.5, 0.25, 0.25])
-                
-                # Prix et moyennes mobiles
-                fig.add_trace(go.Scatter(x=crypto_data['date'], y=crypto_data['prix'],
-                                       name='Prix', line=dict(color='#F7931A')), row=1, col=1)
-                fig.add_trace(go.Scatter(x=crypto_data['date'], y=crypto_data['MA20'],
-                                       name='MM20', line=dict(color='orange')), row=1, col=1)
-                fig.add_trace(go.Scatter(x=crypto_data['date'], y=crypto_data['MA50'],
-                                       name='MM50', line=dict(color='red')), row=1, col=1)
-                
-                # Bandes de Bollinger
-                fig.add_trace(go.Scatter(x=crypto_data['date'], y=crypto_data['Bollinger_High'],
-                                       name='Bollinger High', line=dict(color='gray', dash='dash')), row=2, col=1)
-                fig.add_trace(go.Scatter(x=crypto_data['date'], y=crypto_data['prix'],
-                                       name='Prix', line=dict(color='#F7931A'), showlegend=False), row=2, col=1)
-                fig.add_trace(go.Scatter(x=crypto_data['date'], y=crypto_data['Bollinger_Low'],
-                                       name='Bollinger Low', line=dict(color='gray', dash='dash'), 
-                                       fill='tonexty'), row=2, col=1)
-                
-                # RSI
-                fig.add_trace(go.Scatter(x=crypto_data['date'], y=crypto_data['RSI'],
-                                       name='RSI', line=dict(color='purple')), row=3, col=1)
-                fig.add_hline(y=70, line_dash="dash", line_color="red", row=3, col=1)
-                fig.add_hline(y=30, line_dash="dash", line_color="green", row=3, col=1)
+                # Graphique précalculé en arrière-plan ; tant qu'il est en file, la page ne l'attend pas
+                if get_precompute_scheduler().pending('analyse_technique', crypto_selectionnee, self.data_watermark()):
+                    get_precompute_scheduler().prioritize([crypto_selectionnee])
+                    st.fragment(self.wait_precomputed, run_every=0.5)(crypto_selectionnee)
+                else:
+                    prices = self.get_history_matrix('prix')
+                    self.plotly_chart(self.cached_figure(
+                        'analyse_technique', crypto_selectionnee,
+                        lambda: technical_figure(prices.index, prices[crypto_selectionnee].to_numpy(),
+                                                 crypto_selectionnee)))
                 
-                fig.update_layout(height=800, title_text=f"Analyse Technique - {crypto_selectionnee}")
-                st.plotly_chart(fig, width='stretch')
+                # Mouvements intraday conservés tick par tick
+                ticks = self.tick_history.frame(crypto_selectionnee, n=500)
+                if len(ticks) > 1:
+                    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.05,
+                                        row_heights=[0.7, 0.3])
+                    fig.add_trace(go.Scatter(x=ticks['date'], y=ticks['prix'], name='Prix',
+                                             line=dict(color='#F7931A')), row=1, col=1)
+                    fig.add_trace(go.Bar(x=ticks['date'], y=ticks['volume'], name='Volume (Md$)',
+                                         marker_color='gray'), row=2, col=1)
+                    fig.update_layout(height=400, title_text=f"Évolution Intraday - {len(ticks)} derniers ticks")
+                    self.plotly_chart(fig)
         
         with tab2:
             st.subheader("Patterns de Trading Identifiés")
             
             col1, col2 = st.columns(2)
-            
             with col1:
-                st.markdown("""
-                ### 📈 Patterns Haussiers
-                
-                **🔺 Double Bottom (BTC/USD):**
-                - Support solide à $60,000
-                - Rebond technique confirmé
-                - Objectif: $72,000
-                
-                **🔼 Triangle Ascendant (ETH/USD):**
-                - Consolidation haussière
-                - Rupture imminente
-                - Volume croissant
-                
-                **🚀 Breakout (SOL/USD):**
-                - Résistance franchie à $150
-                - Momentum positif
-                - Retest réussi
-                """)
-            
+                timeframe = st.radio("Unité de temps:", ['1D', '1W'], horizontal=True)
             with col2:
-                st.markdown("""
-                ### 📉 Patterns Baissiers
-                
-                **🔻 Double Top (XRP/USD):**
-                - Résistance à $0.65
-                - Échec de rupture
-                - Objectif: $0.45
-                
-                **🔽 Tête et Épaules (ADA/USD):**
-                - Pattern de retournement
-                - Volume de distribution
-                - Ligne de cou à $0.40
-                
-                **⬇️ Baisse en Biseau (DOT/USD):**
-                - Structure baissière
-                - Volume décroissant
-                - Support à $6.50
-                """)
+                max_age = st.slider("Figures achevées depuis moins de (jours):", 7, 365, 90)
+            
+            patterns = self.pattern_detector.current_patterns(
+                self.get_history_matrix('prix'), timeframe, max_age_days=max_age)
+            icones = {'Haussier': '🔺', 'Baissier': '🔻'}
+            
+            col1, col2 = st.columns(2)
+            for col, tendance, titre in [(col1, 'Haussier', '### 📈 Patterns Haussiers'),
+                                         (col2, 'Baissier', '### 📉 Patterns Baissiers')]:
+                with col:
+                    st.markdown(titre)
+                    subset = patterns[patterns['tendance'] == tendance] if len(patterns) else patterns
+                    if subset.empty:
+                        st.info("Aucune figure récente.")
+                    for _, p in subset.iterrows():
+                        st.markdown(
+                            f"**{icones[tendance]} {p['pattern']} ({p['symbole']}):**\n"
+                            f"- Niveau clé à ${p['niveau_cle']:,.4f}\n"
+                            f"- Objectif: ${p['objectif']:,.4f}\n"
+                            f"- Formée du {p['date_debut']:%d/%m/%Y} au {p['date_fin']:%d/%m/%Y}"
+                        )
+            
+            with st.expander("Historique complet des figures détectées"):
+                st.dataframe(self.pattern_detector.scan(self.get_history_matrix('prix'), timeframe),
+                             width='stretch')
         
         with tab3:
             st.subheader("Signaux de Trading")
             
             # Tableau des signaux
             signals_data = []
+            rng = self.simulator.stream('signaux', self.historical_data['date'].max())
             for symbole in list(self.cryptos.keys())[:10]:  # Limiter à 10 pour l'exemple
-                signal_type = random.choice(['Achat', 'Vente', 'Neutre'])
-                strength = random.randint(1, 10)
-                timeframe = random.choice(['1H', '4H', '1D', '1W'])
+                signal_type = rng.choice(['Achat', 'Vente', 'Neutre'])
+                strength = rng.integers(1, 11)
+                timeframe = rng.choice(['1H', '4H', '1D', '1W'])
                 
                 signals_data.append({
                     'Cryptomonnaie': symbole,
                     'Signal': signal_type,
                     'Force': strength,
                     'Timeframe': timeframe,
-                    'Prix Cible': f"${random.uniform(0.1, 100000):.2f}"
+                    'Prix Cible': f"${rng.uniform(0.1, 100000):.2f}"
                 })
             
             signals_df = pd.DataFrame(signals_data)
@@ -1324,25 +1954,92 @@ class CryptoDashboard:
                 color = 'green' if val == 'Achat' else 'red' if val == 'Vente' else 'gray'
                 return f'color: {color}'
             
-            styled_df = signals_df.style.applymap(color_signal, subset=['Signal'])
-            st.dataframe(styled_df, use_container_width=True)
+            styled_df = signals_df.style.map(color_signal, subset=['Signal'])
+            st.dataframe(styled_df, width='stretch')
+            self.export_buttons('signaux', lambda: frame_batches(signals_df), 'signaux')
+        
+        with tab4:
+            self.create_backtest_view()
+    
+    def run_backtest(self, strategy, grid, symbols):
+        """Backteste une grille de paramètres, mis en cache par version de l'historique"""
+        def build():
+            prices = self.get_history_matrix('prix')[symbols]
+            spreads = self.current_data.set_index('symbole')['spread']
+            return Backtester(prices, spreads).run(strategy, grid)
+        return self._cached(('backtest', strategy, grid.tobytes(), tuple(symbols)), build)
+    
+    @traced()
+    def create_backtest_view(self):
+        """Backtest des stratégies sur l'historique de toutes les cryptomonnaies"""
+        st.subheader("Backtest de Stratégies")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            strategy = st.selectbox("Stratégie:", list(STRATEGIES.keys()))
+        with col2:
+            symbols = st.multiselect("Cryptomonnaies testées:", list(self.cryptos.keys()),
+                                     default=list(self.cryptos.keys()))
+        
+        col1, col2, col3 = st.columns(3)
+        if strategy == 'Croisement MM':
+            with col1:
+                fast = st.slider("Moyenne rapide (jours)", 5, 100, (5, 50), step=5)
+            with col2:
+                slow = st.slider("Moyenne lente (jours)", 20, 300, (20, 200), step=10)
+            grid = moving_average_grid(np.arange(fast[0], fast[1] + 1, 5),
+                                       np.arange(slow[0], slow[1] + 1, 10))
+        else:
+            with col1:
+                windows = st.multiselect("Fenêtres RSI:", [7, 14, 21, 28], default=[14])
+            with col2:
+                buy = st.slider("Seuil d'achat (survente)", 10, 50, (20, 40), step=5)
+            with col3:
+                sell = st.slider("Seuil de vente (surachat)", 50, 90, (60, 80), step=5)
+            grid = rsi_grid(windows, np.arange(buy[0], buy[1] + 1, 5), np.arange(sell[0], sell[1] + 1, 5))
+        
+        st.caption(f"{len(grid)} combinaisons x {len(symbols)} cryptomonnaies, "
+                   f"frais = demi-spread par transaction")
+        
+        if st.button("🚀 Lancer le backtest"):
+            st.session_state['backtest_request'] = (strategy, grid, symbols)
+        
+        request = st.session_state.get('backtest_request')
+        if not request or len(request[1]) == 0 or not request[2]:
+            return
+        
+        strategy, grid, symbols = request
+        results = self.run_backtest(strategy, grid, symbols)
+        params = list(STRATEGIES[strategy])
+        
+        # Performance moyenne de chaque combinaison sur l'ensemble des symboles
+        by_params = (results.groupby(params)[['rendement', 'sharpe', 'drawdown_max', 'transactions']]
+                     .mean().reset_index().sort_values('sharpe', ascending=False))
+        st.markdown("**Meilleures combinaisons (moyenne sur les cryptomonnaies)**")
+        st.dataframe(by_params.head(10).round(2), width='stretch')
+        
+        if strategy == 'Croisement MM':
+            heatmap = by_params.pivot(index='mm_lente', columns='mm_rapide', values='sharpe')
+            fig = px.imshow(heatmap, origin='lower', aspect='auto',
+                           color_continuous_scale='RdYlGn',
+                           title='Sharpe Moyen par Combinaison de Moyennes Mobiles')
+            self.plotly_chart(fig)
+        
+        # Meilleurs paramètres par cryptomonnaie
+        best = results.loc[results.groupby('symbole')['sharpe'].idxmax()]
+        st.markdown("**Meilleurs paramètres par cryptomonnaie**")
+        st.dataframe(best.sort_values('sharpe', ascending=False).round(2).reset_index(drop=True),
+                     width='stretch')
     
     def calculate_rsi(self, prices, window=14):
         """Calcule le RSI (Relative Strength Index)"""
-        delta = prices.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
-        rs = gain / loss
-        return 100 - (100 / (1 + rs))
+        return indicators.rsi(prices, window=window)
     
     def calculate_bollinger_bands(self, prices, window=20, num_std=2):
         """Calcule les bandes de Bollinger"""
-        rolling_mean = prices.rolling(window=window).mean()
-        rolling_std = prices.rolling(window=window).std()
-        upper_band = rolling_mean + (rolling_std * num_std)
-        lower_band = rolling_mean - (rolling_std * num_std)
-        return upper_band, lower_band
+        return indicators.bollinger_bands(prices, window=window, num_std=num_std)
     
+    @traced()
     def create_sidebar(self):
         """Crée la sidebar avec les contrôles"""
         st.sidebar.markdown("## 🎛️ CONTRÔLES D'ANALYSE")
@@ -1368,10 +2065,36 @@ class CryptoDashboard:
         auto_refresh = st.sidebar.checkbox("Rafraîchissement automatique", value=True)
         show_advanced = st.sidebar.checkbox("Indicateurs avancés", value=True)
         alert_threshold = st.sidebar.slider("Seuil d'alerte (%)", 1.0, 10.0, 3.0)
+        lazy_tabs = st.sidebar.checkbox("Navigation paresseuse", value=True,
+                                        help="Seul l'onglet affiché est calculé à chaque rafraîchissement")
+        debug = st.sidebar.checkbox("🐞 Panneau de debug", value=False)
+        if debug:
+            st.sidebar.checkbox("Profilage par échantillonnage", value=False, key='profilage',
+                                help="Échantillonne la pile d'exécution pendant le prochain rerun")
+        query_mode = st.sidebar.radio(
+            "Moteur de requête",
+            ['Mémoire', 'Colonnaire (disque)'],
+            help="Le mode colonnaire lit tout l'historique stocké en ne chargeant que les lignes filtrées "
+                 "(évolution, catégories, volatilité, performances) ; les indices, corrélations, risques "
+                 f"et indicateurs portent sur les {HISTORY_DAYS} derniers jours gardés en mémoire"
+        )
+        
+        # Rejeu de l'historique enregistré à la place de la simulation, un ou plusieurs curseurs
+        with st.sidebar.expander("⏯️ Rejeu de l'historique"):
+            st.selectbox("Source", list(REPLAY_SOURCES), key='rejeu_source')
+            st.select_slider("Vitesse", options=SPEEDS, value=100, format_func=lambda v: f"{v}x",
+                             key='rejeu_vitesse')
+            st.date_input("Début du rejeu", value=self.historical_data['date'].max() - timedelta(days=30),
+                          key='rejeu_debut')
+            col1, col2 = st.columns(2)
+            col1.button("Ajouter un curseur", on_click=self.open_replay)
+            col2.button("Arrêter", on_click=self.replay.close, disabled=not len(self.replay))
+            if len(self.replay):
+                st.dataframe(self.replay.stats(), hide_index=True)
         
         # Bouton de rafraîchissement
         if st.sidebar.button("🔄 Rafraîchir les données"):
-            self.update_live_data()
+            self.advance_live_data()
             st.rerun()
         
         # Alertes en temps réel
@@ -1398,9 +2121,13 @@ class CryptoDashboard:
             'date_fin': date_fin,
             'auto_refresh': auto_refresh,
             'show_advanced': show_advanced,
-            'alert_threshold': alert_threshold
+            'alert_threshold': alert_threshold,
+            'query_mode': query_mode,
+            'lazy_tabs': lazy_tabs,
+            'debug': debug
         }
     
+    @traced()
     def create_market_analysis(self):
         """Analyse des marchés crypto"""
         st.markdown('<h3 class="section-header">🌍 ANALYSE DES MARCHÉS CRYPTO</h3>', 
@@ -1416,13 +2143,20 @@ class CryptoDashboard:
             
             for i, (indice, data) in enumerate(indices_list):
                 with cols[i % 3]:
-                    data['change'] = random.uniform(-5, 5)  # Mise à jour simulée
-                    st.metric(
-                        indice,
-                        f"{data['valeur']:.1f}",
-                        f"{data['change']:+.2f}%",
-                        delta_color="normal"
-                    )
+                    # Variation réelle par rapport à la dernière clôture
+                    if data['unite'] == 'B$':
+                        valeur, change = f"${data['valeur']:,.1f}B", f"{data['change']:+.2f}%"
+                    elif data['unite'] == '%':
+                        valeur, change = f"{data['valeur']:.1f}%", f"{data['change']:+.2f} pts"
+                    else:
+                        valeur, change = f"{data['valeur']:.1f}", f"{data['change']:+.1f} pts"
+                    st.metric(indice, valeur, change, delta_color="normal")
+            
+            historique = self.index_engine.history_frame()
+            if len(historique) > 1:
+                indice = st.selectbox("Évolution intraday de l'indice:", list(self.market_data['indices'].keys()))
+                fig = px.line(historique, x='date', y=indice, title=f'{indice} - Évolution par tick')
+                self.plotly_chart(fig)
         
         with tab2:
             st.subheader("Facteurs Macroéconomiques")
@@ -1469,76 +2203,102 @@ class CryptoDashboard:
                 - Paniques collectives
                 """)
     
+    @traced()
     def create_risk_analysis(self):
         """Analyse des risques"""
         st.markdown('<h3 class="section-header">⚠️ ANALYSE DES RISQUES</h3>', 
                    unsafe_allow_html=True)
         
-        tab1, tab2, tab3 = st.tabs(["Risques par Crypto", "Stress Tests", "Stratégies"])
+        tab1, tab_corr, tab2, tab3 = st.tabs(["Risques par Crypto", "Corrélations", "Stress Tests", "Stratégies"])
         
         with tab1:
             st.subheader("Évaluation des Risques par Cryptomonnaie")
             
-            risk_data = []
-            for symbole, info in self.cryptos.items():
-                risk_score = random.randint(20, 90)
-                risk_level = "FAIBLE" if risk_score < 40 else "MOYEN" if risk_score < 70 else "ÉLEVÉ"
-                
-                risk_data.append({
-                    'Cryptomonnaie': info['nom'],
-                    'Symbole': symbole,
-                    'Score Risque': risk_score,
-                    'Niveau': risk_level,
-                    'Risque Réglementaire': random.randint(10, 80),
-                    'Risque Technologique': random.randint(15, 75),
-                    'Risque de Marché': random.randint(20, 85)
-                })
-            
-            risk_df = pd.DataFrame(risk_data)
+            scores = self.get_risk_scores()
+            risk_df = scores.round(1)
+            risk_df.insert(0, 'Cryptomonnaie', [self.cryptos[s]['nom'] for s in scores.index])
+            risk_df.insert(1, 'Symbole', scores.index)
+            risk_df = risk_df[['Cryptomonnaie', 'Symbole', 'Score Risque', 'Niveau',
+                               'Risque de Marché', 'Risque de Liquidité',
+                               'Risque Réglementaire', 'Risque Technologique']]
+            risk_df = risk_df.sort_values('Score Risque', ascending=False).reset_index(drop=True)
             st.dataframe(risk_df, width='stretch')
+            self.export_buttons('risques', lambda: frame_batches(risk_df), 'risques')
+        
+        with tab_corr:
+            st.subheader("Corrélations entre Cryptomonnaies")
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                window = st.selectbox("Fenêtre de calcul (jours):", [30, 90, 365], index=1)
+            with col2:
+                threshold = st.slider("Seuil de regroupement (1 - corrélation)", 0.1, 1.0, 0.5)
+            
+            correlation = self.get_correlation_engine().correlation(window)
+            groupes, ordre = hierarchical_clusters(correlation, threshold=threshold)
+            
+            # Heatmap ordonnée par groupe pour faire apparaître les blocs corrélés
+            fig = px.imshow(correlation.loc[ordre, ordre],
+                           zmin=-1, zmax=1,
+                           color_continuous_scale='RdBu_r',
+                           title=f'Corrélation des Rendements Journaliers ({window} jours)')
+            fig.update_layout(height=800)
+            self.plotly_chart(fig)
+            
+            # Vue des groupes d'actifs corrélés
+            clusters_df = pd.DataFrame([
+                {'Groupe': i + 1,
+                 'Taille': len(groupe),
+                 'Corrélation Moyenne': (correlation.loc[groupe, groupe].to_numpy().sum() - len(groupe))
+                                        / max(len(groupe) * (len(groupe) - 1), 1),
+                 'Cryptomonnaies': ', '.join(groupe)}
+                for i, groupe in enumerate(groupes)
+            ])
+            st.dataframe(clusters_df.round(2), width='stretch')
         
         with tab2:
             st.subheader("Scénarios de Stress Test")
             
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                scenario = st.selectbox("Scénario:", list(SCENARIOS.keys()), index=1)
+            with col2:
+                horizon = st.selectbox("Horizon (jours):", [7, 30, 90, 365], index=1)
+            with col3:
+                n_paths = st.selectbox("Trajectoires simulées:", [10000, 50000, 100000], index=0)
+            with col4:
+                seed = int(st.number_input("Graine aléatoire:", min_value=0, value=42, step=1))
+            
+            st.markdown(f"**Hypothèses:** {SCENARIOS[scenario]['description']} "
+                        f"(portefeuille pondéré par la capitalisation)")
+            
+            result = self.run_stress_test(scenario, horizon, seed, n_paths)
+            
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("VaR 95%", f"{result['var_95']:.1%}")
+            col2.metric("CVaR 95%", f"{result['cvar_95']:.1%}")
+            col3.metric("VaR 99%", f"{result['var_99']:.1%}")
+            col4.metric("Drawdown Moyen", f"{result['drawdown_moyen']:.1%}")
+            
             col1, col2 = st.columns(2)
             
             with col1:
-                st.markdown("""
-                ### 📉 Scénario Bear Market
-                
-                **Hypothèses:**
-                - Bitcoin -70%
-                - Altcoins -85%
-                - Volume -60%
-                - Fuite des capitaux
-                
-                **Impacts:**
-                - Liquidations massives
-                - Faillite d'exchanges
-                - Perte de confiance
-                - Régulation renforcée
-                
-                **Probabilité:** 30%
-                """)
+                counts, edges = np.histogram(result['rendements'] * 100, bins=80)
+                fig = go.Figure(go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts,
+                                       marker_color='#F7931A'))
+                fig.add_vline(x=-result['var_95'] * 100, line_dash="dash", line_color="red",
+                              annotation_text="VaR 95%")
+                fig.update_layout(title=f'Distribution des Rendements du Portefeuille ({horizon} jours)',
+                                  xaxis_title="Rendement (%)", yaxis_title="Trajectoires")
+                self.plotly_chart(fig)
             
             with col2:
-                st.markdown("""
-                ### 📈 Scénario Bull Run
-                
-                **Hypothèses:**
-                - Bitcoin +300%
-                - Altcoins +500%
-                - Volume +400%
-                - Adoption massive
-                
-                **Impacts:**
-                - Nouveaux records
-                - Institutionnalisation
-                - Innovation accélérée
-                - Médias positifs
-                
-                **Probabilité:** 25%
-                """)
+                counts, edges = np.histogram(result['drawdowns'] * 100, bins=80)
+                fig = go.Figure(go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts,
+                                       marker_color='#dc3545'))
+                fig.update_layout(title='Distribution des Drawdowns Maximaux',
+                                  xaxis_title="Drawdown (%)", yaxis_title="Trajectoires")
+                self.plotly_chart(fig)
         
         with tab3:
             st.subheader("Stratégies de Gestion des Risques")
@@ -1568,13 +2328,117 @@ class CryptoDashboard:
                 - Gestion de position
             """)
     
+    def revalue_portfolios(self):
+        """Valorise tous les portefeuilles aux derniers prix"""
+        prices = self.current_data.set_index('symbole')['prix'].reindex(self.portfolios.symbols)
+        self.portfolios.revalue(prices.to_numpy(), owner=self)
+    
+    @traced()
+    def create_portfolio_view(self):
+        """Suivi des positions et du P&L par utilisateur"""
+        st.markdown('<h3 class="section-header">💼 SUIVI DE PORTEFEUILLE</h3>', 
+                   unsafe_allow_html=True)
+        
+        # Positions modifiées par un autre processus sur le même stockage
+        self.portfolios.sync()
+        user = st.text_input("Utilisateur:", value="desk")
+        prix = self.current_data.set_index('symbole')['prix']
+        
+        with st.expander("➕ Modifier une position"):
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                symbole = st.selectbox("Cryptomonnaie:", list(self.cryptos.keys()), key='portfolio_symbol')
+            with col2:
+                quantite = st.number_input("Quantité détenue:", min_value=0.0, value=1.0, key='portfolio_qty')
+            with col3:
+                prix_revient = st.number_input("Prix de revient (USD):", min_value=0.0,
+                                               value=float(prix[symbole]), format="%.4f",
+                                               key='portfolio_cost')
+            if st.button("Enregistrer la position"):
+                self.portfolios.set_position(user, symbole, quantite, prix_revient)
+                self.revalue_portfolios()
+        
+        positions = self.portfolios.positions(user)
+        if positions.empty:
+            st.info("Aucune position pour cet utilisateur.")
+            return
+        
+        valeur = positions['valeur'].sum()
+        pnl = positions['pnl'].sum()
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Valeur du Portefeuille", f"${valeur:,.2f}")
+        col2.metric("P&L Latent", f"${pnl:+,.2f}", f"{pnl / max(valeur - pnl, 1e-9) * 100:+.2f}%")
+        col3.metric("Positions", len(positions))
+        
+        st.dataframe(positions.round(4), width='stretch')
+        
+        historique = self.portfolios.pnl_history(user)
+        if len(historique) > 1:
+            fig = px.line(historique, x='date', y='pnl', title='P&L Latent Intraday (USD)')
+            self.plotly_chart(fig)
+        
+        col1, col2 = st.columns(2)
+        for col, champ, titre in [(col1, 'categorie', 'Exposition par Catégorie'),
+                                  (col2, 'blockchain', 'Exposition par Blockchain')]:
+            with col:
+                groupes = {s: info[champ] for s, info in self.cryptos.items()}
+                exposition = self.portfolios.exposure(groupes, user=user)
+                fig = px.pie(names=exposition.index, values=exposition.values, title=titre)
+                self.plotly_chart(fig)
+    
+    def plotly_chart(self, fig):
+        """Affiche une figure Plotly en mesurant le temps de sérialisation et de rendu"""
+        with get_tracer().span('st.plotly_chart', rows=payload_size(fig)) as info:
+            if self.debug:
+                info['octets'] = len(fig.to_json())
+            st.plotly_chart(fig, width='stretch')
+    
+    def display_debug_panel(self, profiler=None):
+        """Décomposition du rerun courant, histogrammes cumulés et résultat du profilage"""
+        tracer = get_tracer()
+        spans = tracer.run_spans()
+        st.sidebar.markdown("---")
+        st.sidebar.markdown("### 🐞 DEBUG")
+        # Seuls les spans de premier niveau s'additionnent sans double compte
+        st.sidebar.metric("Durée du rerun (spans)", f"{spans.loc[spans['profondeur'] == 0, 'duree_ms'].sum():.0f} ms")
+        spans = spans.assign(span=[('· ' * d) + n for n, d in zip(spans['span'], spans['profondeur'])])
+        st.sidebar.dataframe(spans[['span', 'duree_ms', 'lignes', 'octets']].round(1), hide_index=True)
+        st.sidebar.markdown("**Cumul depuis le démarrage**")
+        st.sidebar.dataframe(tracer.summary().sort_values('moyenne_ms', ascending=False).round(1), hide_index=True)
+        stats = get_figure_cache().stats()
+        st.sidebar.caption(f"Cache de figures : {stats['figures']} figures, {stats['octets'] / 1e6:.1f} Mo, "
+                           f"{stats['hits']} hits / {stats['misses']} misses, {stats['evictions']} évictions")
+        stats = get_precompute_scheduler().stats()
+        st.sidebar.caption(f"Précalcul : {stats['en_file']} en file, {stats['en_cours']} en cours, "
+                           f"{stats['terminees']} terminés, {stats['annulees']} annulés, {stats['echecs']} échecs")
+        if self.snapshot_writer is not None:
+            stats = self.snapshot_writer.stats()
+            st.sidebar.caption(f"Instantané : démarrage {'à chaud' if self.warm_start else 'à froid'}, "
+                               f"{stats['ecritures']} écritures, {stats['octets'] / 1e6:.1f} Mo")
+        if tracer.metrics_error is not None:
+            st.sidebar.caption(f"Export /metrics désactivé ({tracer.metrics_error})")
+        if profiler is not None:
+            st.sidebar.markdown(f"**Profilage** ({profiler.samples} échantillons)")
+            st.sidebar.dataframe(profiler.top(15).round(1), hide_index=True)
+    
     def run_dashboard(self):
         """Exécute le dashboard complet"""
+        # Profileur optionnel, actif pendant tout le rerun
+        profiler = SamplingProfiler().start() if st.session_state.get('profilage') else None
+        
         # Mise à jour des données
-        self.update_live_data()
+        self.extend_historical_data()
+        self.schedule_precompute()
+        self.advance_live_data()
+        if self.api is not None:
+            self.api.publish(self.current_data, owner=self)
+        if self.snapshot_writer is not None:
+            self.snapshot_writer.maybe_save(self.snapshot_state)
+        self.revalue_portfolios()
         
         # Sidebar
         controls = self.create_sidebar()
+        self.debug = controls['debug']
         
         # Header
         self.display_header()
@@ -1585,30 +2449,49 @@ class CryptoDashboard:
         # Métriques clés
         self.display_key_metrics()
         
-        # Navigation par onglets
-        tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
+        # Navigation par onglets : en mode paresseux, seul l'onglet ouvert exécute son contenu
+        sections = [
             "📈 Vue d'Ensemble", 
             "⛓️ Blockchains", 
             "🔬 Technique", 
             "🌍 Marchés", 
             "⚠️ Risques", 
+            "💼 Portefeuille",
             "💡 Insights"
-        ])
+        ]
+        if controls['lazy_tabs']:
+            tabs = st.tabs(sections, key='section', on_change='rerun')
+        else:
+            tabs = st.tabs(sections)
+        tab1, tab2, tab3, tab4, tab5, tab7, tab6 = tabs
         
-        with tab1:
-            self.create_price_overview()
+        def is_open(tab):
+            # open vaut None quand les onglets ne suivent pas la sélection (tout est calculé)
+            return tab.open is not False
         
-        with tab2:
-            self.create_blockchain_analysis()
+        if is_open(tab1):
+            with tab1:
+                self.create_price_overview(controls)
         
-        with tab3:
-            self.create_technical_analysis()
+        if is_open(tab2):
+            with tab2:
+                self.create_blockchain_analysis()
         
-        with tab4:
-            self.create_market_analysis()
+        if is_open(tab3):
+            with tab3:
+                self.create_technical_analysis()
+        
+        if is_open(tab4):
+            with tab4:
+                self.create_market_analysis()
+        
+        if is_open(tab5):
+            with tab5:
+                self.create_risk_analysis()
         
-        with tab5:
-            self.create_risk_analysis()
+        if is_open(tab7):
+            with tab7:
+                self.create_portfolio_view()
         
         with tab6:
             st.markdown("## 💡 INSIGHTS STRATÉGIQUES")
@@ -1691,8 +2574,57 @@ class CryptoDashboard:
             - Partenariats stratégiques
             - Innovation continue
             """)
+        
+        if profiler is not None:
+            profiler.stop()
+        if controls['debug']:
+            self.display_debug_panel(profiler)
+
+def run_producer(path, bus_path=None, interval=1.0):
+    """Processus producteur : génère historique et ticks, les publie dans le plan de données et sur le bus"""
+    dashboard = CryptoDashboard(None if SEED is None else int(SEED))
+    plane = DataPlane.create(path, dashboard.cryptos.keys())
+    bus = TickBusPublisher(bus_path, dashboard.cryptos.keys()) if bus_path else None
+    api = get_data_api(dashboard.store) if API_PORT else None
+    if api is not None:
+        api.serve(int(API_PORT))
+    try:
+        while True:
+            dashboard.extend_historical_data()
+            ticks = dashboard.update_live_data()
+            dashboard.publish(plane)
+            if bus is not None:
+                bus.publish(ticks)
+            if api is not None:
+                api.publish(dashboard.current_data)
+            time.sleep(interval)
+    finally:
+        if bus is not None:
+            bus.close()
+        os.remove(path)
 
 # Exécution du dashboard
-if __name__ == "__main__":
-    dashboard = CryptoDashboard()
-    dashboard.run_dashboard()
\ No newline at end of file
+if __name__ == "__main__" and '--producer' in sys.argv:
+    run_producer(PLANE_PATH or os.path.join(DATA_DIR, 'plane.bin'), BUS_PATH)
+elif __name__ == "__main__":
+    tracer = get_tracer()
+    tracer.log_path = TRACE_LOG
+    if METRICS_PORT:
+        tracer.serve(int(METRICS_PORT))
+    tracer.begin_run()
+    
+    # Conserver le dashboard entre les reruns pour réutiliser les calculs mis en cache
+    if 'dashboard' in st.session_state:
+        st.session_state.dashboard.run_dashboard()
+    else:
+        # Premier rendu d'une session : construction (à chaud si un instantané existe) et premier rerun
+        with tracer.span('premier_rendu'):
+            dashboard = CryptoDashboard(None if SEED is None else int(SEED),
+                                        get_data_plane(PLANE_PATH) if PLANE_PATH else None,
+                                        get_tick_bus(BUS_PATH) if BUS_PATH else None)
+            if API_PORT:
+                # Une seule API par processus ; elle ne publie que l'état d'une session à la fois (voir publish)
+                dashboard.api = get_data_api(dashboard.store)
+                dashboard.api.serve(int(API_PORT))
+            st.session_state.dashboard = dashboard
+            dashboard.run_dashboard()
\ No newline at end of file
@@ -0,0 +1,25 @@
+"""Moteurs de calcul du dashboard crypto, indépendants de l'interface Streamlit"""
+from .correlation import CorrelationEngine, hierarchical_clusters
+from .stress_tests import SCENARIOS, StressTestEngine
+from .risk_scoring import RiskScorer, score_risks
+from .ring_buffer import RingBuffer
+from .portfolio import PortfolioBook, get_portfolio_book
+from .backtest import STRATEGIES, Backtester, moving_average_grid, rsi_grid
+from .patterns import PATTERNS, PatternDetector
+from .market_indices import INDICES, MarketIndexEngine
+from .index_builder import MARKET_CAP, MARKET_EQUAL, IndexBuilder
+from .storage import SegmentStore
+from .query import HistoryQuery
+from .tick_history import TickHistory
+from .sparklines import SparklineCache
+from .instrumentation import SamplingProfiler, Tracer, get_tracer, payload_size, traced
+from .figure_cache import FigureCache, get_figure_cache
+from .simulation import MarketSimulator
+from .transport import compact_figure
+from .replay import REPLAY_COLUMNS, SPEEDS, ReplayCursor, ReplayEngine
+from .data_plane import BAR_FIELDS, TICK_FIELDS, DataPlane, SharedTickHistory, get_data_plane
+from .tick_bus import TickBusPublisher, TickBusSubscriber, get_tick_bus
+from .export import EXPORT_FORMATS, export_file, frame_batches, stream_export
+from .precompute import PRECOMPUTED_CHARTS, PrecomputeScheduler, get_precompute_scheduler, technical_figure
+from .api import ARROW_STREAM, DataApi, get_data_api
+from .warm_start import FORMAT_VERSION, SnapshotWriter, get_snapshot_writer, read_snapshot, write_snapshot
@@ -0,0 +1,271 @@
+"""API HTTP en lecture seule (prix courants, historique, indicateurs) servie à côté du dashboard"""
+import gzip
+import hashlib
+import json
+import threading
+import weakref
+from urllib.parse import parse_qs
+
+import pandas as pd
+import pyarrow as pa
+import uvicorn
+from starlette.applications import Starlette
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+
+from .export import EXPORT_FORMATS, stream_export
+from .indicators import bollinger_bands, rsi
+from .query import HistoryQuery
+from .storage import TABLES
+
+ARROW_STREAM = 'application/vnd.apache.arrow.stream'
+JSON = 'application/json'
+GZIP_MIN_SIZE = 1024  # En dessous, la compression coûte plus qu'elle ne rapporte
+GZIP_LEVEL = 6
+API_TABLES = ('bars', 'ticks')  # Tables servies par /range et /export ; les positions restent privées
+
+_data_api = None
+
+
+def get_data_api(store):
+    """API partagée par les sessions du processus, créée au premier usage sur le stockage donné"""
+    global _data_api
+    if _data_api is None:
+        _data_api = DataApi(store)
+    return _data_api
+
+
+def encode_frame(frame, media_type):
+    """Corps d'une réponse : enregistrements JSON ou flux Arrow IPC"""
+    if media_type == ARROW_STREAM:
+        table = frame if isinstance(frame, pa.Table) else pa.Table.from_pandas(frame, preserve_index=False)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+    if isinstance(frame, pa.Table):
+        frame = frame.to_pandas()
+    return frame.to_json(orient='records', date_format='iso', date_unit='ms').encode()
+
+
+class DataApi:
+    """Expose en lecture seule l'état courant publié par le dashboard et le SegmentStore du processus.
+
+    - `/snapshot` : dernière ligne de chaque symbole publiée par `publish()`, par un seul
+      propriétaire (le producteur, ou une session du dashboard à la fois). Les corps
+      (JSON, Arrow, compressés ou non) sont encodés une seule fois par version et l'ETag
+      est une empreinte du contenu : une requête If-None-Match sur un instantané inchangé
+      reçoit un 304 sans corps.
+    - `/range` : lignes d'une table filtrées par symboles, dates, catégories et colonnes,
+      filtres poussés dans le lecteur Parquet comme HistoryQuery.
+    - `/indicators` : RSI, bandes de Bollinger et moyenne mobile d'un symbole.
+    - `/export` : mêmes filtres que `/range`, fichier CSV ou Parquet envoyé en flux.
+
+    Le format suit `?format=json|arrow` ou l'en-tête Accept, la compression gzip
+    l'en-tête Accept-Encoding. Le serveur tourne dans un thread de fond du processus.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.queries = {table: HistoryQuery(store, table) for table in API_TABLES}
+        self.version = 0
+        self.etag = None
+        self.requests = 0
+        self.not_modified = 0
+        self._frame = None
+        self._owner = None  # Référence faible vers la session dont l'état est publié
+        self._bodies = {}  # (format, gzip) -> corps encodé et en-têtes de l'instantané courant
+        self._lock = threading.Lock()
+        self._server = None
+        self.app = Starlette(routes=[
+            Route('/range', self.range),
+            Route('/indicators', self.indicators),
+            Route('/export', self.export),
+        ])
+
+    def publish(self, frame, owner=None):
+        """Publie l'état courant ; retourne True s'il a changé depuis la dernière publication.
+
+        Avec `owner`, seul le premier propriétaire encore vivant publie : en mode autonome,
+        chaque session simule ses propres prix et `/snapshot` ne doit pas alterner entre elles.
+        Quand la session propriétaire disparaît, la suivante qui publie prend le relais.
+        """
+        if owner is not None:
+            with self._lock:
+                current = self._owner() if self._owner is not None else None
+                if current is None:
+                    self._owner = weakref.ref(owner)
+                elif current is not owner:
+                    return False
+        digest = hashlib.blake2b(digest_size=12)
+        for column in ('prix', 'change_pct', 'volume_journalier'):
+            digest.update(frame[column].to_numpy().tobytes())
+        etag = f'"{digest.hexdigest()}"'
+        with self._lock:
+            if etag == self.etag:
+                return False
+            self._frame = frame.copy()
+            self._bodies = {}
+            self.etag = etag
+            self.version += 1
+        return True
+
+    def serve(self, port, host='127.0.0.1'):
+        """Démarre le serveur HTTP dans un thread de fond (une seule fois par processus)"""
+        if self._server is not None:
+            return self._server
+        config = uvicorn.Config(self, host=host, port=port, log_level='warning',
+                                access_log=False, lifespan='off')
+        self._server = uvicorn.Server(config)
+        threading.Thread(target=self._server.run, daemon=True).start()
+        return self._server
+
+    async def __call__(self, scope, receive, send):
+        """Application ASGI : /snapshot sur un chemin court, les autres routes via Starlette"""
+        if scope['type'] == 'http' and scope['path'] == '/snapshot':
+            await self.snapshot(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
+
+    async def snapshot(self, scope, receive, send):
+        # Sans objets Request / Response : en-têtes et corps de chaque variante préparés une fois par version
+        self.requests += 1
+        headers = dict(scope['headers'])
+        query = parse_qs(scope['query_string'].decode()) if scope['query_string'] else {}
+        media_type = self._negotiate(query.get('format', [None])[0], headers.get(b'accept', b'').decode())
+        compress = b'gzip' in headers.get(b'accept-encoding', b'')
+        if self.etag is None:
+            await self._error(503, "Aucun instantané publié")(scope, receive, send)
+            return
+        with self._lock:
+            etag = self.etag.encode()
+            match = headers.get(b'if-none-match')
+            if match is not None and (match == b'*' or etag in (tag.strip() for tag in match.split(b','))):
+                self.not_modified += 1
+                status, body, response_headers = 304, b'', self._headers(etag)
+            else:
+                status = 200
+                body, response_headers = self._variant(media_type, compress)
+        await send({'type': 'http.response.start', 'status': status, 'headers': response_headers})
+        await send({'type': 'http.response.body', 'body': body})
+
+    def _variant(self, media_type, compress):
+        """Corps et en-têtes de l'instantané courant dans un format, encodés au premier usage"""
+        key = (media_type, compress)
+        if key not in self._bodies:
+            body = encode_frame(self._frame, media_type)
+            if compress:
+                body = gzip.compress(body, GZIP_LEVEL)
+            headers = self._headers(self.etag.encode()) + [
+                (b'content-type', media_type.encode()), (b'content-length', str(len(body)).encode())]
+            if compress:
+                headers.append((b'content-encoding', b'gzip'))
+            self._bodies[key] = body, headers
+        return self._bodies[key]
+
+    @staticmethod
+    def _headers(etag):
+        return [(b'etag', etag), (b'cache-control', b'no-cache'), (b'vary', b'Accept, Accept-Encoding')]
+
+    def range(self, request):
+        # Fonction synchrone : Starlette l'exécute dans son pool de threads, la lecture Parquet ne bloque pas la boucle
+        self.requests += 1
+        try:
+            table, selection = self._selection(request.query_params)
+        except ValueError as error:
+            return self._error(400, str(error))
+        result = self.queries[table].arrow(**selection)
+        if result is None:
+            result = pa.table({})
+        result = result.sort_by(TABLES[table]['time']) if TABLES[table]['time'] in result.column_names else result
+        return self._respond(request, result)
+
+    def export(self, request):
+        # Réponse en flux : chaque lot est lu, encodé puis envoyé avant la lecture du suivant
+        self.requests += 1
+        fmt = request.query_params.get('format', 'csv')
+        if fmt not in EXPORT_FORMATS:
+            return self._error(400, f"Format d'export inconnu : {fmt}")
+        try:
+            table, selection = self._selection(request.query_params)
+        except ValueError as error:
+            return self._error(400, str(error))
+        return StreamingResponse(stream_export(self.queries[table].batches(**selection), fmt),
+                                 media_type=EXPORT_FORMATS[fmt],
+                                 headers={'Content-Disposition': f'attachment; filename="{table}.{fmt}"'})
+
+    def indicators(self, request):
+        self.requests += 1
+        params = request.query_params
+        symbol = params.get('symbol')
+        if not symbol:
+            return self._error(400, "Paramètre symbol manquant")
+        try:
+            start, end = self._dates(params)
+            window = int(params.get('window', 14))
+            bands = int(params.get('bands', 20))
+        except ValueError as error:
+            return self._error(400, str(error))
+        frame = self.queries['bars'].scan(symbols=[symbol], start=start, end=end, columns=['date', 'prix'])
+        frame = frame.sort_values('date', kind='stable').reset_index(drop=True)
+        upper, lower = bollinger_bands(frame['prix'], window=bands)
+        frame['rsi'] = rsi(frame['prix'], window=window)
+        frame['moyenne_mobile'] = frame['prix'].rolling(bands).mean()
+        frame['bollinger_haute'] = upper
+        frame['bollinger_basse'] = lower
+        return self._respond(request, frame)
+
+    def _respond(self, request, frame):
+        media_type = self._media_type(request)
+        body = encode_frame(frame, media_type)
+        headers = {'Vary': 'Accept, Accept-Encoding'}
+        if len(body) >= GZIP_MIN_SIZE and 'gzip' in request.headers.get('accept-encoding', ''):
+            body = gzip.compress(body, GZIP_LEVEL)
+            headers['Content-Encoding'] = 'gzip'
+        return Response(body, media_type=media_type, headers=headers)
+
+    @classmethod
+    def _media_type(cls, request):
+        return cls._negotiate(request.query_params.get('format'), request.headers.get('accept', ''))
+
+    @staticmethod
+    def _negotiate(requested, accept):
+        """Type de contenu : paramètre `format` prioritaire, sinon en-tête Accept, JSON par défaut"""
+        if requested is not None:
+            return ARROW_STREAM if requested == 'arrow' else JSON
+        return ARROW_STREAM if ARROW_STREAM in accept else JSON
+
+    def _selection(self, params):
+        """Table et filtres (symboles, dates, catégories, colonnes) d'une requête ; ValueError si invalides"""
+        table = params.get('table', 'bars')
+        if table not in API_TABLES:
+            raise ValueError(f"Table inconnue : {table}")
+        start, end = self._dates(params)
+        columns, categories = self._list(params, 'columns'), self._list(params, 'categories')
+        # Colonnes vérifiées sur le schéma stocké : une colonne inconnue est une erreur du client, pas d'Arrow
+        schema = self.store.schema(table)
+        if schema is not None:
+            unknown = [c for c in columns or () if c not in schema.names]
+            if unknown:
+                raise ValueError(f"Colonnes inconnues : {', '.join(unknown)} (disponibles : {', '.join(schema.names)})")
+            if categories is not None and 'categorie' not in schema.names:
+                raise ValueError(f"La table {table} n'a pas de catégorie")
+        return table, {'symbols': self._list(params, 'symbols'), 'start': start, 'end': end,
+                       'categories': categories, 'columns': columns}
+
+    @staticmethod
+    def _list(params, name):
+        value = params.get(name)
+        return [v for v in value.split(',') if v] if value else None
+
+    @staticmethod
+    def _dates(params):
+        try:
+            return tuple(pd.Timestamp(params[name]) if params.get(name) else None for name in ('start', 'end'))
+        except ValueError:
+            raise ValueError("Date invalide (format attendu : AAAA-MM-JJ)")
+
+    @staticmethod
+    def _error(status, message):
+        return Response(json.dumps({'erreur': message}, ensure_ascii=False).encode(),
+                        status_code=status, media_type=JSON)
@@ -0,0 +1,145 @@
+"""Backtests vectorisés de stratégies sur la matrice des prix historiques"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from .indicators import rsi
+from .parallel import SharedArray, get_process_pool
+
+# Paramètres de chaque stratégie, dans l'ordre des colonnes de la grille
+STRATEGIES = {
+    'Croisement MM': ('mm_rapide', 'mm_lente'),
+    'Bandes RSI': ('fenetre_rsi', 'seuil_achat', 'seuil_vente'),
+}
+
+ANNUALISATION = np.sqrt(365)  # Les cryptomonnaies cotent tous les jours
+CHUNK_SIZE = 16
+# En dessous de ce nombre de combinaisons, le calcul reste dans le processus courant
+POOL_MIN_COMBOS = 200
+
+
+def moving_average_grid(fast, slow):
+    """Grille des croisements de moyennes mobiles (rapide < lente)"""
+    fast, slow = np.meshgrid(np.asarray(fast), np.asarray(slow), indexing='ij')
+    grid = np.column_stack([fast.ravel(), slow.ravel()])
+    return grid[grid[:, 0] < grid[:, 1]]
+
+
+def rsi_grid(windows, buy_levels, sell_levels):
+    """Grille des bandes RSI (seuil d'achat < seuil de vente)"""
+    mesh = np.meshgrid(np.asarray(windows), np.asarray(buy_levels), np.asarray(sell_levels), indexing='ij')
+    grid = np.column_stack([m.ravel() for m in mesh])
+    return grid[grid[:, 1] < grid[:, 2]]
+
+
+def _moving_averages(prices, windows):
+    """Moyennes mobiles simples par sommes cumulées, NaN pendant la période de chauffe"""
+    cumsum = np.vstack([np.zeros((1, prices.shape[1])), np.cumsum(prices, axis=0)])
+    result = {}
+    for w in np.unique(windows).astype(int):
+        ma = np.full(prices.shape, np.nan)
+        ma[w - 1:] = (cumsum[w:] - cumsum[:-w]) / w
+        result[w] = ma
+    return result
+
+
+def _forward_fill(signals):
+    """Propage la dernière valeur non NaN le long de l'axe du temps (axe 1), 0 avant le premier signal"""
+    t = np.arange(signals.shape[1]).reshape(1, -1, 1)
+    last = np.where(np.isnan(signals), 0, t)
+    np.maximum.accumulate(last, axis=1, out=last)
+    filled = np.take_along_axis(signals, last, axis=1)
+    return np.nan_to_num(filled, nan=0.0)
+
+
+def strategy_positions(strategy, params, prices):
+    """Positions (0 ou 1) décidées à la clôture de chaque jour, pour chaque combinaison de paramètres"""
+    if strategy == 'Croisement MM':
+        mas = _moving_averages(prices, params[:, :2])
+        return np.stack([mas[int(f)] > mas[int(s)] for f, s in params[:, :2]]).astype(np.float32)
+
+    if strategy == 'Bandes RSI':
+        frame = pd.DataFrame(prices)
+        rsis = {int(w): rsi(frame, window=int(w)).to_numpy() for w in np.unique(params[:, 0])}
+        signals = np.full((len(params),) + prices.shape, np.nan, dtype=np.float32)
+        for g, (w, low, high) in enumerate(params):
+            values = rsis[int(w)]
+            signals[g][values < low] = 1.0   # Survente : entrée
+            signals[g][values > high] = 0.0  # Surachat : sortie
+        return _forward_fill(signals)
+
+    raise ValueError(f"Stratégie inconnue: {strategy}")
+
+
+def evaluate_positions(positions, returns, fees):
+    """Métriques de performance par (combinaison, symbole) pour des positions prises à la clôture"""
+    # La position décidée en t est détenue pendant le rendement de t+1
+    held = np.zeros_like(positions)
+    held[:, 1:] = positions[:, :-1]
+    turnover = np.abs(np.diff(held, axis=1, prepend=0))
+    strat = held * returns - turnover * fees
+
+    equity = np.cumprod(1 + strat, axis=1)
+    peaks = np.maximum.accumulate(equity, axis=1)
+    std = strat.std(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.where(std > 0, strat.mean(axis=1) / std * ANNUALISATION, 0.0)
+
+    return {
+        'rendement': (equity[:, -1] - 1) * 100,
+        'sharpe': sharpe,
+        'drawdown_max': (equity / peaks - 1).min(axis=1) * 100,
+        'transactions': turnover.sum(axis=1),
+        'exposition': held.mean(axis=1) * 100,
+    }
+
+
+def _run_chunk(args):
+    """Évalue un lot de combinaisons sur les prix partagés (exécuté dans un worker)"""
+    strategy, params, prices_desc, fees_desc = args
+    prices = np.asarray(SharedArray.attach(prices_desc))
+    fees = np.asarray(SharedArray.attach(fees_desc))
+    returns = np.zeros(prices.shape, dtype=np.float32)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns[1:] = np.nan_to_num(prices[1:] / prices[:-1] - 1)
+    return evaluate_positions(strategy_positions(strategy, params, prices), returns, fees.astype(np.float32))
+
+
+class Backtester:
+    """Lance une stratégie sur tous les symboles et toute une grille de paramètres.
+
+    Les prix et les frais sont placés une seule fois en mémoire partagée ; les workers du
+    pool s'y attachent sans copie et évaluent chacun un lot de combinaisons.
+    """
+
+    def __init__(self, prices, spreads):
+        self.prices = prices.ffill().bfill()
+        self.symbols = list(prices.columns)
+        # Coût d'un aller ou d'un retour : la moitié du spread (exprimé en %)
+        self.fees = (pd.Series(spreads).reindex(self.symbols).fillna(0) / 100 / 2).to_numpy()
+
+    def run(self, strategy, grid, chunk_size=CHUNK_SIZE, parallel=None):
+        """Retourne une ligne de métriques par (combinaison de paramètres, symbole)"""
+        grid = np.atleast_2d(np.asarray(grid, dtype=float))
+        if parallel is None:
+            parallel = len(grid) >= POOL_MIN_COMBOS and (os.cpu_count() or 1) > 1
+
+        with SharedArray.from_array(self.prices.to_numpy(dtype=np.float64), prefix='backtest_') as prices, \
+                SharedArray.from_array(self.fees, prefix='backtest_') as fees:
+            jobs = [(strategy, grid[i:i + chunk_size], prices.descriptor, fees.descriptor)
+                    for i in range(0, len(grid), chunk_size)]
+            if parallel:
+                chunks = list(get_process_pool().map(_run_chunk, jobs))
+            else:
+                chunks = [_run_chunk(job) for job in jobs]
+
+        metrics = {k: np.concatenate([c[k] for c in chunks]).ravel() for k in chunks[0]}
+        n_symbols = len(self.symbols)
+        results = pd.DataFrame({
+            name: np.repeat(grid[:, i], n_symbols) for i, name in enumerate(STRATEGIES[strategy])
+        })
+        results['symbole'] = np.tile(self.symbols, len(grid))
+        for key, values in metrics.items():
+            results[key] = values
+        return results
@@ -0,0 +1,166 @@
+"""Matrices de corrélation et de covariance glissantes entre cryptomonnaies"""
+import numpy as np
+import pandas as pd
+
+
+class CorrelationEngine:
+    """Calcule les matrices de covariance/corrélation des rendements sur plusieurs fenêtres.
+
+    Les sommes glissantes (somme des rendements et produit croisé) sont tenues à jour
+    pour chaque fenêtre : l'ajout d'une journée ne coûte qu'une mise à jour de rang 1
+    au lieu d'un recalcul complet.
+    """
+
+    def __init__(self, windows=(30, 90, 365), exact_every=365):
+        self.windows = tuple(windows)
+        # Nombre d'ajouts après lequel une fenêtre est recalculée exactement (dérive numérique)
+        self.exact_every = exact_every
+        self.symbols = []
+        self.last_date = None
+        self.n_prices = 0
+        self._returns = np.empty((0, 0))
+        self._last_prices = None
+        self._sums = {}
+        self._results = {}
+
+    def fit(self, prices):
+        """Recalcule toutes les fenêtres à partir d'une matrice de prix dates x symboles"""
+        values = prices.to_numpy(dtype=float)
+        self.symbols = list(prices.columns)
+        self.last_date = prices.index[-1] if len(prices) else None
+        self.n_prices = len(prices)
+        self._returns = self._log_returns(values)
+        self._last_prices = values[-1].copy() if len(values) else None
+        self._sums = {w: self._exact_sums(w) for w in self.windows}
+        self._results = {}
+        return self
+
+    def append(self, new_prices):
+        """Intègre des journées ajoutées à la fin de l'historique"""
+        if len(new_prices) == 0:
+            return self
+        values = new_prices.to_numpy(dtype=float)
+        if self._last_prices is not None:
+            values = np.vstack([self._last_prices, values])
+        new_returns = self._log_returns(values)
+        start = len(self._returns)
+        self._returns = np.vstack([self._returns, new_returns]) if start else new_returns
+
+        for w in self.windows:
+            sums = self._sums[w]
+            sums['appends'] += len(new_returns)
+            if self.exact_every and sums['appends'] >= self.exact_every:
+                self._sums[w] = self._exact_sums(w)
+                continue
+            # Rendements qui entrent dans la fenêtre et ceux qui en sortent
+            entering = self._returns[max(start, len(self._returns) - w):]
+            leaving = self._returns[max(0, start - w):min(start, max(0, len(self._returns) - w))]
+            sums['s1'] += entering.sum(axis=0) - leaving.sum(axis=0)
+            sums['s2'] += entering.T @ entering - leaving.T @ leaving
+            sums['n'] = min(w, len(self._returns))
+
+        self._last_prices = values[-1].copy()
+        self.last_date = new_prices.index[-1]
+        self.n_prices += len(new_prices)
+        self._results = {}
+        return self
+
+    def sync(self, prices):
+        """Met à jour le moteur à partir de l'historique complet, en incrémental si possible"""
+        appendable = (
+            self.last_date is not None
+            and list(prices.columns) == self.symbols
+            and len(prices) >= self.n_prices
+            and prices.index[self.n_prices - 1] == self.last_date
+        )
+        if appendable:
+            return self.append(prices.iloc[self.n_prices:])
+        return self.fit(prices)
+
+    def mean_returns(self, window):
+        """Rendement logarithmique journalier moyen de chaque symbole sur la fenêtre"""
+        sums = self._sums[window]
+        values = sums['s1'] / sums['n'] if sums['n'] else np.zeros(len(self.symbols))
+        return pd.Series(values, index=self.symbols)
+
+    def covariance(self, window):
+        """Matrice de covariance des rendements journaliers sur la fenêtre"""
+        return self._result(window)[0]
+
+    def correlation(self, window):
+        """Matrice de corrélation des rendements journaliers sur la fenêtre"""
+        return self._result(window)[1]
+
+    def _result(self, window):
+        if window not in self._sums:
+            raise ValueError(f"Fenêtre non suivie: {window} (disponibles: {self.windows})")
+        if window not in self._results:
+            sums = self._sums[window]
+            n = sums['n']
+            if n < 2:
+                nan = np.full((len(self.symbols), len(self.symbols)), np.nan)
+                cov = corr = nan
+            else:
+                mean = sums['s1'] / n
+                cov = (sums['s2'] - n * np.outer(mean, mean)) / (n - 1)
+                std = np.sqrt(np.clip(np.diag(cov), 0, None))
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    corr = np.clip(cov / np.outer(std, std), -1.0, 1.0)
+                np.fill_diagonal(corr, np.where(std > 0, 1.0, np.nan))
+            self._results[window] = (
+                pd.DataFrame(cov, index=self.symbols, columns=self.symbols),
+                pd.DataFrame(corr, index=self.symbols, columns=self.symbols),
+            )
+        return self._results[window]
+
+    def _exact_sums(self, window):
+        block = self._returns[-window:] if len(self._returns) else np.zeros((0, len(self.symbols)))
+        return {
+            's1': block.sum(axis=0),
+            's2': block.T @ block,
+            'n': len(block),
+            'appends': 0,
+        }
+
+    @staticmethod
+    def _log_returns(values):
+        if len(values) < 2:
+            return np.zeros((0, values.shape[1] if values.ndim == 2 else 0))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = np.diff(np.log(values), axis=0)
+        # Les journées sans cotation comptent comme un rendement nul
+        return np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def hierarchical_clusters(corr, threshold=0.5):
+    """Regroupe les actifs par liaison moyenne sur la distance 1 - corrélation.
+
+    Retourne la liste des groupes (listes de symboles), du plus grand au plus petit,
+    et l'ordre des symboles qui place côte à côte les actifs d'un même groupe.
+    """
+    symbols = list(corr.index)
+    n = len(symbols)
+    dist = 1.0 - np.nan_to_num(corr.to_numpy(dtype=float), nan=0.0)
+    np.fill_diagonal(dist, np.inf)
+    sizes = np.ones(n)
+    members = [[i] for i in range(n)]
+    active = np.ones(n, dtype=bool)
+
+    while active.sum() > 1:
+        i, j = divmod(int(np.argmin(dist)), n)
+        if dist[i, j] > threshold:
+            break
+        # Formule de Lance-Williams pour la liaison moyenne
+        merged = (sizes[i] * dist[i] + sizes[j] * dist[j]) / (sizes[i] + sizes[j])
+        dist[i, :] = merged
+        dist[:, i] = merged
+        dist[i, i] = np.inf
+        dist[j, :] = np.inf
+        dist[:, j] = np.inf
+        active[j] = False
+        sizes[i] += sizes[j]
+        members[i] = members[i] + members[j]
+
+    groups = sorted((members[i] for i in np.flatnonzero(active)), key=len, reverse=True)
+    order = [symbols[k] for group in groups for k in group]
+    return [[symbols[k] for k in group] for group in groups], order
@@ -0,0 +1,297 @@
+"""Plan de données partagé entre processus : historique et ticks dans un fichier projeté en mémoire"""
+import mmap
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+MAGIC = 0x43525950544f3031  # "CRYPTO01"
+HEADER_SLOTS = 16
+# En-tête : magic, séquence, symboles, capacité jours, jours écrits, capacité ticks, ticks écrits
+MAGIC_SLOT, SEQ_SLOT, SYMBOLS_SLOT, DAY_CAP_SLOT, DAYS_SLOT, TICK_CAP_SLOT, TICKS_SLOT = range(7)
+SYMBOL_WIDTH = 32
+BAR_FIELDS = ('prix', 'volume', 'volatilite_jour')
+TICK_FIELDS = ('prix', 'change_pct', 'volume_journalier')
+
+_data_plane = None
+
+
+def get_data_plane(path):
+    """Plan de données du processus, attaché au premier usage (None si le producteur ne l'a pas créé)"""
+    global _data_plane
+    if _data_plane is None and os.path.exists(path):
+        _data_plane = DataPlane.attach(path)
+    return _data_plane
+
+
+def _layout(n_symbols, day_capacity, tick_capacity):
+    # (nom, dtype, forme) dans l'ordre du fichier, chaque bloc aligné sur 64 octets
+    rows = day_capacity * n_symbols
+    return [
+        ('header', np.int64, (HEADER_SLOTS,)),
+        ('symbols', f'S{SYMBOL_WIDTH}', (n_symbols,)),
+        ('dates', np.int64, (rows,)),
+        ('bars', np.float64, (len(BAR_FIELDS), rows)),
+        ('tick_times', np.int64, (2 * tick_capacity,)),
+        ('ticks', np.float64, (2 * tick_capacity, n_symbols, len(TICK_FIELDS))),
+    ]
+
+
+def _categorical(labels, codes):
+    # Catégories dans l'ordre des symboles, comme l'ordre d'apparition d'une colonne texte
+    categories = list(dict.fromkeys(labels))
+    lookup = np.array([categories.index(label) for label in labels], dtype=np.int8)
+    return pd.Categorical.from_codes(lookup[codes], categories)
+
+
+class DataPlane:
+    """Historique journalier et tampon de ticks dans un fichier projeté en mémoire, écrit par un seul producteur.
+
+    Le producteur crée le fichier et y ajoute jours et ticks ; les workers l'ouvrent en
+    lecture seule et obtiennent des vues NumPy sans copie : la mémoire physique est celle
+    d'une seule instance, quel que soit le nombre de processus. L'historique est en format
+    long (jour puis symbole), ajouté sans jamais réécrire les lignes publiées. Les ticks
+    sont écrits deux fois (positions i et i + capacité) comme dans le RingBuffer. Un compteur
+    de séquence, impair pendant une écriture, permet aux lecteurs de vérifier qu'une lecture
+    n'a pas croisé d'écriture et de la recommencer sinon.
+    """
+
+    def __init__(self, path, buffer, writable):
+        self.path = path
+        self.writable = writable
+        self._mmap = buffer
+        header = np.frombuffer(buffer, dtype=np.int64, count=HEADER_SLOTS)
+        if header[MAGIC_SLOT] != MAGIC:
+            raise ValueError(f"{path} n'est pas un plan de données")
+        self._arrays = {}
+        offset = 0
+        layout = _layout(int(header[SYMBOLS_SLOT]), int(header[DAY_CAP_SLOT]), int(header[TICK_CAP_SLOT]))
+        for name, dtype, shape in layout:
+            dtype = np.dtype(dtype)
+            count = int(np.prod(shape))
+            self._arrays[name] = np.frombuffer(buffer, dtype=dtype, count=count, offset=offset).reshape(shape)
+            offset += -(-count * dtype.itemsize // 64) * 64
+        self.header = self._arrays['header']
+        self.symbols = [s.decode() for s in self._arrays['symbols']]
+        self.day_capacity = int(self.header[DAY_CAP_SLOT])
+        self.tick_capacity = int(self.header[TICK_CAP_SLOT])
+        self._frame = (None, None)  # (jours, DataFrame) partagé par les sessions du processus
+
+    @classmethod
+    def create(cls, path, symbols, day_capacity=4096, tick_capacity=4096):
+        """Crée (ou remplace) le fichier du plan ; réservé au processus producteur"""
+        symbols = list(symbols)
+        size = 0
+        for _, dtype, shape in _layout(len(symbols), day_capacity, tick_capacity):
+            size += -(-int(np.prod(shape)) * np.dtype(dtype).itemsize // 64) * 64
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.truncate(size)
+        with open(tmp, 'r+b') as f:
+            buffer = mmap.mmap(f.fileno(), size)
+        header = np.frombuffer(buffer, dtype=np.int64, count=HEADER_SLOTS)
+        header[[MAGIC_SLOT, SYMBOLS_SLOT, DAY_CAP_SLOT, TICK_CAP_SLOT]] = (
+            MAGIC, len(symbols), day_capacity, tick_capacity)
+        plane = cls(path, buffer, writable=True)
+        plane._arrays['symbols'][:] = [s.encode()[:SYMBOL_WIDTH] for s in symbols]
+        plane.symbols = symbols
+        plane._arrays['ticks'].fill(np.nan)
+        buffer.flush()
+        # Les workers ne voient le fichier qu'une fois l'en-tête complet
+        os.replace(tmp, path)
+        return plane
+
+    @classmethod
+    def attach(cls, path):
+        """Ouvre le plan en lecture seule : toutes les vues renvoyées sont non modifiables"""
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(path, buffer, writable=False)
+
+    @property
+    def sequence(self):
+        """Compteur de séquence : pair au repos, impair pendant une écriture"""
+        return int(self.header[SEQ_SLOT])
+
+    @property
+    def n_days(self):
+        return int(self.header[DAYS_SLOT])
+
+    @property
+    def tick_count(self):
+        """Nombre total de ticks publiés depuis la création"""
+        return int(self.header[TICKS_SLOT])
+
+    @property
+    def nbytes(self):
+        return len(self._mmap)
+
+    def consistent(self, read, retries=1000):
+        """Exécute `read()` jusqu'à obtenir un résultat qui n'a croisé aucune écriture"""
+        for _ in range(retries):
+            before = self.sequence
+            if before % 2 == 0:
+                result = read()
+                if self.sequence == before:
+                    return result
+            time.sleep(0)
+        raise TimeoutError("Le plan de données est en cours d'écriture")
+
+    def append_bars(self, frame):
+        """Publie les jours de `frame` (date, symbole et champs journaliers) postérieurs au dernier jour écrit"""
+        self._check_writable()
+        n = len(self.symbols)
+        if self.n_days:
+            last = np.datetime64(int(self._arrays['dates'][self.n_days * n - 1]), 'ns')
+            frame = frame[frame['date'] > last]
+        if frame.empty:
+            return 0
+        # Grille complète jour x symbole, dans l'ordre des symboles du plan
+        wide = frame.pivot_table(index='date', columns='symbole', values=list(BAR_FIELDS), aggfunc='last')
+        days = len(wide)
+        start = self.n_days
+        if start + days > self.day_capacity:
+            raise ValueError(f"Capacité du plan dépassée ({self.day_capacity} jours)")
+        rows = slice(start * n, (start + days) * n)
+        dates = pd.DatetimeIndex(wide.index).as_unit('ns').asi8
+        # Lignes au-delà de n_days : invisibles des lecteurs tant que le compteur n'avance pas
+        self._arrays['dates'][rows] = np.repeat(dates, n)
+        for i, field in enumerate(BAR_FIELDS):
+            self._arrays['bars'][i, rows] = wide[field].reindex(columns=self.symbols).to_numpy().ravel()
+        self._write(lambda: self.header.__setitem__(DAYS_SLOT, start + days))
+        return days
+
+    def record_tick(self, timestamp_ns, values):
+        """Publie un tick : matrice symboles x champs (prix, variation, volume)"""
+        self._check_writable()
+
+        def write():
+            count = self.tick_count
+            i = count % self.tick_capacity
+            for j in (i, i + self.tick_capacity):
+                self._arrays['ticks'][j] = values
+                self._arrays['tick_times'][j] = timestamp_ns
+            self.header[TICKS_SLOT] = count + 1
+        self._write(write)
+
+    def history(self, field, days=None):
+        """Vue (jours x symboles) d'un champ journalier sur les `days` premiers jours, et index des dates, sans copie"""
+        n = len(self.symbols)
+        days = self.n_days if days is None else days
+        dates = pd.DatetimeIndex(self._arrays['dates'][:days * n:n].view('M8[ns]'))
+        values = self._arrays['bars'][BAR_FIELDS.index(field), :days * n].reshape(days, n)
+        return dates, self._readonly(values)
+
+    def history_frame(self, names, categories):
+        """Historique au format long de la version courante, colonnes numériques sans copie"""
+        days = self.n_days
+        if self._frame[0] != days:
+            n = len(self.symbols)
+            rows = days * n
+            # Colonnes texte en catégories : un code d'un octet par ligne au lieu d'un objet Python
+            codes = np.tile(np.arange(n, dtype=np.int8), days)
+            columns = {
+                'date': self._readonly(self._arrays['dates'][:rows]).view('M8[ns]'),
+                'symbole': _categorical(self.symbols, codes),
+                'nom': _categorical([names[s] for s in self.symbols], codes),
+                'categorie': _categorical([categories[s] for s in self.symbols], codes),
+            }
+            for i, field in enumerate(BAR_FIELDS):
+                columns[field] = self._readonly(self._arrays['bars'][i, :rows])
+            self._frame = (days, pd.DataFrame(columns, copy=False))
+        return self._frame[1]
+
+    def ticks_since(self, count):
+        """Ticks publiés après le numéro `count` (au plus la capacité), au format long, et nouveau numéro"""
+        def read():
+            total = self.tick_count
+            new = min(total - count, self.tick_capacity)
+            if new <= 0:
+                return None, total
+            end = total % self.tick_capacity + self.tick_capacity
+            times = self._arrays['tick_times'][end - new:end].copy()
+            values = self._arrays['ticks'][end - new:end].copy()
+            return (times, values), total
+        data, total = self.consistent(read)
+        if data is None:
+            return pd.DataFrame(columns=['timestamp', 'symbole'] + list(TICK_FIELDS)), total
+        times, values = data
+        n = len(self.symbols)
+        frame = pd.DataFrame(values.reshape(-1, len(TICK_FIELDS)), columns=list(TICK_FIELDS))
+        frame.insert(0, 'symbole', np.tile(self.symbols, len(times)))
+        frame.insert(0, 'timestamp', np.repeat(times, n).view('M8[ns]'))
+        return frame.dropna(subset=['prix']).reset_index(drop=True), total
+
+    def tick_view(self, n=None):
+        """Vues (horodatages, ticks x symboles x champs) sur les n derniers ticks ; à valider par `sequence`"""
+        available = min(self.tick_count, self.tick_capacity)
+        n = available if n is None else max(0, min(n, available))
+        end = self.tick_count % self.tick_capacity + self.tick_capacity
+        return (self._readonly(self._arrays['tick_times'][end - n:end]),
+                self._readonly(self._arrays['ticks'][end - n:end]))
+
+    def _write(self, update):
+        self.header[SEQ_SLOT] += 1
+        try:
+            update()
+        finally:
+            self.header[SEQ_SLOT] += 1
+
+    def _check_writable(self):
+        if not self.writable:
+            raise PermissionError("Plan de données ouvert en lecture seule")
+
+    @staticmethod
+    def _readonly(view):
+        view = view.view()
+        view.flags.writeable = False
+        return view
+
+
+class SharedTickHistory:
+    """Historique intraday d'un worker, lu directement dans le tampon de ticks du plan de données.
+
+    Même interface de lecture que TickHistory, sans mémoire propre : les ticks sont
+    enregistrés par le producteur, `record` et `restore` n'ont donc rien à faire.
+    """
+
+    def __init__(self, plane):
+        self.plane = plane
+        self.symbols = plane.symbols
+        self._symbol_index = {s: i for i, s in enumerate(self.symbols)}
+
+    def __len__(self):
+        return min(self.plane.tick_count, self.plane.tick_capacity)
+
+    @property
+    def capacity(self):
+        return self.plane.tick_capacity
+
+    @property
+    def version(self):
+        return self.plane.tick_count
+
+    @property
+    def nbytes(self):
+        return 0
+
+    def record(self, prices, volumes, timestamp_ns=None):
+        pass
+
+    def restore(self, ticks):
+        return len(self)
+
+    def last(self, n=None, symbol=None):
+        """Vues (horodatages, prix, volumes) sur les n derniers ticks, d'un symbole ou de tous"""
+        times, data = self.plane.tick_view(n)
+        prix, volume = TICK_FIELDS.index('prix'), TICK_FIELDS.index('volume_journalier')
+        if symbol is None:
+            return times, data[:, :, prix], data[:, :, volume]
+        i = self._symbol_index[symbol]
+        return times, data[:, i, prix], data[:, i, volume]
+
+    def frame(self, symbol, n=None):
+        """Ticks d'un symbole sous forme de DataFrame (date, prix, volume), copiés sans écriture concurrente"""
+        times, prices, volumes = self.plane.consistent(lambda: tuple(a.copy() for a in self.last(n, symbol)))
+        return pd.DataFrame({'date': pd.to_datetime(times), 'prix': prices, 'volume': volumes})
@@ -0,0 +1,90 @@
+"""Export en flux des vues filtrées (CSV, Parquet) : les lots Arrow sont encodés et écrits au fil de l'eau"""
+import os
+import tempfile
+
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+# Format -> type MIME du fichier exporté
+EXPORT_FORMATS = {'csv': 'text/csv', 'parquet': 'application/vnd.apache.parquet'}
+
+
+class _ChunkSink:
+    """Fichier en écriture seule dont on récupère les octets écrits depuis la dernière lecture"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def frame_batches(frame):
+    """Lots Arrow d'un DataFrame déjà calculé (tableaux de risque, signaux...)"""
+    return pa.Table.from_pandas(frame, preserve_index=False).to_batches()
+
+
+def stream_csv(batches):
+    """Générateur d'octets CSV : en-tête avec le premier lot, puis un morceau par lot"""
+    header = True
+    for batch in batches:
+        sink = pa.BufferOutputStream()
+        pacsv.write_csv(batch, sink, pacsv.WriteOptions(include_header=header))
+        header = False
+        yield sink.getvalue().to_pybytes()
+
+
+def stream_parquet(batches):
+    """Générateur d'octets Parquet : un groupe de lignes par lot, pied de fichier à la fin"""
+    sink = _ChunkSink()
+    writer = None
+    for batch in batches:
+        if writer is None:
+            writer = pq.ParquetWriter(sink, batch.schema, compression='zstd')
+        writer.write_batch(batch)
+        yield sink.drain()
+    if writer is not None:
+        writer.close()
+        yield sink.drain()
+
+
+def stream_export(batches, fmt):
+    """Octets du fichier exporté au format donné, produits au fur et à mesure de la lecture des lots"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Format d'export inconnu : {fmt}")
+    return stream_csv(batches) if fmt == 'csv' else stream_parquet(batches)
+
+
+def export_file(batches, fmt):
+    """Fichier d'export écrit sur disque lot par lot, rouvert en lecture (io.BufferedReader).
+
+    `st.download_button` lit ce fichier en entier en mémoire avant de le servir : seul
+    l'encodage est borné ici, le fichier final passe par la mémoire de Streamlit. Pour
+    les gros volumes, la route `/export` de l'API envoie le flux sans le matérialiser.
+    """
+    with tempfile.NamedTemporaryFile(suffix=f'.{fmt}', delete=False) as output:
+        for chunk in stream_export(batches, fmt):
+            output.write(chunk)
+    reader = open(output.name, 'rb')
+    # Le fichier reste lisible par le descripteur ouvert et disparaît à sa fermeture
+    os.unlink(output.name)
+    return reader
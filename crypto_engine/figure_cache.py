@@ -0,0 +1,128 @@
+"""Cache de figures Plotly sérialisées, partagé par toutes les sessions du processus"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import plotly.graph_objects as go
+import plotly.io as pio
+
+MAX_BYTES = 256 * 1024 * 1024
+
+_figure_cache = None
+
+
+def get_figure_cache():
+    """Cache de figures partagé par les sessions, créé au premier usage"""
+    global _figure_cache
+    if _figure_cache is None:
+        _figure_cache = FigureCache()
+    return _figure_cache
+
+
+def param_hash(params):
+    """Empreinte stable des paramètres d'un graphique (valeurs des widgets)"""
+    return hashlib.blake2b(repr(params).encode(), digest_size=12).hexdigest()
+
+
+class FigureCache:
+    """LRU de figures sérialisées en JSON, indexé par (graphique, empreinte des paramètres, filigrane des données).
+
+    Le JSON est immuable et mesurable : il se partage sans risque entre sessions et sa
+    taille sert au plafond mémoire. Quand plusieurs sessions demandent la même figure
+    absente, une seule la construit, les autres attendent son résultat.
+    """
+
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._building = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_json(self, chart_id, params, watermark, builder):
+        """JSON de la figure, construite par `builder()` si elle n'est pas en cache"""
+        key = (chart_id, param_hash(params), watermark)
+        while True:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._entries[key]
+                event = self._building.get(key)
+                if event is None:
+                    event = self._building[key] = threading.Event()
+                    self.misses += 1
+                    break
+            # Une autre session construit déjà cette figure
+            event.wait()
+
+        try:
+            payload = pio.to_json(builder(), validate=False)
+            with self._lock:
+                self._entries[key] = payload
+                self.nbytes += len(payload)
+                self._evict()
+        finally:
+            with self._lock:
+                self._building.pop(key).set()
+        return payload
+
+    def put(self, chart_id, params, watermark, payload):
+        """Range un JSON construit ailleurs (précalcul en arrière-plan) ; sans effet s'il est déjà présent"""
+        key = (chart_id, param_hash(params), watermark)
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = payload
+                self.nbytes += len(payload)
+                self._evict()
+
+    def contains(self, chart_id, params, watermark):
+        """Vrai si la figure est déjà en cache, sans la marquer comme utilisée"""
+        with self._lock:
+            return (chart_id, param_hash(params), watermark) in self._entries
+
+    def export(self, watermark):
+        """(graphique, empreinte des paramètres, JSON) des figures d'un filigrane, pour l'instantané"""
+        with self._lock:
+            return [(key[0], key[1], payload) for key, payload in self._entries.items() if key[2] == watermark]
+
+    def restore(self, watermark, entries):
+        """Recharge les figures d'un filigrane exportées par `export()` (redémarrage à chaud)"""
+        with self._lock:
+            for chart_id, digest, payload in entries:
+                key = (chart_id, digest, watermark)
+                if key not in self._entries:
+                    self._entries[key] = payload
+                    self.nbytes += len(payload)
+            self._evict()
+
+    def get_figure(self, chart_id, params, watermark, builder):
+        """Figure reconstruite depuis le JSON en cache"""
+        # JSON sérialisé depuis une figure Plotly déjà validée : la revalider coûte plus que le décodage
+        return go.Figure(json.loads(self.get_json(chart_id, params, watermark, builder)), _validate=False)
+
+    def invalidate(self, watermark=None):
+        """Supprime les figures d'un filigrane donné, ou toutes"""
+        with self._lock:
+            for key in [k for k in self._entries if watermark is None or k[2] == watermark]:
+                self.nbytes -= len(self._entries.pop(key))
+
+    def stats(self):
+        """Compteurs d'utilisation du cache"""
+        with self._lock:
+            return {'figures': len(self._entries), 'octets': self.nbytes, 'hits': self.hits,
+                    'misses': self.misses, 'evictions': self.evictions}
+
+    def _evict(self):
+        # La figure la moins récemment utilisée part en premier ; la dernière insérée reste
+        while self.nbytes > self.max_bytes and len(self._entries) > 1:
+            _, payload = self._entries.popitem(last=False)
+            self.nbytes -= len(payload)
+            self.evictions += 1
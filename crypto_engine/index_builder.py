@@ -0,0 +1,133 @@
+"""Construction d'indices de référence (pondérés par capitalisation ou équipondérés) sur l'historique"""
+import numpy as np
+import pandas as pd
+
+MARKET_CAP = 'Marché (capitalisation)'
+MARKET_EQUAL = 'Marché (équipondéré)'
+
+
+def cap_weights(weights, max_weight):
+    """Plafonne chaque poids et redistribue l'excédent au prorata des constituants non plafonnés.
+
+    `weights` a pour dernière dimension les symboles ; chaque ligne est normalisée. Si le
+    plafond est inatteignable (trop peu de constituants), il est relevé à 1 / n.
+    """
+    totals = weights.sum(axis=-1, keepdims=True)
+    w = np.divide(weights, totals, out=np.zeros_like(weights), where=totals > 0)
+    n_valid = (w > 0).sum(axis=-1, keepdims=True)
+    limit = np.maximum(max_weight, 1 / np.maximum(n_valid, 1))
+    for _ in range(weights.shape[-1]):
+        over = w > limit + 1e-12
+        if not over.any():
+            break
+        excess = np.where(over, w - limit, 0).sum(axis=-1, keepdims=True)
+        w = np.where(over, limit, w)
+        free = (w > 0) & (w < limit - 1e-12)
+        free_total = np.where(free, w, 0).sum(axis=-1, keepdims=True)
+        share = np.divide(excess, free_total, out=np.zeros_like(excess), where=free_total > 0)
+        w = np.where(free, w * (1 + share), w)
+    return w
+
+
+class IndexBuilder:
+    """Calcule des indices de marché et de catégories en une passe vectorisée, prolongée jour par jour.
+
+    Les poids sont fixés à la clôture du premier jour de chaque période de rebalancement,
+    puis dérivent avec les prix : la valeur de chaque jour est le niveau au dernier
+    rebalancement multiplié par la performance pondérée depuis. Seul l'état du dernier
+    rebalancement est conservé pour prolonger les séries quand de nouveaux jours arrivent.
+    """
+
+    def __init__(self, symbols, supplies, categories, rebalance='M', max_weight=0.25, base=1000.0):
+        self.symbols = list(symbols)
+        self.rebalance = rebalance
+        self.max_weight = max_weight
+        self.base = float(base)
+        # Même convention que les capitalisations du tableau de bord : 1 milliard d'unités par défaut
+        self.supplies = np.array([s if s and pd.notna(s) else 1000000000 for s in supplies], dtype=float)
+        categories = pd.Series(list(categories), index=self.symbols)
+        self.category_names = list(pd.unique(categories))
+        self.names = [MARKET_CAP, MARKET_EQUAL] + self.category_names
+        # Appartenance de chaque symbole à chaque indice, et pondération (capitalisation ou égale)
+        self._members = np.vstack([np.ones(len(self.symbols), dtype=bool)] * 2 +
+                                  [(categories == c).to_numpy() for c in self.category_names])
+        self._cap_weighted = np.array([True, False] + [True] * len(self.category_names))
+        self._state = None
+        self.levels = pd.DataFrame(columns=self.names, dtype=float)
+
+    def update(self, prices):
+        """Niveaux des indices pour une matrice dates x symboles, en ne calculant que les jours nouveaux"""
+        prices = prices.reindex(columns=self.symbols)
+        state = self._state
+        appendable = (
+            state is not None
+            and len(prices) >= state['n']
+            and prices.index[state['n'] - 1] == state['last_date']
+        )
+        if not appendable:
+            self._state = None
+            self.levels = self._run(prices)
+        elif len(prices) > state['n']:
+            new_levels = self._run(prices.iloc[state['n']:], prices.iloc[state['n'] - 1])
+            self.levels = pd.concat([self.levels, new_levels])
+        return self.levels
+
+    def weights(self):
+        """Poids de chaque symbole dans chaque indice depuis le dernier rebalancement"""
+        if self._state is None:
+            return pd.DataFrame(columns=self.symbols, dtype=float)
+        return pd.DataFrame(self._state['weights'], index=self.names, columns=self.symbols)
+
+    def rebalance_weights(self, prices):
+        """Poids cibles (indices x dates x symboles) à partir des prix de clôture"""
+        prices = np.atleast_2d(prices)
+        valid = np.isfinite(prices) & (prices > 0)
+        caps = np.where(valid, prices, 0) * self.supplies
+        raw = np.where(self._cap_weighted[:, None, None], caps[None], valid[None].astype(float))
+        return cap_weights(raw * self._members[:, None, :], self.max_weight)
+
+    def _run(self, prices, previous_row=None):
+        values = prices.ffill().to_numpy(dtype=float)
+        if previous_row is not None:
+            # Les symboles sans cotation ce jour gardent le dernier prix connu
+            values = pd.DataFrame(np.vstack([previous_row.to_numpy(dtype=float), values])).ffill().to_numpy()[1:]
+        periods = prices.index.to_period(self.rebalance).asi8
+
+        state = self._state
+        if state is None:
+            # Le premier jour est le rebalancement initial, au niveau de base
+            state = {
+                'period': periods[0],
+                'level': np.full(len(self.names), self.base),
+                'prices': values[0],
+                'weights': self.rebalance_weights(values[0])[:, 0],
+            }
+        # Un rebalancement a lieu au premier jour de chaque nouvelle période
+        is_rebalance = np.empty(len(periods), dtype=bool)
+        is_rebalance[0] = periods[0] != state['period']
+        is_rebalance[1:] = periods[1:] != periods[:-1]
+        rebalance_rows = np.flatnonzero(is_rebalance)
+
+        # Chaque jour est valorisé avec les poids du dernier rebalancement strictement antérieur
+        anchor = np.cumsum(is_rebalance) - is_rebalance
+        anchor_prices = np.vstack([state['prices'][None], values[rebalance_rows]])
+        anchor_weights = np.concatenate([state['weights'][:, None],
+                                         self.rebalance_weights(values[rebalance_rows])], axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            relative = np.nan_to_num(values / anchor_prices[anchor])
+        growth = np.einsum('ktn,tn->tk', anchor_weights[:, anchor], relative)
+
+        # Niveaux aux rebalancements : produit chaîné des performances de chaque période
+        anchor_levels = state['level'] * np.cumprod(
+            np.vstack([np.ones((1, len(self.names))), growth[rebalance_rows]]), axis=0)
+        levels = anchor_levels[anchor] * growth
+
+        self._state = {
+            'period': periods[-1],
+            'level': anchor_levels[-1],
+            'prices': anchor_prices[-1],
+            'weights': anchor_weights[:, -1],
+            'n': (self._state['n'] if self._state else 0) + len(prices),
+            'last_date': prices.index[-1],
+        }
+        return pd.DataFrame(levels, index=prices.index, columns=self.names)
@@ -0,0 +1,19 @@
+"""Indicateurs techniques, applicables à une série ou à une matrice dates x symboles"""
+
+
+def rsi(prices, window=14):
+    """Calcule le RSI (Relative Strength Index)"""
+    delta = prices.diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
+    rs = gain / loss
+    return 100 - (100 / (1 + rs))
+
+
+def bollinger_bands(prices, window=20, num_std=2):
+    """Calcule les bandes de Bollinger"""
+    rolling_mean = prices.rolling(window=window).mean()
+    rolling_std = prices.rolling(window=window).std()
+    upper_band = rolling_mean + (rolling_std * num_std)
+    lower_band = rolling_mean - (rolling_std * num_std)
+    return upper_band, lower_band
@@ -0,0 +1,258 @@
+"""Instrumentation du dashboard : spans chronométrés, histogrammes, export Prometheus et profileur par échantillonnage"""
+import bisect
+import functools
+import json
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+# Bornes supérieures des histogrammes de durée, en millisecondes
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_tracer = None
+
+
+def get_tracer():
+    """Traceur partagé par toutes les sessions du processus, créé au premier usage"""
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer()
+    return _tracer
+
+
+def payload_size(value):
+    """Nombre de lignes (DataFrame, tableau) ou de points (figure Plotly) d'un résultat, sinon None"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    data = getattr(value, 'data', None)
+    if isinstance(data, tuple):
+        # Figure Plotly : nombre total de points des traces
+        return sum(_trace_points(trace) for trace in data)
+    return None
+
+
+def _trace_points(trace):
+    # Abscisses absentes (x0 / dx) : les ordonnées donnent le nombre de points
+    for attribute in ('x', 'y'):
+        values = getattr(trace, attribute, None)
+        if isinstance(values, dict) and 'bdata' in values:
+            # Tableau typé base64 : 4 caractères pour 3 octets
+            return len(values['bdata']) * 3 // 4 // np.dtype(values['dtype']).itemsize
+        if values is not None:
+            return len(values)
+    return 0
+
+
+class Histogram:
+    """Histogramme cumulatif de durées au format Prometheus (compteurs par borne, somme, total)"""
+
+    def __init__(self, buckets=BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Quantile approché : borne supérieure du premier intervalle atteignant q"""
+        if not self.count:
+            return float('nan')
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float('inf')
+
+
+class Tracer:
+    """Enregistre des spans chronométrés par rerun et les agrège en histogrammes par nom.
+
+    Chaque session Streamlit s'exécute dans son propre thread : la liste des spans du
+    rerun en cours est locale au thread, les histogrammes sont communs au processus.
+    """
+
+    def __init__(self, log_path=None):
+        self.log_path = log_path
+        self.histograms = {}
+        self.totals = Counter()  # Lignes / points cumulés par span
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._server = None
+        self.metrics_error = None  # Échec de l'ouverture du port /metrics : export désactivé pour le processus
+
+    def begin_run(self):
+        """Démarre la collecte des spans d'un nouveau rerun dans le thread courant"""
+        self._local.spans = []
+        self._local.depth = 0
+
+    def run_spans(self):
+        """Spans du rerun courant (nom, profondeur, durée, lignes, octets)"""
+        return pd.DataFrame(getattr(self._local, 'spans', []),
+                            columns=['span', 'profondeur', 'duree_ms', 'lignes', 'octets'])
+
+    @contextmanager
+    def span(self, name, rows=None, nbytes=None):
+        """Chronomètre un bloc ; le dictionnaire produit permet d'y ajouter lignes et octets"""
+        info = {'lignes': rows, 'octets': nbytes}
+        depth = getattr(self._local, 'depth', 0)
+        self._local.depth = depth + 1
+        start = time.perf_counter_ns()
+        try:
+            yield info
+        finally:
+            elapsed = (time.perf_counter_ns() - start) / 1e6
+            self._local.depth = depth
+            self.record(name, elapsed, info['lignes'], info['octets'], depth)
+
+    def record(self, name, duration_ms, rows=None, nbytes=None, depth=0):
+        """Ajoute une mesure au rerun courant, à l'histogramme du span et au journal"""
+        spans = getattr(self._local, 'spans', None)
+        if spans is not None:
+            spans.append((name, depth, duration_ms, rows, nbytes))
+        with self._lock:
+            self.histograms.setdefault(name, Histogram()).observe(duration_ms)
+            if rows:
+                self.totals[name] += rows
+            if self.log_path:
+                with open(self.log_path, 'a') as log:
+                    log.write(json.dumps({'ts': time.time(), 'span': name, 'duree_ms': round(duration_ms, 3),
+                                          'lignes': rows, 'octets': nbytes}) + '\n')
+
+    def summary(self):
+        """Statistiques cumulées par span : nombre d'appels, moyenne, p50 et p95 approchés"""
+        with self._lock:
+            rows = [{'span': name, 'appels': h.count, 'moyenne_ms': h.sum / h.count,
+                     'p50_ms': h.quantile(0.5), 'p95_ms': h.quantile(0.95), 'lignes': self.totals[name]}
+                    for name, h in self.histograms.items()]
+        return pd.DataFrame(rows, columns=['span', 'appels', 'moyenne_ms', 'p50_ms', 'p95_ms', 'lignes'])
+
+    def prometheus(self):
+        """Histogrammes au format texte d'exposition Prometheus"""
+        lines = ['# HELP crypto_dashboard_span_duration_ms Durée des spans du dashboard',
+                 '# TYPE crypto_dashboard_span_duration_ms histogram']
+        with self._lock:
+            for name, h in sorted(self.histograms.items()):
+                label = name.replace('\\', '\\\\').replace('"', '\\"')
+                cumulative = 0
+                for bound, count in zip(h.buckets + ('+Inf',), h.counts):
+                    cumulative += count
+                    lines.append(f'crypto_dashboard_span_duration_ms_bucket{{span="{label}",le="{bound}"}} {cumulative}')
+                lines.append(f'crypto_dashboard_span_duration_ms_sum{{span="{label}"}} {h.sum:.3f}')
+                lines.append(f'crypto_dashboard_span_duration_ms_count{{span="{label}"}} {h.count}')
+            lines.append('# TYPE crypto_dashboard_span_rows_total counter')
+            for name, total in sorted(self.totals.items()):
+                lines.append(f'crypto_dashboard_span_rows_total{{span="{name}"}} {total}')
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port, host='127.0.0.1'):
+        """Expose /metrics en HTTP local dans un thread de fond (une seule fois par processus) ; None si le port est pris"""
+        if self._server is not None or self.metrics_error is not None:
+            return self._server
+        tracer = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = tracer.prometheus().encode()
+                self.send_response(200 if self.path.startswith('/metrics') else 404)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        try:
+            self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+        except OSError as error:
+            # Port déjà pris (plusieurs workers sur le même port, autre service) : tenté une seule fois,
+            # sans faire échouer les reruns ; le journal et le panneau de debug restent disponibles
+            self.metrics_error = f"port {port} : {error.strerror or error}"
+            print(f"Export /metrics désactivé ({self.metrics_error})", file=sys.stderr)
+            return None
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server
+
+
+def traced(name=None):
+    """Décorateur : chronomètre chaque appel et note la taille du résultat"""
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with get_tracer().span(span_name) as info:
+                result = func(*args, **kwargs)
+                info['lignes'] = payload_size(result)
+                return result
+        return wrapper
+    return decorator
+
+
+class SamplingProfiler:
+    """Échantillonne la pile d'un thread à intervalle fixe et compte les fonctions rencontrées.
+
+    Le coût est celui d'une lecture de pile par intervalle, dans un thread séparé : le
+    code profilé n'est pas instrumenté.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = 0
+        self.own = Counter()        # Fonction en cours d'exécution
+        self.cumulative = Counter()  # Fonction présente dans la pile
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, thread_id=None):
+        """Commence l'échantillonnage du thread donné (par défaut le thread appelant)"""
+        target = thread_id or threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(target,), daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        return self
+
+    def top(self, n=20):
+        """Fonctions les plus souvent échantillonnées, en part du temps total"""
+        rows = [{'fonction': key, 'propre_%': self.own[key] / self.samples * 100,
+                 'cumule_%': count / self.samples * 100}
+                for key, count in self.cumulative.most_common(n)] if self.samples else []
+        return pd.DataFrame(rows, columns=['fonction', 'propre_%', 'cumule_%'])
+
+    def _run(self, target):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(target)
+            if frame is None:
+                continue
+            self.samples += 1
+            seen = set()
+            first = True
+            while frame is not None:
+                code = frame.f_code
+                key = f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})"
+                if first:
+                    self.own[key] += 1
+                    first = False
+                if key not in seen:
+                    self.cumulative[key] += 1
+                    seen.add(key)
+                frame = frame.f_back
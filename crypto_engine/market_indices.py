@@ -0,0 +1,148 @@
+"""Indices de marché (dominance, catégories, sentiment) dérivés des capitalisations"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from .ring_buffer import RingBuffer
+
+# Indice -> secteur affiché et unité (les variations des indices en % s'expriment en points)
+INDICES = {
+    'Crypto Fear & Greed Index': {'secteur': 'Sentiment', 'unite': 'points'},
+    'Bitcoin Dominance': {'secteur': 'BTC', 'unite': '%'},
+    'Ethereum Dominance': {'secteur': 'ETH', 'unite': '%'},
+    'DeFi Market Cap': {'secteur': 'DeFi', 'unite': 'B$'},
+    'Gaming & Metaverse Volume': {'secteur': 'NFT', 'unite': 'B$'},
+    'Stablecoin Supply': {'secteur': 'Stablecoins', 'unite': 'B$'},
+}
+
+
+def _scale(value, low, high):
+    return float(np.clip((value - low) / (high - low), 0.0, 1.0) * 100)
+
+
+def fear_greed(momentum_30d, tick_momentum, volatility_ratio):
+    """Indice de sentiment 0-100 : la hausse des prix nourrit l'avidité, la volatilité la peur"""
+    return float(np.mean([
+        _scale(momentum_30d, -30, 30),
+        _scale(tick_momentum, -5, 5),
+        100 - _scale(volatility_ratio, 0.5, 1.5),
+    ]))
+
+
+class MarketIndexEngine:
+    """Maintient les indices de marché à partir de sommes mises à jour par différence à chaque tick.
+
+    Les agrégats (capitalisation totale et par groupe, volumes, variation pondérée) sont
+    corrigés uniquement pour les lignes modifiées ; les valeurs successives sont conservées
+    dans un tampon circulaire et comparées à une référence (dernière clôture historique).
+    """
+
+    def __init__(self, symbols, categories, capacity=2880):
+        self.symbols = list(symbols)
+        self.names = list(INDICES)
+        categories = pd.Series(list(categories), index=self.symbols)
+        self._groups = {
+            'btc': np.array([s == 'BTC/USD' for s in self.symbols]),
+            'eth': np.array([s == 'ETH/USD' for s in self.symbols]),
+            'defi': (categories == 'DeFi').to_numpy(),
+            'nft': categories.isin(['Gaming', 'Metaverse']).to_numpy(),
+            'stable': (categories == 'Stablecoin').to_numpy(),
+        }
+        self._caps = np.zeros(len(self.symbols))
+        self._volumes = np.zeros(len(self.symbols))
+        self._changes = np.zeros(len(self.symbols))
+        self._sums = {}
+        self.context = {'momentum_30d': 0.0, 'volatility_ratio': 1.0}
+        self.baseline = None
+        self.history = RingBuffer(capacity, len(self.names), dtype=np.float32)
+
+    def reset(self, market_caps, volumes, changes):
+        """Recalcule toutes les sommes à partir d'un instantané complet"""
+        self._caps = np.nan_to_num(np.asarray(market_caps, dtype=float))
+        self._volumes = np.nan_to_num(np.asarray(volumes, dtype=float))
+        self._changes = np.nan_to_num(np.asarray(changes, dtype=float))
+        self._sums = self._aggregate(self._caps, self._volumes, self._caps * self._changes)
+
+    def apply_tick(self, rows, market_caps, volumes, changes, timestamp_ns=None):
+        """Intègre les lignes modifiées par un tick puis enregistre les nouvelles valeurs"""
+        rows = np.asarray(rows, dtype=int)
+        if len(rows):
+            caps = np.nan_to_num(np.asarray(market_caps, dtype=float))
+            vols = np.nan_to_num(np.asarray(volumes, dtype=float))
+            chg = np.nan_to_num(np.asarray(changes, dtype=float))
+            delta = self._aggregate(caps - self._caps[rows], vols - self._volumes[rows],
+                                    caps * chg - self._caps[rows] * self._changes[rows], rows=rows)
+            for key, value in delta.items():
+                self._sums[key] += value
+            self._caps[rows] = caps
+            self._volumes[rows] = vols
+            self._changes[rows] = chg
+        return self.record(timestamp_ns)
+
+    def set_context(self, momentum_30d, volatility_ratio):
+        """Composantes historiques du sentiment (performance 30 jours et régime de volatilité)"""
+        self.context = {'momentum_30d': float(momentum_30d), 'volatility_ratio': float(volatility_ratio)}
+
+    def set_baseline(self, market_caps, volumes):
+        """Fixe la référence des variations (par exemple la dernière clôture)"""
+        sums = self._aggregate(np.nan_to_num(np.asarray(market_caps, dtype=float)),
+                               np.nan_to_num(np.asarray(volumes, dtype=float)),
+                               np.zeros(len(self.symbols)))
+        self.baseline = self._values(sums)
+
+    def values(self):
+        """Valeurs courantes des indices"""
+        return self._values(self._sums)
+
+    def record(self, timestamp_ns=None):
+        """Ajoute les valeurs courantes à la série historique compacte"""
+        values = self.values()
+        self.history.append(timestamp_ns or time.time_ns(), values)
+        return values
+
+    def snapshot(self):
+        """Indices au format de market_data : valeur, variation vs référence, secteur et unité"""
+        values = self.values()
+        baseline = self.baseline if self.baseline is not None else values
+        indices = {}
+        for name, value, ref in zip(self.names, values, baseline):
+            unite = INDICES[name]['unite']
+            if unite == 'B$':
+                change = (value / ref - 1) * 100 if ref else 0.0
+            else:
+                change = value - ref
+            indices[name] = {'valeur': float(value), 'change': float(change),
+                             'secteur': INDICES[name]['secteur'], 'unite': unite}
+        return indices
+
+    def history_frame(self, n=None):
+        """Série temporelle des indices sur les n derniers ticks"""
+        times, values = self.history.last(n)
+        frame = pd.DataFrame(values, columns=self.names)
+        frame.insert(0, 'date', pd.to_datetime(times))
+        return frame
+
+    def _aggregate(self, caps, volumes, weighted_changes, rows=None):
+        groups = self._groups if rows is None else {k: g[rows] for k, g in self._groups.items()}
+        return {
+            'total_cap': caps.sum(),
+            'weighted_change': weighted_changes.sum(),
+            'btc_cap': caps[groups['btc']].sum(),
+            'eth_cap': caps[groups['eth']].sum(),
+            'defi_cap': caps[groups['defi']].sum(),
+            'nft_volume': volumes[groups['nft']].sum(),
+            'stable_cap': caps[groups['stable']].sum(),
+        }
+
+    def _values(self, sums):
+        total = sums['total_cap'] or 1.0
+        return np.array([
+            fear_greed(self.context['momentum_30d'], sums['weighted_change'] / total,
+                       self.context['volatility_ratio']),
+            sums['btc_cap'] / total * 100,
+            sums['eth_cap'] / total * 100,
+            sums['defi_cap'],
+            sums['nft_volume'],
+            sums['stable_cap'],
+        ])
@@ -0,0 +1,91 @@
+"""Pool de processus partagé et tableaux NumPy en mémoire partagée pour les calculs parallèles"""
+import multiprocessing
+import os
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Répertoire en mémoire (tmpfs) s'il existe, sinon répertoire temporaire classique
+SHARED_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+
+_pool = None
+_attached = OrderedDict()
+_MAX_ATTACHED = 8
+
+
+def get_process_pool():
+    """Pool de processus partagé par les moteurs, créé au premier usage"""
+    global _pool
+    if _pool is None:
+        # 'spawn' évite de dupliquer les threads du serveur Streamlit dans les workers
+        _pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1,
+                                    mp_context=multiprocessing.get_context('spawn'))
+    return _pool
+
+
+def shutdown_process_pool():
+    """Arrête le pool partagé (les tâches en cours sont terminées)"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
+
+
+class SharedArray:
+    """Tableau NumPy projeté en mémoire depuis un fichier tmpfs, lisible sans copie par les workers.
+
+    Le processus créateur possède le fichier et le supprime à la fermeture ; les workers
+    s'y attachent en lecture seule à partir du descripteur (chemin, forme, type).
+    """
+
+    def __init__(self, path, shape, dtype, owner=False):
+        self.path = path
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.owner = owner
+        self.array = np.memmap(path, dtype=self.dtype, mode='r+' if owner else 'r', shape=self.shape)
+
+    @classmethod
+    def from_array(cls, array, prefix='crypto_'):
+        """Copie un tableau dans un nouveau segment partagé"""
+        array = np.ascontiguousarray(array)
+        fd, path = tempfile.mkstemp(prefix=prefix, suffix='.bin', dir=SHARED_DIR)
+        os.ftruncate(fd, max(array.nbytes, 1))
+        os.close(fd)
+        shared = cls(path, array.shape, array.dtype, owner=True)
+        shared.array[...] = array
+        return shared
+
+    @property
+    def descriptor(self):
+        """Description picklable permettant à un autre processus de s'attacher"""
+        return (self.path, self.shape, self.dtype.str)
+
+    @staticmethod
+    def attach(descriptor):
+        """Vue en lecture seule sur un segment partagé, mémorisée par processus"""
+        if descriptor not in _attached:
+            path, shape, dtype = descriptor
+            _attached[descriptor] = np.memmap(path, dtype=dtype, mode='r', shape=shape)
+            while len(_attached) > _MAX_ATTACHED:
+                _attached.popitem(last=False)
+        _attached.move_to_end(descriptor)
+        return _attached[descriptor]
+
+    def close(self):
+        """Libère la projection et supprime le fichier s'il appartient à ce processus"""
+        self.array = None
+        if self.owner:
+            # Une vue attachée dans ce processus (calcul sans worker) garderait les pages du segment supprimé
+            for descriptor in [d for d in _attached if d[0] == self.path]:
+                del _attached[descriptor]
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
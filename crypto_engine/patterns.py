@@ -0,0 +1,257 @@
+"""Détection de figures chartistes à partir des extrema locaux (zigzag) des séries de prix"""
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Figure -> tendance annoncée
+PATTERNS = {
+    'Double Top': 'Baissier',
+    'Double Bottom': 'Haussier',
+    'Tête et Épaules': 'Baissier',
+    'Tête et Épaules Inversée': 'Haussier',
+    'Triangle Ascendant': 'Haussier',
+    'Triangle Descendant': 'Baissier',
+    'Biseau Ascendant': 'Baissier',
+    'Biseau Descendant': 'Haussier',
+}
+
+TIMEFRAMES = {'1D': None, '1W': 'W'}
+
+COLUMNS = ['symbole', 'timeframe', 'pattern', 'tendance', 'date_debut', 'date_fin',
+           'niveau_cle', 'objectif']
+
+
+def local_extrema(values, order):
+    """Pics (1) et creux (-1) de chaque colonne : extremum d'une fenêtre centrée de 2*order+1 barres"""
+    types = np.zeros(values.shape, dtype=np.int8)
+    n = len(values)
+    if n < 2 * order + 1:
+        return types
+    windows = sliding_window_view(values, 2 * order + 1, axis=0)
+    center = values[order:n - order]
+    is_max = center >= windows.max(axis=-1)
+    is_min = center <= windows.min(axis=-1)
+    # Une fenêtre plate n'est ni un pic ni un creux
+    types[order:n - order][is_max & ~is_min] = 1
+    types[order:n - order][is_min & ~is_max] = -1
+    return types
+
+
+def zigzag(idx, prices, types, min_swing, resume=None):
+    """Alterne strictement pics et creux en gardant l'extremum et en ignorant les oscillations trop faibles.
+
+    Retourne les pivots retenus et, pour chaque candidat traité, l'état du parcours
+    (nombre de pivots, indice et prix du dernier) : seul le dernier pivot peut encore être
+    remplacé, ce qui permet de reprendre le parcours à partir de n'importe quel candidat.
+    """
+    kept_idx, kept_prices, kept_types = (list(part) for part in resume) if resume else ([], [], [])
+    trace = np.empty((len(idx), 3))
+    for j, (i, p, t) in enumerate(zip(idx, prices, types)):
+        if kept_types and kept_types[-1] == t:
+            if (t == 1 and p > kept_prices[-1]) or (t == -1 and p < kept_prices[-1]):
+                kept_idx[-1], kept_prices[-1] = i, p
+        elif not kept_prices or abs(p / kept_prices[-1] - 1) >= min_swing:
+            kept_idx.append(i)
+            kept_prices.append(p)
+            kept_types.append(t)
+        trace[j] = (len(kept_idx), kept_idx[-1] if kept_idx else -1, kept_prices[-1] if kept_prices else np.nan)
+    pivots = (np.array(kept_idx, dtype=int), np.array(kept_prices, dtype=float),
+              np.array(kept_types, dtype=np.int8))
+    return pivots, trace
+
+
+def match_templates(prices, types, tolerance, first_end=0):
+    """Compare les séquences de pivots aux gabarits de figures.
+
+    Retourne des tableaux parallèles (figure, position du premier pivot, position du
+    dernier pivot, niveau clé, objectif) pour les séquences dont le dernier pivot est
+    >= first_end.
+    """
+    found = []
+
+    def close(a, b, tol=tolerance):
+        return np.abs(a - b) <= tol * (a + b) / 2
+
+    def collect(name, mask, length, level, target):
+        k = np.flatnonzero(mask)
+        k = k[k + length - 1 >= first_end]
+        found.append((np.full(len(k), name, dtype=object), k, k + length - 1, level[k], target[k]))
+
+    # Doubles sommets / creux : trois pivots
+    if len(prices) >= 3:
+        a, b, c = sliding_window_view(prices, 3).T
+        first = types[:len(a)]
+        similar = close(a, c)
+        middle = (a + c) / 2
+        collect('Double Top', (first == 1) & similar, 3, b, b - (middle - b))
+        collect('Double Bottom', (first == -1) & similar, 3, b, b + (b - middle))
+
+    # Triangles et biseaux : deux sommets et deux creux
+    if len(prices) >= 4:
+        a, b, c, d = sliding_window_view(prices, 4).T
+        first = types[:len(a)]
+        h1, h2 = np.where(first == 1, a, b), np.where(first == 1, c, d)
+        l1, l2 = np.where(first == 1, b, a), np.where(first == 1, d, c)
+        rising_lows = l2 > l1 * (1 + tolerance)
+        falling_highs = h2 < h1 * (1 - tolerance)
+        collect('Triangle Ascendant', close(h1, h2) & rising_lows, 4,
+                (h1 + h2) / 2, (h1 + h2) / 2 + ((h1 + h2) / 2 - l1))
+        collect('Triangle Descendant', close(l1, l2) & falling_highs, 4,
+                (l1 + l2) / 2, (l1 + l2) / 2 - (h1 - (l1 + l2) / 2))
+        collect('Biseau Ascendant', (h2 > h1 * (1 + tolerance)) & rising_lows & (l2 / l1 > h2 / h1), 4,
+                l2, l1)
+        collect('Biseau Descendant', falling_highs & (l2 < l1 * (1 - tolerance)) & (h2 / h1 < l2 / l1), 4,
+                h2, h1)
+
+    # Tête et épaules : épaule, creux, tête, creux, épaule
+    if len(prices) >= 5:
+        a, b, c, d, e = sliding_window_view(prices, 5).T
+        first = types[:len(a)]
+        shoulders = close(a, e) & close(b, d, 2 * tolerance)
+        neck = (b + d) / 2
+        collect('Tête et Épaules',
+                (first == 1) & shoulders & (c > a * (1 + tolerance)) & (c > e * (1 + tolerance)), 5,
+                neck, neck - (c - neck))
+        collect('Tête et Épaules Inversée',
+                (first == -1) & shoulders & (c < a * (1 - tolerance)) & (c < e * (1 - tolerance)), 5,
+                neck, neck + (neck - c))
+
+    if not found:
+        return _empty_matches()
+    return tuple(np.concatenate(parts) for parts in zip(*found))
+
+
+def _empty_matches():
+    return (np.array([], dtype=object), np.array([], dtype=int), np.array([], dtype=int),
+            np.array([]), np.array([]))
+
+
+class PatternDetector:
+    """Détecte les figures de toutes les cryptomonnaies et les met à jour quand des barres s'ajoutent.
+
+    Les extrema candidats sont calculés sur la matrice entière ; lors d'un ajout, seules les
+    dernières barres (celles dont la fenêtre a changé) sont réexaminées, et seules les
+    séquences de pivots touchées par la mise à jour sont recomparées aux gabarits.
+    """
+
+    def __init__(self, order=5, tolerance=0.03, min_swing=0.05):
+        self.order = order
+        self.tolerance = tolerance
+        self.min_swing = min_swing
+        self._states = {}
+
+    def scan(self, prices, timeframe='1D'):
+        """Figures détectées sur tout l'historique, une ligne par occurrence"""
+        state = self._states.get(timeframe)
+        # Repère pris sur les barres journalières : une barre ajoutée en cours de semaine
+        # modifie la dernière barre hebdomadaire sans changer ni sa date ni le nombre de barres
+        watermark = ((prices.index[-1], len(prices), prices.iloc[-1].to_numpy(dtype=float).tobytes())
+                     if len(prices) else None)
+        if state and state['watermark'] == watermark and state['symbols'] == list(prices.columns):
+            return state['result']
+        bars = self._resample(prices, timeframe)
+
+        values = bars.to_numpy(dtype=float)
+        appendable = (
+            state is not None
+            and state['symbols'] == list(bars.columns)
+            and len(bars) >= state['n']
+            and bars.index[state['n'] - 1] == state['last_date']
+        )
+        # Les barres dont la fenêtre incluait l'ancienne dernière barre sont réexaminées
+        start = max(0, state['n'] - 1 - 2 * self.order) if appendable else 0
+        if not appendable:
+            state = {'symbols': list(bars.columns), 'candidates': {}, 'pivots': {}, 'patterns': {}}
+
+        types = local_extrema(values[start:], self.order)
+        for col, symbol in enumerate(bars.columns):
+            new_idx = np.flatnonzero(types[:, col]) + start
+            new_types = types[new_idx - start, col]
+            old = state['candidates'].get(symbol)
+            n_keep = int((old[0] < start + self.order).sum()) if old is not None else 0
+            if n_keep:
+                cand_idx = np.concatenate([old[0][:n_keep], new_idx])
+                cand_types = np.concatenate([old[1][:n_keep], new_types])
+                # Reprise du zigzag juste après le dernier candidat inchangé
+                n_pivots, last_idx, last_price = old[2][n_keep - 1]
+                n_pivots = int(n_pivots)
+                pivots = state['pivots'][symbol]
+                resume = [part[:n_pivots].copy() for part in pivots]
+                if n_pivots:
+                    resume[0][-1], resume[1][-1] = int(last_idx), last_price
+                (pivot_idx, pivot_prices, pivot_types), trace = zigzag(
+                    new_idx, values[new_idx, col], new_types, self.min_swing, resume=resume)
+                trace = np.vstack([old[2][:n_keep], trace])
+            else:
+                cand_idx, cand_types = new_idx, new_types
+                (pivot_idx, pivot_prices, pivot_types), trace = zigzag(
+                    cand_idx, values[cand_idx, col], cand_types, self.min_swing)
+            state['candidates'][symbol] = (cand_idx, cand_types, trace)
+
+            # Position du premier pivot modifié : les figures antérieures restent valables
+            previous = state['pivots'].get(symbol)
+            first_change = 0
+            if previous is not None:
+                same = min(len(previous[0]), len(pivot_idx))
+                diff = np.flatnonzero((previous[0][:same] != pivot_idx[:same]) |
+                                      (previous[1][:same] != pivot_prices[:same]))
+                first_change = int(diff[0]) if len(diff) else same
+            state['pivots'][symbol] = (pivot_idx, pivot_prices, pivot_types)
+
+            previous_matches = state['patterns'].get(symbol, _empty_matches())
+            keep = previous_matches[2] < first_change
+            matches = match_templates(pivot_prices, pivot_types, self.tolerance, first_end=first_change)
+            state['patterns'][symbol] = tuple(
+                np.concatenate([old_part[keep], new_part]) for old_part, new_part in zip(previous_matches, matches))
+
+        # Assemblage vectorisé : positions de pivots -> indices de barres -> dates
+        symbols, names, first_bars, last_bars, levels, targets = [], [], [], [], [], []
+        for symbol, (name, first, last, level, target) in state['patterns'].items():
+            pivot_idx = state['pivots'][symbol][0]
+            symbols.append(np.full(len(name), symbol, dtype=object))
+            names.append(name)
+            first_bars.append(pivot_idx[first])
+            last_bars.append(pivot_idx[last])
+            levels.append(level)
+            targets.append(target)
+        if symbols:
+            dates = bars.index.to_numpy()
+            names = np.concatenate(names)
+            result = pd.DataFrame({
+                'symbole': np.concatenate(symbols),
+                'timeframe': timeframe,
+                'pattern': names,
+                'tendance': pd.Series(names, dtype=object).map(PATTERNS).to_numpy(),
+                'date_debut': dates[np.concatenate(first_bars)],
+                'date_fin': dates[np.concatenate(last_bars)],
+                'niveau_cle': np.concatenate(levels),
+                'objectif': np.concatenate(targets),
+            })
+        else:
+            result = pd.DataFrame(columns=COLUMNS)
+
+        state.update({
+            'n': len(bars),
+            'last_date': bars.index[-1] if len(bars) else None,
+            'watermark': watermark,
+            'result': result,
+        })
+        self._states[timeframe] = state
+        return state['result']
+
+    def current_patterns(self, prices, timeframe='1D', max_age_days=90):
+        """Figure la plus récente de chaque cryptomonnaie, si elle s'est achevée récemment"""
+        patterns = self.scan(prices, timeframe)
+        if patterns.empty:
+            return patterns
+        cutoff = prices.index[-1] - pd.Timedelta(days=max_age_days)
+        recent = patterns[patterns['date_fin'] >= cutoff]
+        return (recent.sort_values('date_fin')
+                .groupby('symbole').tail(1)
+                .sort_values('date_fin', ascending=False)
+                .reset_index(drop=True))
+
+    @staticmethod
+    def _resample(prices, timeframe):
+        rule = TIMEFRAMES[timeframe]
+        return prices if rule is None else prices.resample(rule).last()
@@ -0,0 +1,196 @@
+"""Suivi de portefeuilles : positions par utilisateur et valorisation vectorisée"""
+import threading
+import time
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from .ring_buffer import RingBuffer
+
+POSITION_COLUMNS = ['horodatage', 'utilisateur', 'symbole', 'quantite', 'prix_revient']
+
+_books = {}
+
+
+def get_portfolio_book(symbols, store=None):
+    """Carnet partagé par les sessions du processus (un par stockage), positions reprises du stockage"""
+    key = None if store is None else store.root
+    if key not in _books:
+        _books[key] = PortfolioBook(symbols, store=store)
+    return _books[key]
+
+
+class PortfolioBook:
+    """Carnet de positions de tous les utilisateurs, valorisé en un seul produit matrice-vecteur.
+
+    Les quantités sont stockées dans une matrice portefeuilles x symboles ; à chaque tick,
+    `revalue` calcule la valeur de tous les portefeuilles et enregistre le P&L latent dans
+    un tampon circulaire de taille fixe.
+
+    Avec un `store`, chaque modification de position est ajoutée à la table `positions`
+    du SegmentStore et le carnet est rechargé au démarrage ; `sync` reprend les
+    modifications écrites par d'autres processus sur le même stockage.
+    """
+
+    def __init__(self, symbols, history_capacity=1024, initial_slots=16, store=None):
+        self.symbols = list(symbols)
+        self._symbol_index = {s: i for i, s in enumerate(self.symbols)}
+        self.users = []
+        self._user_index = {}
+        self.history_capacity = history_capacity
+        self._quantities = np.zeros((initial_slots, len(self.symbols)))
+        self._cost_prices = np.zeros((initial_slots, len(self.symbols)))
+        self._cost_totals = np.zeros(initial_slots)
+        self._pnl_history = RingBuffer(history_capacity, initial_slots, dtype=np.float32)
+        self.values = np.zeros(0)
+        self.last_prices = None
+        self.store = store
+        self._synced = None  # Horodatage de la dernière modification reprise du stockage
+        self._owner = None  # Référence faible vers la session dont les prix valorisent le carnet
+        self._lock = threading.RLock()
+        self.sync()
+
+    def __len__(self):
+        return len(self.users)
+
+    def add_portfolio(self, user):
+        """Crée le portefeuille d'un utilisateur s'il n'existe pas et retourne son indice"""
+        if user in self._user_index:
+            return self._user_index[user]
+        idx = len(self.users)
+        if idx == len(self._quantities):
+            self._grow(2 * idx)
+        self.users.append(user)
+        self._user_index[user] = idx
+        return idx
+
+    def set_position(self, user, symbol, quantity, cost_price):
+        """Fixe la quantité détenue d'un symbole et son prix de revient unitaire (enregistrée dans le stockage)"""
+        with self._lock:
+            self._set(user, symbol, quantity, cost_price)
+            if self.store is not None:
+                self._synced = pd.Timestamp(time.time_ns())
+                self.store.append('positions', pd.DataFrame(
+                    [[self._synced, user, symbol, float(quantity), float(cost_price)]], columns=POSITION_COLUMNS))
+
+    def sync(self):
+        """Reprend les positions écrites dans le stockage depuis la dernière reprise ; retourne leur nombre"""
+        if self.store is None:
+            return 0
+        last = self.store.last_time('positions')
+        if last is None or (self._synced is not None and last <= self._synced):
+            return 0
+        with self._lock:
+            changes = self.store.read('positions', start=self._synced)
+            if self._synced is not None:
+                changes = changes[changes['horodatage'] > self._synced]
+            # Dernière valeur de chaque position ; un symbole retiré de la liste est ignoré
+            changes = changes.drop_duplicates(['utilisateur', 'symbole'], keep='last')
+            changes = changes[changes['symbole'].isin(self._symbol_index)]
+            for user, symbol, quantity, cost_price in changes[POSITION_COLUMNS[1:]].itertuples(index=False):
+                self._set(user, symbol, quantity, cost_price)
+            self._synced = last
+        return len(changes)
+
+    def positions(self, user):
+        """Positions non nulles d'un utilisateur, valorisées au dernier prix connu"""
+        if user not in self._user_index:
+            return pd.DataFrame(columns=['symbole', 'quantite', 'prix_revient', 'prix', 'valeur', 'pnl'])
+        idx = self._user_index[user]
+        held = np.flatnonzero(self._quantities[idx])
+        quantities = self._quantities[idx, held]
+        costs = self._cost_prices[idx, held]
+        prices = self.last_prices[held] if self.last_prices is not None else costs
+        return pd.DataFrame({
+            'symbole': [self.symbols[i] for i in held],
+            'quantite': quantities,
+            'prix_revient': costs,
+            'prix': prices,
+            'valeur': quantities * prices,
+            'pnl': quantities * (prices - costs),
+        })
+
+    def revalue(self, prices, timestamp_ns=None, owner=None):
+        """Valorise tous les portefeuilles aux prix donnés (alignés sur `symbols`).
+
+        Avec `owner`, seuls les prix du premier propriétaire encore vivant valorisent le
+        carnet partagé : en mode autonome, chaque session simule ses propres prix et
+        l'historique du P&L ne doit pas alterner entre elles.
+        """
+        with self._lock:
+            if owner is not None:
+                current = self._owner() if self._owner is not None else None
+                if current is None:
+                    self._owner = weakref.ref(owner)
+                elif current is not owner:
+                    return self.values
+            n = len(self.users)
+            self.last_prices = np.asarray(prices, dtype=float)
+            self.values = self._quantities[:n] @ self.last_prices
+            pnl = np.full(self._pnl_history.shape, np.nan, dtype=np.float32)
+            pnl[:n] = self.values - self._cost_totals[:n]
+            self._pnl_history.append(timestamp_ns or time.time_ns(), pnl)
+            return self.values
+
+    def pnl_state(self):
+        """(utilisateurs, horodatages, P&L) de l'historique intraday, copiés pour l'instantané"""
+        with self._lock:
+            times, pnl = self._pnl_history.last()
+            return list(self.users), times.copy(), pnl[:, :len(self.users)].copy()
+
+    def load_pnl(self, users, times, pnl):
+        """Reprend l'historique intraday d'un instantané si le carnet n'en a pas encore ; colonnes associées par utilisateur"""
+        with self._lock:
+            if self._pnl_history.count or not len(times):
+                return False
+            rows = np.full((len(times),) + self._pnl_history.shape, np.nan, dtype=np.float32)
+            for col, user in enumerate(users):
+                if user in self._user_index:
+                    rows[:, self._user_index[user]] = pnl[:, col]
+            self._pnl_history.extend(times, rows)
+            return True
+
+    def value(self, user):
+        """Valeur du portefeuille lors de la dernière valorisation"""
+        idx = self._user_index.get(user)
+        return float(self.values[idx]) if idx is not None and idx < len(self.values) else 0.0
+
+    def pnl_history(self, user, n=None):
+        """Série du P&L latent de l'utilisateur sur les n derniers ticks"""
+        times, pnl = self._pnl_history.last(n)
+        idx = self._user_index.get(user)
+        values = pnl[:, idx] if idx is not None else np.full(len(times), np.nan)
+        return pd.DataFrame({'date': pd.to_datetime(times), 'pnl': values}).dropna()
+
+    def exposure(self, groups, user=None):
+        """Exposition en valeur agrégée par groupe (catégorie, blockchain...) pour un utilisateur ou le desk"""
+        if self.last_prices is None:
+            return pd.Series(dtype=float)
+        codes, labels = pd.factorize(pd.Series(self.symbols).map(groups).fillna('Autre'))
+        if user is None:
+            quantities = self._quantities[:len(self.users)].sum(axis=0)
+        elif user in self._user_index:
+            quantities = self._quantities[self._user_index[user]]
+        else:
+            return pd.Series(dtype=float)
+        totals = np.bincount(codes, weights=quantities * self.last_prices, minlength=len(labels))
+        return pd.Series(totals, index=labels).loc[lambda s: s != 0].sort_values(ascending=False)
+
+    def _set(self, user, symbol, quantity, cost_price):
+        idx = self.add_portfolio(user)
+        col = self._symbol_index[symbol]
+        self._quantities[idx, col] = quantity
+        self._cost_prices[idx, col] = cost_price if quantity else 0.0
+        self._cost_totals[idx] = self._quantities[idx] @ self._cost_prices[idx]
+
+    def _grow(self, slots):
+        old = len(self._quantities)
+        for name in ('_quantities', '_cost_prices'):
+            grown = np.zeros((slots, len(self.symbols)))
+            grown[:old] = getattr(self, name)
+            setattr(self, name, grown)
+        cost_totals = np.zeros(slots)
+        cost_totals[:old] = self._cost_totals
+        self._cost_totals = cost_totals
+        self._pnl_history = self._pnl_history.widen(slots)
@@ -0,0 +1,228 @@
+"""Précalcul en arrière-plan des analyses par symbole, réparti sur le pool de processus"""
+import atexit
+import functools
+import heapq
+import itertools
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+from plotly.subplots import make_subplots
+
+from .figure_cache import get_figure_cache
+from .indicators import bollinger_bands, rsi
+from .parallel import SharedArray, get_process_pool
+from .transport import compact_figure
+
+# Priorités : symboles affichés d'abord, puis les autres dans l'ordre des cartes
+VISIBLE, BACKGROUND = 0, 1
+
+_scheduler = None
+
+
+def get_precompute_scheduler():
+    """Ordonnanceur partagé par les sessions du processus, créé au premier usage"""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = PrecomputeScheduler()
+        atexit.register(_scheduler.close)
+    return _scheduler
+
+
+def technical_figure(dates, prices, symbol):
+    """Prix, moyennes mobiles 20 / 50 jours, bandes de Bollinger et RSI d'une cryptomonnaie"""
+    prices = pd.Series(prices, index=dates).dropna()
+    dates = prices.index
+    ma20 = prices.rolling(window=20).mean()
+    ma50 = prices.rolling(window=50).mean()
+    upper, lower = bollinger_bands(prices)
+
+    fig = make_subplots(rows=3, cols=1,
+                        shared_xaxes=True,
+                        vertical_spacing=0.05,
+                        subplot_titles=('Prix et Moyennes Mobiles', 'Bandes de Bollinger', 'RSI'),
+                        row_heights=[0.5, 0.25, 0.25])
+
+    # Prix et moyennes mobiles
+    fig.add_trace(go.Scatter(x=dates, y=prices, name='Prix', line=dict(color='#F7931A')), row=1, col=1)
+    fig.add_trace(go.Scatter(x=dates, y=ma20, name='MM20', line=dict(color='orange')), row=1, col=1)
+    fig.add_trace(go.Scatter(x=dates, y=ma50, name='MM50', line=dict(color='red')), row=1, col=1)
+
+    # Bandes de Bollinger
+    fig.add_trace(go.Scatter(x=dates, y=upper, name='Bollinger High',
+                             line=dict(color='gray', dash='dash')), row=2, col=1)
+    fig.add_trace(go.Scatter(x=dates, y=prices, name='Prix', line=dict(color='#F7931A'),
+                             showlegend=False), row=2, col=1)
+    fig.add_trace(go.Scatter(x=dates, y=lower, name='Bollinger Low',
+                             line=dict(color='gray', dash='dash'), fill='tonexty'), row=2, col=1)
+
+    # RSI
+    fig.add_trace(go.Scatter(x=dates, y=rsi(prices), name='RSI', line=dict(color='purple')), row=3, col=1)
+    fig.add_hline(y=70, line_dash="dash", line_color="red", row=3, col=1)
+    fig.add_hline(y=30, line_dash="dash", line_color="green", row=3, col=1)
+
+    fig.update_layout(height=800, title_text=f"Analyse Technique - {symbol}")
+    return fig
+
+
+# Graphiques précalculés : identifiant du FigureCache -> construction à partir (dates, prix, symbole)
+PRECOMPUTED_CHARTS = {
+    'analyse_technique': technical_figure,
+}
+
+
+def _run_job(args):
+    """Construit et sérialise un graphique d'un symbole sur les prix partagés (exécuté dans un worker)"""
+    chart_id, symbol, column, prices_desc, dates_desc = args
+    prices = np.asarray(SharedArray.attach(prices_desc))[:, column]
+    dates = pd.DatetimeIndex(np.asarray(SharedArray.attach(dates_desc)).view('M8[ns]'), name='date')
+    fig = compact_figure(PRECOMPUTED_CHARTS[chart_id](dates, prices, symbol))
+    return pio.to_json(fig, validate=False)
+
+
+class PrecomputeScheduler:
+    """Calcule en arrière-plan, symbole par symbole, les graphiques de PRECOMPUTED_CHARTS.
+
+    Quand le filigrane de l'historique change, la matrice des prix est placée une fois en
+    mémoire partagée et une tâche par (graphique, symbole) est mise en file. Un thread
+    d'ordonnancement n'envoie au pool que `max_in_flight` tâches à la fois, par ordre de
+    priorité : un symbole affiché passe devant les autres. Un nouveau filigrane remplace
+    la file ; les tâches de l'ancien déjà lancées finissent mais leur résultat est ignoré.
+    Les JSON produits sont rangés dans le FigureCache, où `cached_figure` les retrouve.
+    """
+
+    def __init__(self, max_in_flight=None, pool=None):
+        self.max_in_flight = max_in_flight or os.cpu_count() or 1
+        self.pool = pool
+        self.watermark = None
+        self.completed = 0
+        self.cancelled = 0
+        self.failed = 0
+        self._queue = []     # (priorité, ordre, graphique, symbole)
+        self._pending = {}   # (graphique, symbole) -> priorité, pour les tâches du filigrane courant
+        self._running = set()  # (filigrane, graphique, symbole) envoyés au pool
+        self._shared = {}    # filigrane -> (prix partagés, dates partagées, colonnes, tâches en cours)
+        self._order = itertools.count()
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def schedule(self, watermark, prices, priority=()):
+        """Met en file les tâches d'un filigrane (dates x symboles) ; sans effet s'il est déjà planifié"""
+        with self._condition:
+            if watermark != self.watermark:
+                self.cancelled += len(self._pending)
+                self._queue = []
+                self._pending = {}
+                self.watermark = watermark
+                self._release()
+                cache = get_figure_cache()
+                for symbol in prices.columns:
+                    for chart_id in PRECOMPUTED_CHARTS:
+                        # Graphiques repris d'un instantané : déjà en cache, rien à calculer
+                        if not cache.contains(chart_id, symbol, watermark):
+                            self._push(chart_id, symbol, BACKGROUND)
+                if self._pending:
+                    self._shared[watermark] = [
+                        SharedArray.from_array(prices.to_numpy(dtype=np.float64), prefix='precompute_'),
+                        SharedArray.from_array(prices.index.as_unit('ns').asi8, prefix='precompute_'),
+                        {symbol: i for i, symbol in enumerate(prices.columns)},
+                        0,
+                    ]
+            self._prioritize(priority)
+            self._condition.notify()
+
+    def prioritize(self, symbols):
+        """Fait passer les tâches en attente de ces symboles devant les autres"""
+        with self._condition:
+            self._prioritize(symbols)
+            self._condition.notify()
+
+    def pending(self, chart_id, symbol, watermark):
+        """Vrai si le graphique de ce symbole pour ce filigrane est en file ou en cours de calcul"""
+        with self._condition:
+            return watermark == self.watermark and (
+                (chart_id, symbol) in self._pending or (watermark, chart_id, symbol) in self._running)
+
+    def stats(self):
+        """Tâches en file, en cours, terminées, annulées et en échec"""
+        with self._condition:
+            return {'en_file': len(self._pending), 'en_cours': len(self._running), 'terminees': self.completed,
+                    'annulees': self.cancelled, 'echecs': self.failed}
+
+    def close(self):
+        """Arrête l'ordonnancement et supprime la mémoire partagée (les tâches en cours ne sont pas rangées)"""
+        with self._condition:
+            self._closed = True
+            self._queue = []
+            self._pending = {}
+            self.watermark = None
+            for prices, dates, _, _ in self._shared.values():
+                prices.close()
+                dates.close()
+            self._shared = {}
+            self._condition.notify_all()
+
+    def _push(self, chart_id, symbol, priority):
+        self._pending[(chart_id, symbol)] = priority
+        heapq.heappush(self._queue, (priority, next(self._order), chart_id, symbol))
+
+    def _prioritize(self, symbols):
+        for symbol in symbols:
+            for chart_id in PRECOMPUTED_CHARTS:
+                if self._pending.get((chart_id, symbol), VISIBLE) != VISIBLE:
+                    # L'ancienne entrée reste dans le tas et sera ignorée à sa sortie
+                    self._push(chart_id, symbol, VISIBLE)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._closed and (not self._queue or len(self._running) >= self.max_in_flight):
+                    self._condition.wait()
+                if self._closed:
+                    return
+                priority, _, chart_id, symbol = heapq.heappop(self._queue)
+                if self._pending.get((chart_id, symbol)) != priority:
+                    continue  # Entrée remplacée par une priorité plus haute, ou filigrane abandonné
+                del self._pending[(chart_id, symbol)]
+                shared = self._shared[self.watermark]
+                shared[3] += 1
+                job = (chart_id, symbol, shared[2][symbol], shared[0].descriptor, shared[1].descriptor)
+                key = (self.watermark, chart_id, symbol)
+                self._running.add(key)
+            # Envoi hors du verrou : le callback de fin peut s'exécuter immédiatement
+            try:
+                future = (self.pool or get_process_pool()).submit(_run_job, job)
+            except RuntimeError:
+                # Pool arrêté (fin du processus) : plus rien à lancer
+                self.close()
+                return
+            future.add_done_callback(functools.partial(self._done, key))
+
+    def _done(self, key, future):
+        watermark, chart_id, symbol = key
+        error = future.exception()
+        if error is None and watermark == self.watermark:
+            # Rangé avant la fin de la tâche : `pending()` faux implique le résultat disponible
+            get_figure_cache().put(chart_id, symbol, watermark, future.result())
+        with self._condition:
+            self._running.discard(key)
+            if watermark in self._shared:
+                self._shared[watermark][3] -= 1
+            if error is not None:
+                self.failed += 1
+            elif watermark == self.watermark:
+                self.completed += 1
+            self._release()
+            self._condition.notify()
+
+    def _release(self):
+        # Libère la mémoire partagée des filigranes abandonnés qui n'ont plus de tâche en cours
+        for watermark in [w for w, shared in self._shared.items() if w != self.watermark and not shared[3]]:
+            prices, dates, _, _ = self._shared.pop(watermark)
+            prices.close()
+            dates.close()
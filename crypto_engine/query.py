@@ -0,0 +1,96 @@
+"""Requêtes colonnaires sur le stockage segmenté : filtres et agrégations exécutés par Arrow, sans tout charger"""
+import pandas as pd
+import pyarrow.compute as pc
+
+from .storage import TABLES
+
+BATCH_ROWS = 65536  # Lignes par lot des lectures en flux
+
+
+class HistoryQuery:
+    """Interroge une table du SegmentStore en poussant filtres, projections et groupby dans le moteur Arrow.
+
+    Les partitions hors de la plage de dates ne sont pas ouvertes ; dans les autres, le
+    lecteur Parquet écarte les groupes de lignes grâce à leurs statistiques et le filtre,
+    la projection et les agrégations s'exécutent en parallèle sur tous les cœurs. Les
+    lignes sont dédoublonnées comme `SegmentStore.read` avant toute agrégation ; seul le
+    résultat, déjà réduit, est converti en DataFrame.
+    """
+
+    def __init__(self, store, table='bars'):
+        self.store = store
+        self.table = table
+        self.time_col = TABLES[table]['time']
+
+    def scan(self, symbols=None, start=None, end=None, categories=None, columns=None):
+        """Lignes filtrées par symboles, plage de dates et catégories, limitées aux colonnes demandées"""
+        arrow_table = self._scan(symbols, start, end, categories, columns)
+        if arrow_table is None:
+            return pd.DataFrame(columns=columns)
+        return arrow_table.to_pandas()
+
+    def arrow(self, symbols=None, start=None, end=None, categories=None, columns=None):
+        """Même sélection que `scan`, en table Arrow sans conversion pandas (None si la plage est vide)"""
+        return self._scan(symbols, start, end, categories, columns)
+
+    def series(self, column, symbols=None, start=None, end=None, categories=None, freq='day'):
+        """Moyenne d'une colonne par symbole et par intervalle de temps (jour, heure...), triée par date"""
+        arrow_table = self._scan(symbols, start, end, categories, [self.time_col, 'symbole', column])
+        if arrow_table is None:
+            return pd.DataFrame(columns=[self.time_col, 'symbole', column])
+        # Arrondi à l'intervalle après le dédoublonnage, qui porte sur l'horodatage exact
+        arrow_table = arrow_table.set_column(0, self.time_col,
+                                             pc.floor_temporal(arrow_table[self.time_col], unit=freq))
+        result = (arrow_table.group_by([self.time_col, 'symbole'])
+                  .aggregate([(column, 'mean')])
+                  .select([self.time_col, 'symbole', f"{column}_mean"])
+                  .rename_columns([self.time_col, 'symbole', column])
+                  .sort_by([(self.time_col, 'ascending'), ('symbole', 'ascending')]))
+        return result.to_pandas()
+
+    def aggregate(self, by, metrics, symbols=None, start=None, end=None, categories=None):
+        """Agrégats par groupe ; `metrics` est une liste de (colonne, fonction Arrow[, options]) : mean, stddev, last..."""
+        by = [by] if isinstance(by, str) else list(by)
+        columns = list(dict.fromkeys(by + [metric[0] for metric in metrics]))
+        arrow_table = self._scan(symbols, start, end, categories, columns)
+        names = by + [f"{metric[0]}_{metric[1]}" for metric in metrics]
+        if arrow_table is None:
+            return pd.DataFrame(columns=names)
+        # first / last suivent l'ordre de lecture, chronologique (partitions puis segments) : groupby séquentiel
+        ordered = any(metric[1] in ('first', 'last') for metric in metrics)
+        # Arrow nomme chaque agrégat « colonne_fonction »
+        result = arrow_table.group_by(by, use_threads=not ordered).aggregate(list(metrics)).select(names)
+        return result.to_pandas().sort_values(by).reset_index(drop=True)
+
+    def quantiles(self, by, column, q=(0.0, 0.25, 0.5, 0.75, 1.0), symbols=None, start=None, end=None,
+                  categories=None):
+        """Quantiles approchés (t-digest) d'une colonne par groupe, une colonne par quantile"""
+        arrow_table = self._scan(symbols, start, end, categories, [by, column])
+        names = [f"q{int(round(x * 100))}" for x in q]
+        if arrow_table is None:
+            return pd.DataFrame(columns=[by] + names)
+        result = arrow_table.group_by(by).aggregate([(column, 'tdigest', pc.TDigestOptions(q=list(q)))])
+        digests = result.column(f"{column}_tdigest").combine_chunks()
+        frame = pd.DataFrame(pc.list_flatten(digests).to_numpy().reshape(-1, len(q)), columns=names)
+        frame.insert(0, by, result.column(by).to_pandas())
+        return frame.sort_values(by).reset_index(drop=True)
+
+    def count(self, symbols=None, start=None, end=None, categories=None):
+        """Nombre (majorant) de lignes de la sélection, sans les lire"""
+        return self.store.count_rows(self.table, self._filter(symbols, start, end, categories), start, end)
+
+    def batches(self, symbols=None, start=None, end=None, categories=None, columns=None, batch_size=BATCH_ROWS):
+        """Lots Arrow des lignes filtrées, partition par partition et triés par date : une partition en mémoire au plus"""
+        expression = self._filter(symbols, start, end, categories)
+        for arrow_table in self.store.iter_tables(self.table, expression, start, end, columns):
+            yield from arrow_table.to_batches(max_chunksize=batch_size)
+
+    def _scan(self, symbols, start, end, categories, columns):
+        return self.store.scan(self.table, self._filter(symbols, start, end, categories), start, end, columns)
+
+    def _filter(self, symbols, start, end, categories):
+        expression = self.store.filter(self.table, symbols, start, end)
+        if categories is not None:
+            condition = pc.field('categorie').isin(list(categories))
+            expression = condition if expression is None else expression & condition
+        return expression
@@ -0,0 +1,152 @@
+"""Rejeu de l'historique enregistré (ticks ou clôtures journalières) à vitesse réglable"""
+import time
+
+import pandas as pd
+
+from .storage import TABLES
+
+# Colonnes transmises au chemin de mise à jour des données courantes
+REPLAY_COLUMNS = ['timestamp', 'symbole', 'prix', 'change_pct', 'volume_journalier']
+SPEEDS = (1, 10, 100, 1000)
+
+
+class ReplayCursor:
+    """Lit une table du SegmentStore partition par partition et livre ses ticks au rythme d'une horloge de rejeu.
+
+    L'horloge de rejeu avance de `speed` secondes de données par seconde réelle à partir
+    du premier tick. `due()` regroupe en un lot tous les ticks échus, dans la limite de
+    `max_ticks` horodatages : si le consommateur ne suit pas, l'horloge est retardée
+    d'autant (contre-pression) au lieu d'accumuler un arriéré. Seule la partition en
+    cours de lecture est en mémoire.
+    """
+
+    def __init__(self, store, table='ticks', start=None, end=None, symbols=None, speed=1.0, max_ticks=256):
+        self.table = table
+        self.speed = float(speed)
+        self.max_ticks = max_ticks
+        self.ticks = 0   # Horodatages livrés
+        self.rows = 0    # Lignes livrées
+        self.lag_ns = 0  # Retard cumulé imposé à l'horloge par la contre-pression
+        self.position = None
+        self._last_price = {}
+        self._groups = self._iter_groups(store, symbols, start, end)
+        self._pending = next(self._groups, None)
+        self._origin = None  # (horloge murale, horodatage des données) au démarrage
+
+    @property
+    def finished(self):
+        return self._pending is None
+
+    def due(self, now_ns=None):
+        """Lot des ticks échus à l'instant donné (DataFrame trié par horodatage), ou None"""
+        if self._pending is None:
+            return None
+        now_ns = time.monotonic_ns() if now_ns is None else now_ns
+        if self._origin is None:
+            self._origin = (now_ns, self._pending[0].value)
+        replay_time = self.replay_time(now_ns)
+        batch = []
+        while self._pending is not None and self._pending[0].value <= replay_time and len(batch) < self.max_ticks:
+            batch.append(self._pending[1])
+            self.position = self._pending[0]
+            self._pending = next(self._groups, None)
+        if self._pending is not None and self._pending[0].value <= replay_time:
+            # Contre-pression : l'horloge repart du premier tick non livré
+            delay = int((replay_time - self._pending[0].value) / self.speed)
+            self._origin = (self._origin[0] + delay, self._origin[1])
+            self.lag_ns += delay
+        if not batch:
+            return None
+        self.ticks += len(batch)
+        frame = pd.concat(batch, ignore_index=True)
+        self.rows += len(frame)
+        return frame
+
+    def replay_time(self, now_ns=None):
+        """Horodatage des données (ns) atteint par l'horloge de rejeu"""
+        if self._origin is None:
+            return None
+        now_ns = time.monotonic_ns() if now_ns is None else now_ns
+        return self._origin[1] + int((now_ns - self._origin[0]) * self.speed)
+
+    def wait_time(self, now_ns=None):
+        """Secondes réelles avant le prochain tick (0 s'il est déjà échu)"""
+        if self._pending is None or self._origin is None:
+            return 0.0
+        return max(0.0, (self._pending[0].value - self.replay_time(now_ns)) / self.speed / 1e9)
+
+    def stream(self, sleep=time.sleep):
+        """Générateur de lots en temps réel : le consommateur impose son rythme en tirant les lots"""
+        while not self.finished:
+            batch = self.due()
+            if batch is None:
+                sleep(self.wait_time())
+                continue
+            yield batch
+
+    def _iter_groups(self, store, symbols, start, end):
+        time_col = TABLES[self.table]['time']
+        for frame in store.iter_partitions(self.table, symbols, start, end):
+            frame = self._to_ticks(frame.rename(columns={time_col: 'timestamp'}))
+            for timestamp, rows in frame.groupby('timestamp', sort=True):
+                yield pd.Timestamp(timestamp), rows
+
+    def _to_ticks(self, frame):
+        if self.table == 'ticks':
+            return frame[REPLAY_COLUMNS]
+        # Clôtures journalières : variation calculée par rapport à la clôture précédente rejouée
+        frame = frame[['timestamp', 'symbole', 'prix']].copy()
+        previous = frame.groupby('symbole')['prix'].shift()
+        first = previous.isna()
+        previous[first] = frame.loc[first, 'symbole'].map(self._last_price)
+        frame['change_pct'] = (frame['prix'] / previous - 1) * 100
+        frame['volume_journalier'] = float('nan')  # Les volumes des clôtures n'ont pas la même unité
+        self._last_price.update(frame.groupby('symbole')['prix'].last())
+        return frame[REPLAY_COLUMNS]
+
+
+class ReplayEngine:
+    """Ensemble de curseurs de rejeu indépendants d'une session, fusionnés par horodatage"""
+
+    def __init__(self, store):
+        self.store = store
+        self.cursors = {}
+        self._next_id = 1
+
+    def __len__(self):
+        return len(self.cursors)
+
+    @property
+    def active(self):
+        """Vrai tant qu'un curseur a encore des ticks à livrer"""
+        return any(not c.finished for c in self.cursors.values())
+
+    def open(self, name=None, **options):
+        """Ouvre un curseur (table, start, end, symbols, speed, max_ticks) ; retourne son nom"""
+        name = name or f"rejeu-{self._next_id}"
+        self._next_id += 1
+        self.cursors[name] = ReplayCursor(self.store, **options)
+        return name
+
+    def close(self, name=None):
+        """Ferme un curseur, ou tous"""
+        if name is None:
+            self.cursors.clear()
+        else:
+            self.cursors.pop(name, None)
+
+    def due(self, now_ns=None):
+        """Lots échus de tous les curseurs, fusionnés et triés par horodatage, ou None"""
+        now_ns = time.monotonic_ns() if now_ns is None else now_ns
+        batches = [b for b in (c.due(now_ns) for c in self.cursors.values()) if b is not None]
+        if not batches:
+            return None
+        return pd.concat(batches, ignore_index=True).sort_values('timestamp', kind='stable')
+
+    def stats(self):
+        """État de chaque curseur : table, vitesse, position, volumes livrés et retard"""
+        rows = [{'curseur': name, 'table': c.table, 'vitesse': c.speed, 'position': c.position,
+                 'ticks': c.ticks, 'lignes': c.rows, 'retard_s': c.lag_ns / 1e9, 'termine': c.finished}
+                for name, c in self.cursors.items()]
+        return pd.DataFrame(rows, columns=['curseur', 'table', 'vitesse', 'position', 'ticks',
+                                           'lignes', 'retard_s', 'termine'])
@@ -0,0 +1,80 @@
+"""Tampon circulaire préalloué pour des séries horodatées de taille bornée"""
+import numpy as np
+
+
+class RingBuffer:
+    """Conserve les `capacity` dernières lignes horodatées sans allocation à l'écriture.
+
+    Chaque ligne est écrite deux fois (positions i et i + capacity) : les n dernières
+    lignes forment toujours une tranche contiguë, renvoyée comme vue en lecture seule.
+    """
+
+    def __init__(self, capacity, shape, dtype=np.float64, fill=np.nan):
+        if capacity < 1:
+            raise ValueError("La capacité doit être d'au moins une ligne")
+        self.capacity = int(capacity)
+        shape = (shape,) if np.isscalar(shape) else tuple(shape)
+        self._data = np.full((2 * self.capacity,) + shape, fill, dtype=dtype)
+        self._times = np.zeros(2 * self.capacity, dtype=np.int64)  # epoch en nanosecondes
+        self._pos = 0
+        self.count = 0
+
+    @property
+    def shape(self):
+        """Forme d'une ligne du tampon"""
+        return self._data.shape[1:]
+
+    @property
+    def nbytes(self):
+        """Mémoire occupée, indépendante du nombre d'écritures"""
+        return self._data.nbytes + self._times.nbytes
+
+    def append(self, timestamp_ns, row):
+        """Ajoute une ligne, en écrasant la plus ancienne si le tampon est plein"""
+        i = self._pos
+        j = i + self.capacity
+        self._data[i] = row
+        self._data[j] = row
+        self._times[i] = timestamp_ns
+        self._times[j] = timestamp_ns
+        self._pos = i + 1 if i + 1 < self.capacity else 0
+        if self.count < self.capacity:
+            self.count += 1
+
+    def extend(self, times, rows):
+        """Ajoute un bloc de lignes d'un coup ; au-delà de la capacité, seules les dernières sont gardées"""
+        times = np.asarray(times)[-self.capacity:]
+        rows = np.asarray(rows)[-self.capacity:]
+        i = (self._pos + np.arange(len(times))) % self.capacity
+        self._data[i] = rows
+        self._data[i + self.capacity] = rows
+        self._times[i] = times
+        self._times[i + self.capacity] = times
+        self._pos = (self._pos + len(times)) % self.capacity
+        self.count = min(self.count + len(times), self.capacity)
+
+    def last(self, n=None):
+        """Vues (horodatages, lignes) sur les n dernières lignes, de la plus ancienne à la plus récente"""
+        n = self.count if n is None else max(0, min(n, self.count))
+        end = self._pos + self.capacity
+        times = self._times[end - n:end]
+        data = self._data[end - n:end]
+        times.flags.writeable = False
+        data.flags.writeable = False
+        return times, data
+
+    def latest(self):
+        """Dernière ligne écrite (vue), ou None si le tampon est vide"""
+        if not self.count:
+            return None
+        return self.last(1)[1][0]
+
+    def widen(self, width, fill=np.nan):
+        """Nouveau tampon dont la dernière dimension est élargie, historique conservé"""
+        shape = self.shape[:-1] + (width,)
+        wider = RingBuffer(self.capacity, shape, dtype=self._data.dtype, fill=fill)
+        wider._data[..., :self.shape[-1]] = self._data
+        wider._times[:] = self._times
+        wider._pos = self._pos
+        wider.count = self.count
+        return wider
@@ -0,0 +1,106 @@
+"""Scores de risque quantitatifs calculés à partir des données de marché"""
+import numpy as np
+import pandas as pd
+
+# Colonnes d'entrée attendues, une ligne par actif
+FEATURES = ['volatilite', 'drawdown_max', 'volume_journalier', 'volume_reference',
+            'spread', 'categorie', 'annee_creation']
+
+# Risque réglementaire par catégorie (exposition aux restrictions et au contrôle des régulateurs)
+RISQUE_REGLEMENTAIRE = {
+    'Privacy': 85,
+    'Exchange': 70,
+    'Stablecoin': 60,
+    'DeFi': 55,
+    'Meme': 50,
+    'Gaming': 40,
+    'Metaverse': 40,
+    'Layer 1': 35,
+    'Layer 2': 35,
+    'Majeures': 25,
+}
+
+# Pondérations des composantes dans le score global
+PONDERATIONS = {
+    'Risque de Marché': 0.45,
+    'Risque de Liquidité': 0.25,
+    'Risque Réglementaire': 0.15,
+    'Risque Technologique': 0.15,
+}
+
+
+def _scale(values, low, high):
+    """Ramène linéairement une mesure sur une échelle de risque 0-100"""
+    return np.clip((np.asarray(values, dtype=float) - low) / (high - low), 0.0, 1.0) * 100
+
+
+def score_risks(features, current_year=None):
+    """Calcule les scores de risque de tous les actifs en une passe vectorisée.
+
+    Les échelles sont absolues (et non des rangs) : le score d'un actif ne dépend que de
+    ses propres entrées, ce qui permet de ne recalculer que les lignes modifiées.
+    """
+    current_year = current_year or pd.Timestamp.now().year
+    scores = pd.DataFrame(index=features.index)
+
+    # Marché : volatilité réalisée annualisée (%) et drawdown maximal
+    scores['Risque de Marché'] = (
+        0.6 * _scale(features['volatilite'], 0, 150)
+        + 0.4 * _scale(features['drawdown_max'].abs(), 0, 90)
+    )
+
+    # Liquidité : profondeur absolue, baisse du volume par rapport à la normale et spread
+    volume = features['volume_journalier'].clip(lower=1e-6)
+    profondeur = _scale(-np.log10(volume), -1.5, 1.5)
+    baisse_volume = _scale(1 - volume / features['volume_reference'].clip(lower=1e-6), 0, 0.5)
+    scores['Risque de Liquidité'] = (
+        0.5 * profondeur + 0.2 * baisse_volume + 0.3 * _scale(features['spread'], 0, 0.5)
+    )
+
+    scores['Risque Réglementaire'] = features['categorie'].map(RISQUE_REGLEMENTAIRE).fillna(50).to_numpy()
+
+    # Technologique : un protocole récent a moins fait ses preuves
+    age = current_year - pd.to_numeric(features['annee_creation'], errors='coerce')
+    scores['Risque Technologique'] = 100 - _scale(age.fillna(0), 0, 15)
+
+    scores['Score Risque'] = sum(scores[col] * poids for col, poids in PONDERATIONS.items())
+    scores['Niveau'] = np.select(
+        [scores['Score Risque'] < 40, scores['Score Risque'] < 70],
+        ['FAIBLE', 'MOYEN'],
+        default='ÉLEVÉ'
+    )
+    return scores
+
+
+class RiskScorer:
+    """Tient à jour la table des scores en ne recalculant que les actifs dont les entrées changent"""
+
+    def __init__(self):
+        self.version = None
+        self._inputs = None
+        self._scores = None
+
+    def update(self, features, version=None):
+        """Retourne les scores pour la version des données, en recalcul partiel si possible"""
+        if version is not None and version == self.version and self._scores is not None:
+            return self._scores
+
+        features = features[FEATURES]
+        if self._inputs is None or not self._inputs.columns.equals(features.columns):
+            changed = pd.Series(True, index=features.index)
+        else:
+            previous = self._inputs.reindex(features.index)
+            same = (previous == features) | (previous.isna() & features.isna())
+            changed = ~same.all(axis=1)
+
+        if changed.all():
+            scores = score_risks(features)
+        else:
+            scores = self._scores.reindex(features.index)
+            if changed.any():
+                scores.loc[changed] = score_risks(features.loc[changed])
+
+        self._inputs = features.copy()
+        self._scores = scores
+        self.version = version
+        return scores
@@ -0,0 +1,37 @@
+"""Flux aléatoires reproductibles de la simulation de marché"""
+import zlib
+
+import numpy as np
+import pandas as pd
+
+
+def _stream_key(key):
+    """Entier positif stable pour une clé de flux (horodatage, date, entier ou texte)"""
+    if isinstance(key, (pd.Timestamp, np.datetime64)) or hasattr(key, 'timetuple'):
+        return int(pd.Timestamp(key).as_unit('ns').value)
+    if isinstance(key, str):
+        return zlib.crc32(key.encode())
+    return int(key)
+
+
+class MarketSimulator:
+    """Distribue à chaque composant de la simulation un générateur NumPy indépendant.
+
+    Chaque flux est dérivé de la graine principale, du nom du composant et d'une clé
+    (date d'une journée d'historique, horodatage d'un tick...) : la même graine et la même
+    clé donnent toujours les mêmes tirages, quel que soit l'ordre des appels, la session
+    ou le nombre de reruns. Sans graine, l'entropie est tirée une fois à la création.
+    """
+
+    def __init__(self, seed=None):
+        self.seed = seed
+        self.entropy = np.random.SeedSequence(seed).entropy
+
+    @property
+    def deterministic(self):
+        return self.seed is not None
+
+    def stream(self, component, key=0):
+        """Générateur du composant pour une clé donnée"""
+        sequence = np.random.SeedSequence(self.entropy, spawn_key=(zlib.crc32(component.encode()), _stream_key(key)))
+        return np.random.default_rng(sequence)
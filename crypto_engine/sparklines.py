@@ -0,0 +1,55 @@
+"""Mini-graphiques SVG (sparklines) légers pour les cartes de cryptomonnaies"""
+import numpy as np
+import pandas as pd
+
+WIDTH = 120
+HEIGHT = 32
+COLORS = {'hausse': '#00C853', 'baisse': '#FF1744'}
+
+
+def sparkline_paths(values, width=WIDTH, height=HEIGHT, pad=2):
+    """Tracés SVG (attribut d) de chaque colonne d'une matrice points x symboles, mise à l'échelle en une passe"""
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    low = np.nanmin(values, axis=0)
+    span = np.nanmax(values, axis=0) - low
+    span[~(span > 0)] = 1.0
+    x = np.linspace(pad, width - pad, n) if n > 1 else np.full(1, width / 2)
+    y = height - pad - (values - low) / span * (height - 2 * pad)
+    y = np.where(np.isfinite(y), y, height / 2)
+    paths = []
+    for column in y.T:
+        paths.append('M' + ' L'.join(f"{a:.1f},{b:.1f}" for a, b in zip(x, column)) if n else '')
+    return paths
+
+
+def sparkline_svg(path, color, width=WIDTH, height=HEIGHT):
+    """Élément SVG autonome à insérer dans le HTML d'une carte"""
+    return (f'<svg width="{width}" height="{height}" viewBox="0 0 {width} {height}" '
+            f'xmlns="http://www.w3.org/2000/svg"><path d="{path}" fill="none" stroke="{color}" '
+            f'stroke-width="1.5" stroke-linejoin="round"/></svg>')
+
+
+class SparklineCache:
+    """Conserve le SVG de chaque symbole tant que sa version de données ne change pas.
+
+    Les symboles dont la version a changé sont retracés ensemble, en une seule mise à
+    l'échelle vectorisée ; les autres sont servis depuis le cache.
+    """
+
+    def __init__(self, width=WIDTH, height=HEIGHT):
+        self.width = width
+        self.height = height
+        self._svgs = {}
+
+    def render(self, symbols, values, versions):
+        """SVG par symbole pour une matrice points x symboles et une version de données par symbole"""
+        stale = [i for i, (s, v) in enumerate(zip(symbols, versions)) if self._svgs.get(s, (None,))[0] != v]
+        if stale:
+            # Les points manquants (symbole plus récent que la fenêtre) reprennent la valeur voisine
+            values = pd.DataFrame(np.asarray(values, dtype=float)[:, stale]).ffill().bfill().to_numpy()
+            paths = sparkline_paths(values, self.width, self.height)
+            for col, (i, path) in enumerate(zip(stale, paths)):
+                trend = 'hausse' if not values[-1, col] < values[0, col] else 'baisse'
+                self._svgs[symbols[i]] = (versions[i], sparkline_svg(path, COLORS[trend], self.width, self.height))
+        return {s: self._svgs[s][1] for s in symbols}
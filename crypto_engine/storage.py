@@ -0,0 +1,273 @@
+"""Stockage persistant des séries (barres journalières, ticks) en segments Parquet partitionnés par période"""
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Table -> colonne temporelle et granularité des partitions
+TABLES = {
+    'bars': {'time': 'date', 'partition': 'M'},
+    'ticks': {'time': 'timestamp', 'partition': 'D'},
+    # Journal des modifications de positions : un horodatage distinct par écriture
+    'positions': {'time': 'horodatage', 'partition': 'Y'},
+}
+# Au-delà de ce nombre de segments, une partition est compactée à l'écriture
+MAX_PARTS = 32
+# Verrou de compaction d'une partition, créé en exclusif par le processus ou le thread qui compacte
+COMPACTION_LOCK = '.compaction'
+LOCK_TIMEOUT = 300.0  # Secondes au-delà desquelles un verrou abandonné (processus arrêté) est repris
+READ_ATTEMPTS = 5  # Relectures de la liste des segments si une compaction en supprime un pendant la lecture
+
+
+class SegmentStore:
+    """Stocke chaque table en segments Parquet immuables, un répertoire par période.
+
+    Une insertion écrit un nouveau segment par partition touchée (écriture atomique par
+    renommage) ; la compaction fusionne les segments d'une partition en un seul, trié et
+    dédoublonné sur (symbole, date). Les lectures n'ouvrent que les partitions de la plage
+    demandée, filtrent symboles et dates dans le lecteur Parquet et dédoublonnent de la
+    même façon les segments pas encore compactés.
+
+    Sessions, producteur et workers écrivent dans le même répertoire : une seule compaction
+    à la fois par partition (fichier verrou exclusif), et une lecture qui trouve un segment
+    supprimé entre-temps relit la liste des segments.
+    """
+
+    def __init__(self, root, max_parts=MAX_PARTS):
+        self.root = root
+        self.max_parts = max_parts
+
+    def append(self, table, frame):
+        """Insère un lot de lignes ; retourne le nombre de segments écrits"""
+        if frame is None or len(frame) == 0:
+            return 0
+        time_col = TABLES[table]['time']
+        frame = frame.reset_index(drop=True)
+        frame[time_col] = pd.to_datetime(frame[time_col])
+        periods = frame[time_col].dt.to_period(TABLES[table]['partition']).astype(str)
+        written = 0
+        for period, rows in frame.groupby(periods, sort=True):
+            directory = os.path.join(self.root, table, period)
+            os.makedirs(directory, exist_ok=True)
+            self._write(directory, pa.Table.from_pandas(rows, preserve_index=False))
+            written += 1
+            if len(self._segments(directory)) > self.max_parts:
+                self._compact_partition(table, directory)
+        return written
+
+    def read(self, table, symbols=None, start=None, end=None, columns=None):
+        """Lignes d'une plage de dates pour une liste de symboles, triées par date"""
+        time_col = TABLES[table]['time']
+        result = self.scan(table, self.filter(table, symbols, start, end), start, end,
+                           self._key_columns(table, columns))
+        if result is None:
+            return pd.DataFrame(columns=columns)
+        result = result.sort_by(time_col).to_pandas()
+        return result if columns is None else result[list(columns)]
+
+    def iter_partitions(self, table, symbols=None, start=None, end=None, columns=None):
+        """Lignes filtrées partition par partition, dans l'ordre chronologique, sans tout charger"""
+        for arrow_table in self.iter_tables(table, self.filter(table, symbols, start, end), start, end, columns):
+            yield arrow_table.to_pandas()
+
+    def iter_tables(self, table, expression=None, start=None, end=None, columns=None):
+        """Tables Arrow filtrées par l'expression, une par partition de la plage, triées par date"""
+        time_col = TABLES[table]['time']
+        read_columns = self._key_columns(table, columns)
+        for directory in self.partitions(table, start, end):
+            arrow_table = self._read_segments(table, [directory], read_columns, expression)
+            if arrow_table is not None and arrow_table.num_rows:
+                arrow_table = arrow_table.sort_by(time_col)
+                yield arrow_table if columns is None else arrow_table.select(columns)
+
+    def scan(self, table, expression=None, start=None, end=None, columns=None):
+        """Table Arrow des lignes de la plage filtrées par l'expression, une par (symbole, horodatage), ou None"""
+        return self._read_segments(table, self.partitions(table, start, end), columns, expression)
+
+    def count_rows(self, table, expression=None, start=None, end=None):
+        """Nombre de lignes filtrées de la plage, compté par le lecteur sans matérialiser les colonnes.
+
+        Les doublons de segments pas encore compactés sont comptés : c'est un majorant.
+        """
+        for attempt in range(READ_ATTEMPTS):
+            files = [f for directory in self.partitions(table, start, end) for f in self._segments(directory)]
+            if not files:
+                return 0
+            try:
+                return ds.dataset(files, format='parquet').count_rows(filter=expression)
+            except FileNotFoundError:
+                if attempt == READ_ATTEMPTS - 1:
+                    raise
+
+    def filter(self, table, symbols=None, start=None, end=None):
+        """Expression de filtre sur le symbole et la colonne temporelle, poussée dans le lecteur"""
+        time_col = TABLES[table]['time']
+        expression = None
+        conditions = []
+        if symbols is not None:
+            conditions.append(pc.field('symbole').isin(list(symbols)))
+        if start is not None:
+            conditions.append(pc.field(time_col) >= pd.Timestamp(start))
+        if end is not None:
+            conditions.append(pc.field(time_col) <= pd.Timestamp(end))
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+        return expression
+
+    def partitions(self, table, start=None, end=None):
+        """Répertoires des partitions d'une table, élagués sur la plage de dates"""
+        base = os.path.join(self.root, table)
+        if not os.path.isdir(base):
+            return []
+        freq = TABLES[table]['partition']
+        first = pd.Timestamp(start).to_period(freq) if start is not None else None
+        last = pd.Timestamp(end).to_period(freq) if end is not None else None
+        selected = []
+        for name in sorted(os.listdir(base)):
+            period = pd.Period(name, freq=freq)
+            if (first is None or period >= first) and (last is None or period <= last):
+                selected.append(os.path.join(base, name))
+        return selected
+
+    def last_time(self, table):
+        """Horodatage le plus récent de la table, ou None si elle est vide"""
+        partitions = self.partitions(table)
+        if not partitions:
+            return None
+        time_col = TABLES[table]['time']
+        arrow_table = self._read_segments(table, partitions[-1:], [time_col])
+        return None if arrow_table is None else pd.Timestamp(pc.max(arrow_table[time_col]).as_py())
+
+    def latest(self, table):
+        """Dernière ligne de chaque symbole dans la partition la plus récente"""
+        partitions = self.partitions(table)
+        if not partitions:
+            return pd.DataFrame()
+        arrow_table = self._read_segments(table, partitions[-1:])
+        if arrow_table is None:
+            return pd.DataFrame()
+        frame = arrow_table.to_pandas().sort_values(TABLES[table]['time'], kind='stable')
+        return frame.groupby('symbole', sort=False).tail(1).reset_index(drop=True)
+
+    def schema(self, table):
+        """Schéma Arrow du segment le plus récent de la table, ou None si elle est vide"""
+        for _ in range(READ_ATTEMPTS):
+            partitions = self.partitions(table)
+            segments = self._segments(partitions[-1]) if partitions else []
+            if not segments:
+                return None
+            try:
+                return pq.read_schema(segments[-1])
+            except FileNotFoundError:
+                # Segment fusionné entre-temps par une compaction : nouvelle liste
+                continue
+        return None
+
+    def compact(self, table, start=None, end=None):
+        """Fusionne les segments de chaque partition de la plage ; retourne le nombre de partitions compactées"""
+        compacted = 0
+        for directory in self.partitions(table, start, end):
+            if len(self._segments(directory)) > 1 and self._compact_partition(table, directory):
+                compacted += 1
+        return compacted
+
+    def _compact_partition(self, table, directory):
+        """Fusionne les segments de la partition ; False si une autre compaction y est en cours"""
+        lock = os.path.join(directory, COMPACTION_LOCK)
+        if not self._lock(lock):
+            return False
+        try:
+            # Aucune autre compaction ne peut supprimer ces segments tant que le verrou est tenu
+            segments = self._segments(directory)
+            if len(segments) < 2:
+                return False
+            time_col = TABLES[table]['time']
+            frame = ds.dataset(segments, format='parquet').to_table().to_pandas()
+            # Les segments sont lus dans l'ordre d'écriture : la dernière version d'une ligne l'emporte
+            frame = (frame.drop_duplicates(subset=['symbole', time_col], keep='last')
+                     .sort_values([time_col, 'symbole'], kind='stable'))
+            # Le segment fusionné prend la place du plus récent : un segment écrit pendant la
+            # compaction reste plus récent que lui, et un lecteur voit l'ancien ou le nouveau
+            self._write(directory, pa.Table.from_pandas(frame, preserve_index=False),
+                        name=os.path.basename(segments[-1]))
+            for path in segments[:-1]:
+                os.remove(path)
+            return True
+        finally:
+            os.remove(lock)
+
+    def _read_segments(self, table, directories, columns=None, expression=None):
+        """Segments des partitions lus d'un bloc et dédoublonnés s'il y en a plusieurs par partition ; None sans segment"""
+        for attempt in range(READ_ATTEMPTS):
+            listing = [self._segments(directory) for directory in directories]
+            files = [path for segments in listing for path in segments]
+            if not files:
+                return None
+            # Une partition compactée n'a qu'un segment, déjà dédoublonné
+            fragmented = any(len(segments) > 1 for segments in listing)
+            try:
+                arrow_table = ds.dataset(files, format='parquet').to_table(
+                    columns=self._key_columns(table, columns) if fragmented else columns, filter=expression)
+                break
+            except FileNotFoundError:
+                # Segment fusionné par une compaction concurrente après la liste : nouvelle liste
+                if attempt == READ_ATTEMPTS - 1:
+                    raise
+        if fragmented:
+            arrow_table = self._latest_rows(arrow_table, TABLES[table]['time'])
+            if columns is not None:
+                arrow_table = arrow_table.select(list(columns))
+        return arrow_table
+
+    @staticmethod
+    def _key_columns(table, columns):
+        # Symbole et colonne temporelle sont lus pour le dédoublonnage et le tri même s'ils ne sont pas demandés
+        if columns is None:
+            return None
+        return list(columns) + [c for c in ('symbole', TABLES[table]['time']) if c not in columns]
+
+    @staticmethod
+    def _latest_rows(arrow_table, time_col):
+        """Une ligne par (symbole, horodatage) : entre segments, la dernière écrite l'emporte, comme à la compaction"""
+        if 'symbole' not in arrow_table.column_names or time_col not in arrow_table.column_names:
+            return arrow_table
+        # Les segments sont lus dans l'ordre d'écriture : le plus grand numéro de ligne est la dernière version
+        numbered = arrow_table.append_column('_ligne', pa.array(np.arange(arrow_table.num_rows)))
+        latest = numbered.group_by(['symbole', time_col], use_threads=False).aggregate([('_ligne', 'max')])
+        if latest.num_rows == arrow_table.num_rows:
+            return arrow_table
+        return arrow_table.take(np.sort(latest['_ligne_max'].to_numpy()))
+
+    @staticmethod
+    def _lock(path):
+        """Crée le fichier verrou en exclusif ; un verrou plus vieux que LOCK_TIMEOUT est repris"""
+        for _ in range(2):
+            try:
+                os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return True
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(path) < LOCK_TIMEOUT:
+                        return False
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        return False
+
+    @staticmethod
+    def _segments(directory):
+        return [os.path.join(directory, f) for f in sorted(os.listdir(directory)) if f.endswith('.parquet')]
+
+    @staticmethod
+    def _write(directory, table, name=None):
+        # Nom croissant avec l'heure d'écriture ; le renommage rend le segment visible d'un coup
+        name = name or f"part-{time.time_ns():020d}-{os.getpid()}-{threading.get_ident()}.parquet"
+        tmp = os.path.join(directory, '.' + name + '.tmp')
+        pq.write_table(table, tmp)
+        os.replace(tmp, os.path.join(directory, name))
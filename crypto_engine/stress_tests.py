@@ -0,0 +1,152 @@
+"""Stress tests Monte Carlo : trajectoires de rendements corrélées sous scénarios de choc"""
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+from .parallel import get_process_pool
+
+# Chocs cumulés sur l'horizon, par symbole, par catégorie, puis valeur par défaut (altcoins)
+SCENARIOS = {
+    'Historique': {
+        'description': 'Dérive et covariance observées sur la fenêtre historique',
+        'chocs': {},
+        'chocs_categorie': {},
+        'choc_defaut': None,
+        'multiplicateur_volatilite': 1.0,
+    },
+    'Bear Market': {
+        'description': 'Bitcoin -70%, altcoins -85%, volatilité accrue',
+        'chocs': {'BTC/USD': -0.70},
+        'chocs_categorie': {'Stablecoin': 0.0},
+        'choc_defaut': -0.85,
+        'multiplicateur_volatilite': 1.5,
+    },
+    'Bull Run': {
+        'description': 'Bitcoin +300%, altcoins +500%',
+        'chocs': {'BTC/USD': 3.0},
+        'chocs_categorie': {'Stablecoin': 0.0},
+        'choc_defaut': 5.0,
+        'multiplicateur_volatilite': 1.2,
+    },
+    'Crash Éclair': {
+        'description': 'Bitcoin -35%, altcoins -50% sur une période courte',
+        'chocs': {'BTC/USD': -0.35},
+        'chocs_categorie': {'Stablecoin': 0.0},
+        'choc_defaut': -0.50,
+        'multiplicateur_volatilite': 2.0,
+    },
+}
+
+BATCH_SIZE = 5000
+# Nombre maximal de tirages (trajectoires x jours x actifs) par lot, pour borner la mémoire
+MAX_BATCH_ELEMENTS = 4_000_000
+# En dessous de ce nombre de trajectoires, le démarrage du pool coûte plus qu'il ne rapporte
+POOL_MIN_PATHS = 50000
+
+
+def scenario_drifts(scenario, symbols, categories, mean_returns, horizon):
+    """Dérive logarithmique journalière de chaque actif sous le scénario"""
+    drifts = np.asarray(mean_returns, dtype=float).copy()
+    for i, (symbol, categorie) in enumerate(zip(symbols, categories)):
+        if symbol in scenario['chocs']:
+            choc = scenario['chocs'][symbol]
+        elif categorie in scenario['chocs_categorie']:
+            choc = scenario['chocs_categorie'][categorie]
+        else:
+            choc = scenario['choc_defaut']
+        if choc is not None:
+            drifts[i] = np.log1p(choc) / horizon
+    return drifts
+
+
+def _factor(cov):
+    """Racine de la matrice de covariance, tolérante aux matrices semi-définies"""
+    values, vectors = np.linalg.eigh(cov)
+    return vectors * np.sqrt(np.clip(values, 0, None))
+
+
+def _simulate_batch(args):
+    """Simule un lot de trajectoires et retourne rendement final et drawdown max du portefeuille"""
+    seed, n_paths, horizon, drifts, factor, weights = args
+    rng = np.random.default_rng(seed)
+    n_assets = len(drifts)
+
+    # Simple précision : deux fois moins de mémoire, précision largement suffisante ici
+    shocks = rng.standard_normal((n_paths, horizon, n_assets), dtype=np.float32)
+    log_returns = (shocks.reshape(-1, n_assets) @ factor.T.astype(np.float32)).reshape(shocks.shape)
+    log_returns += drifts.astype(np.float32)
+    np.cumsum(log_returns, axis=1, out=log_returns)
+    np.exp(log_returns, out=log_returns)
+
+    # Valeur du portefeuille (base 1) à chaque pas, point de départ inclus
+    values = np.empty((n_paths, horizon + 1))
+    values[:, 0] = 1.0
+    values[:, 1:] = log_returns @ weights.astype(np.float32)
+    peaks = np.maximum.accumulate(values, axis=1)
+    drawdowns = (values / peaks - 1).min(axis=1)
+
+    return (values[:, -1] - 1).astype(np.float32), drawdowns.astype(np.float32)
+
+
+class StressTestEngine:
+    """Lance les simulations Monte Carlo et met en cache leurs résultats.
+
+    Les trajectoires sont générées par lots, chaque lot ayant sa propre graine dérivée de
+    la graine principale : le résultat ne dépend donc pas du nombre de workers.
+    """
+
+    def __init__(self, max_entries=32, batch_size=BATCH_SIZE):
+        self.max_entries = max_entries
+        self.batch_size = batch_size
+        self._cache = OrderedDict()
+
+    def run(self, scenario_name, horizon, seed, n_paths, symbols, categories,
+            mean_returns, cov, weights, data_key=None, scenario=None):
+        """Retourne les statistiques de risque du portefeuille sous le scénario"""
+        key = (scenario_name, horizon, seed, n_paths, data_key)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        scenario = scenario or SCENARIOS[scenario_name]
+        drifts = scenario_drifts(scenario, symbols, categories, mean_returns, horizon)
+        factor = _factor(np.asarray(cov, dtype=float)) * scenario['multiplicateur_volatilite']
+        weights = np.asarray(weights, dtype=float)
+        weights = weights / weights.sum()
+
+        per_batch = max(1, min(self.batch_size, MAX_BATCH_ELEMENTS // (horizon * len(drifts))))
+        sizes = [per_batch] * (n_paths // per_batch)
+        if n_paths % per_batch:
+            sizes.append(n_paths % per_batch)
+        seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+        jobs = [(s, size, horizon, drifts, factor, weights) for s, size in zip(seeds, sizes)]
+
+        if n_paths >= POOL_MIN_PATHS and (os.cpu_count() or 1) > 1:
+            batches = list(get_process_pool().map(_simulate_batch, jobs))
+        else:
+            batches = [_simulate_batch(job) for job in jobs]
+
+        returns = np.concatenate([b[0] for b in batches])
+        drawdowns = np.concatenate([b[1] for b in batches])
+        result = summarize(returns, drawdowns)
+        result.update({'scenario': scenario_name, 'horizon': horizon, 'n_paths': n_paths})
+
+        self._cache[key] = result
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return result
+
+
+def summarize(returns, drawdowns, levels=(0.95, 0.99)):
+    """VaR/CVaR (pertes positives) et distribution des drawdowns"""
+    result = {'rendements': returns, 'drawdowns': drawdowns,
+              'rendement_moyen': float(returns.mean()),
+              'drawdown_moyen': float(drawdowns.mean()),
+              'drawdown_p95': float(np.quantile(drawdowns, 0.05))}
+    for level in levels:
+        threshold = np.quantile(returns, 1 - level)
+        pct = int(round(level * 100))
+        result[f'var_{pct}'] = float(-threshold)
+        result[f'cvar_{pct}'] = float(-returns[returns <= threshold].mean())
+    return result
@@ -0,0 +1,333 @@
+"""Bus de diffusion des ticks entre processus : lots binaires compacts sur socket Unix, resynchronisation par instantané"""
+import os
+import selectors
+import socket
+import struct
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+MAGIC = b'TBUS'
+SNAPSHOT, DELTA = 1, 2
+HEADER = struct.Struct('<4sBQI')  # magic, type de message, séquence, nombre de lignes
+LENGTH = struct.Struct('<I')      # Préfixe de longueur de chaque message
+ROW = np.dtype([('timestamp', '<i8'), ('symbole', '<u2'), ('prix', '<f8'),
+                ('change_pct', '<f4'), ('volume_journalier', '<f8')])
+RESYNC = b'R'  # Demande d'instantané envoyée par un abonné
+MAX_PENDING = 8 * 1024 * 1024  # Octets en attente au-delà desquels un abonné lent est resynchronisé
+BACKLOG = 4096
+
+_tick_bus = None
+
+
+def get_tick_bus(path):
+    """Abonné au bus partagé par les sessions du processus, créé au premier usage"""
+    global _tick_bus
+    if _tick_bus is None:
+        _tick_bus = TickBusSubscriber(path)
+    return _tick_bus
+
+
+def encode_message(kind, seq, rows, symbols=None):
+    """Message préfixé par sa longueur : en-tête, table des symboles (instantané) puis lignes brutes"""
+    parts = [HEADER.pack(MAGIC, kind, seq, len(rows))]
+    if kind == SNAPSHOT:
+        names = '\n'.join(symbols).encode()
+        parts += [LENGTH.pack(len(names)), names]
+    parts.append(np.ascontiguousarray(rows, dtype=ROW).tobytes())
+    body = b''.join(parts)
+    return LENGTH.pack(len(body)) + body
+
+
+def decode_message(body):
+    """(type, séquence, lignes, symboles ou None) d'un message sans son préfixe de longueur"""
+    magic, kind, seq, n = HEADER.unpack_from(body)
+    if magic != MAGIC:
+        raise ValueError("Message du bus de ticks invalide")
+    offset = HEADER.size
+    symbols = None
+    if kind == SNAPSHOT:
+        (size,) = LENGTH.unpack_from(body, offset)
+        offset += LENGTH.size
+        symbols = body[offset:offset + size].decode().split('\n')
+        offset += size
+    return kind, seq, np.frombuffer(body, dtype=ROW, count=n, offset=offset), symbols
+
+
+class TickBusPublisher:
+    """Publie les lots de ticks de l'ingestion vers tous les abonnés connectés au socket Unix.
+
+    Chaque lot est encodé une seule fois (30 octets par ligne) puis placé dans la file
+    d'envoi de chaque abonné ; un thread d'entrées-sorties non bloquantes vide ces files.
+    Un abonné qui se connecte, qui détecte un trou de séquence ou dont la file dépasse
+    `max_pending` octets reçoit l'instantané (dernier tick de chaque symbole) suivi des
+    lots suivants : un abonné lent ne ralentit jamais la publication.
+    """
+
+    def __init__(self, path, symbols, max_pending=MAX_PENDING):
+        self.path = path
+        self.symbols = list(symbols)
+        self.max_pending = max_pending
+        self.seq = 0
+        self.resyncs = 0
+        self._index = {s: i for i, s in enumerate(self.symbols)}
+        self._state = np.zeros(len(self.symbols), dtype=ROW)
+        self._known = np.zeros(len(self.symbols), dtype=bool)
+        self._clients = {}  # socket -> [file d'envoi, octets en attente, message de tête entamé]
+        self._lock = threading.Lock()
+        self._selector = selectors.DefaultSelector()
+        if os.path.exists(path):
+            os.remove(path)
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(path)
+        self._server.listen()
+        self._server.setblocking(False)
+        self._selector.register(self._server, selectors.EVENT_READ)
+        self._wake_recv, self._wake_send = socket.socketpair()
+        self._wake_recv.setblocking(False)
+        self._selector.register(self._wake_recv, selectors.EVENT_READ)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def subscribers(self):
+        return len(self._clients)
+
+    def publish(self, ticks):
+        """Publie un lot (timestamp, symbole, prix, change_pct, volume_journalier) ; retourne sa séquence"""
+        rows = np.empty(len(ticks), dtype=ROW)
+        rows['timestamp'] = pd.DatetimeIndex(ticks['timestamp']).as_unit('ns').asi8
+        rows['symbole'] = [self._index[s] for s in ticks['symbole']]
+        for field in ('prix', 'change_pct', 'volume_journalier'):
+            rows[field] = ticks[field].to_numpy()
+        with self._lock:
+            self.seq += 1
+            # Instantané : dernière ligne de chaque symbole (la dernière occurrence l'emporte)
+            self._state[rows['symbole']] = rows
+            self._known[rows['symbole']] = True
+            message = encode_message(DELTA, self.seq, rows)
+            for client, outbox in self._clients.items():
+                if outbox[1] + len(message) > self.max_pending:
+                    self._resync(outbox)
+                else:
+                    outbox[0].append(memoryview(message))
+                    outbox[1] += len(message)
+        self._wake_send.send(b'\0')
+        return self.seq
+
+    def close(self):
+        self._closed = True
+        self._wake_send.send(b'\0')
+        self._thread.join()
+        for client in list(self._clients):
+            client.close()
+        self._server.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _send_snapshot(self, outbox):
+        # File vidée : l'abonné repart de l'instantané courant, après la fin du message entamé
+        message = encode_message(SNAPSHOT, self.seq, self._state[self._known], self.symbols)
+        head = outbox[0][0] if outbox[2] else None
+        outbox[0].clear()
+        outbox[1] = len(message)
+        if head is not None:
+            outbox[0].append(head)
+            outbox[1] += len(head)
+        outbox[0].append(memoryview(message))
+
+    def _resync(self, outbox):
+        self._send_snapshot(outbox)
+        self.resyncs += 1
+
+    def _run(self):
+        while not self._closed:
+            for key, events in self._selector.select(timeout=1.0):
+                sock = key.fileobj
+                if sock is self._server:
+                    self._accept()
+                elif sock is self._wake_recv:
+                    try:
+                        sock.recv(4096)
+                    except BlockingIOError:
+                        pass
+                else:
+                    if events & selectors.EVENT_READ:
+                        self._read(sock)
+                    if events & selectors.EVENT_WRITE and sock in self._clients:
+                        self._flush(sock)
+            # Écriture surveillée seulement pour les abonnés qui ont des messages en attente
+            with self._lock:
+                for client, outbox in self._clients.items():
+                    wanted = selectors.EVENT_READ | (selectors.EVENT_WRITE if outbox[0] else 0)
+                    if self._selector.get_key(client).events != wanted:
+                        self._selector.modify(client, wanted)
+
+    def _accept(self):
+        try:
+            client, _ = self._server.accept()
+        except BlockingIOError:
+            return
+        client.setblocking(False)
+        with self._lock:
+            outbox = [deque(), 0, False]
+            self._send_snapshot(outbox)
+            self._clients[client] = outbox
+        self._selector.register(client, selectors.EVENT_READ | selectors.EVENT_WRITE)
+
+    def _read(self, client):
+        try:
+            data = client.recv(4096)
+        except BlockingIOError:
+            return
+        except ConnectionError:
+            data = b''
+        if not data:
+            self._drop(client)
+        elif RESYNC in data:
+            with self._lock:
+                self._resync(self._clients[client])
+
+    def _flush(self, client):
+        with self._lock:
+            outbox = self._clients[client]
+            try:
+                while outbox[0]:
+                    sent = client.send(outbox[0][0])
+                    outbox[1] -= sent
+                    outbox[2] = sent < len(outbox[0][0])
+                    if outbox[2]:
+                        outbox[0][0] = outbox[0][0][sent:]
+                        break
+                    outbox[0].popleft()
+            except BlockingIOError:
+                pass
+            except (ConnectionError, OSError):
+                outbox = None
+        if outbox is None:
+            self._drop(client)
+
+    def _drop(self, client):
+        with self._lock:
+            self._clients.pop(client, None)
+        try:
+            self._selector.unregister(client)
+        except (KeyError, ValueError):
+            pass
+        client.close()
+
+
+class TickBusSubscriber:
+    """Reçoit les lots du bus dans un thread et les met à disposition des sessions du processus.
+
+    L'abonné garde l'état courant (dernier tick de chaque symbole) et les `backlog`
+    derniers lots avec leur séquence. Une session demande les lots postérieurs à la
+    dernière séquence qu'elle a appliquée ; si elle est trop en retard (ou si le
+    producteur a redémarré), elle reçoit l'état courant à la place. Un trou de séquence
+    côté abonné déclenche une demande d'instantané au producteur.
+    """
+
+    def __init__(self, path, backlog=BACKLOG, reconnect=1.0):
+        self.path = path
+        self.reconnect = reconnect
+        self.symbols = []
+        self.seq = 0
+        self.messages = 0
+        self.resyncs = 0
+        self.invalid = 0  # Messages tronqués ou illisibles : connexion fermée puis reprise
+        self._state = np.zeros(0, dtype=ROW)
+        self._known = np.zeros(0, dtype=bool)
+        self._awaiting_snapshot = False
+        self._log = deque(maxlen=backlog)
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._closed = False
+        self._sock = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def wait(self, timeout=None):
+        """Attend le premier instantané ; retourne False au bout du délai"""
+        return self._ready.wait(timeout)
+
+    def since(self, seq):
+        """Ticks publiés après la séquence `seq` (ou état courant si trop ancienne) et nouvelle séquence"""
+        with self._lock:
+            if seq == self.seq:
+                return self._frame(np.zeros(0, dtype=ROW)), seq
+            if self._log and self._log[0][0] <= seq + 1 <= self.seq:
+                rows = np.concatenate([r for s, r in self._log if s > seq])
+            else:
+                rows = self._state[self._known]
+            return self._frame(rows), self.seq
+
+    def close(self):
+        self._closed = True
+        if self._sock is not None:
+            self._sock.close()
+
+    def _frame(self, rows):
+        symbols = np.asarray(self.symbols, dtype=object)
+        return pd.DataFrame({
+            'timestamp': rows['timestamp'].view('M8[ns]'),
+            'symbole': symbols[rows['symbole']] if len(symbols) else np.zeros(0, dtype=object),
+            'prix': rows['prix'],
+            'change_pct': rows['change_pct'].astype(np.float64),
+            'volume_journalier': rows['volume_journalier'],
+        })
+
+    def _run(self):
+        while not self._closed:
+            try:
+                self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                self._sock.connect(self.path)
+                self._receive(self._sock.makefile('rb'))
+            except OSError:
+                pass
+            except (ValueError, struct.error):
+                # Producteur arrêté au milieu d'un message ou flux désynchronisé : on se reconnecte
+                # et l'instantané envoyé à la connexion remet l'état d'aplomb
+                self.invalid += 1
+            finally:
+                self._sock.close()
+            if not self._closed:
+                time.sleep(self.reconnect)
+
+    def _receive(self, stream):
+        while True:
+            prefix = stream.read(LENGTH.size)
+            if len(prefix) < LENGTH.size:
+                return
+            size = LENGTH.unpack(prefix)[0]
+            body = stream.read(size)
+            if len(body) < size:
+                raise ValueError("Message du bus de ticks tronqué")
+            kind, seq, rows, symbols = decode_message(body)
+            with self._lock:
+                self.messages += 1
+                if kind == SNAPSHOT:
+                    self.symbols = symbols
+                    self._state = np.zeros(len(symbols), dtype=ROW)
+                    self._known = np.zeros(len(symbols), dtype=bool)
+                    self._log.clear()
+                    self._awaiting_snapshot = False
+                    self._apply(seq, rows, log=False)
+                    self._ready.set()
+                elif seq == self.seq + 1 and not self._awaiting_snapshot:
+                    self._apply(seq, rows)
+                elif not self._awaiting_snapshot:
+                    # Lot manquant : on ignore la suite jusqu'au prochain instantané
+                    self._awaiting_snapshot = True
+                    self.resyncs += 1
+                    self._sock.sendall(RESYNC)
+
+    def _apply(self, seq, rows, log=True):
+        self._state[rows['symbole']] = rows
+        self._known[rows['symbole']] = True
+        if log:
+            self._log.append((seq, rows.copy()))
+        self.seq = seq
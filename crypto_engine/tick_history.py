@@ -0,0 +1,80 @@
+"""Historique intraday des ticks de tous les symboles, en mémoire bornée"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from .ring_buffer import RingBuffer
+
+FIELDS = ('prix', 'volume')
+
+
+class TickHistory:
+    """Enregistre prix et volume de chaque symbole à chaque tick dans un seul tampon circulaire.
+
+    Le tampon (ticks x symboles x champs) est préalloué : un enregistrement copie les
+    valeurs dans une ligne de travail puis dans le tampon, sans allocation, et la mémoire
+    reste fixe quelle que soit la durée de fonctionnement. Les lectures renvoient des vues
+    en lecture seule sur les n derniers ticks.
+    """
+
+    def __init__(self, symbols, capacity=4096):
+        self.symbols = list(symbols)
+        self._symbol_index = {s: i for i, s in enumerate(self.symbols)}
+        self._buffer = RingBuffer(capacity, (len(self.symbols), len(FIELDS)))
+        self._row = np.full((len(self.symbols), len(FIELDS)), np.nan)
+        self.version = 0  # Incrémentée à chaque tick enregistré
+
+    def __len__(self):
+        return self._buffer.count
+
+    @property
+    def capacity(self):
+        return self._buffer.capacity
+
+    @property
+    def nbytes(self):
+        """Mémoire occupée par le tampon, fixée à la création"""
+        return self._buffer.nbytes + self._row.nbytes
+
+    def record(self, prices, volumes, timestamp_ns=None):
+        """Enregistre les prix et volumes de tous les symboles (alignés sur `symbols`)"""
+        self._row[:, 0] = prices
+        self._row[:, 1] = volumes
+        self._buffer.append(timestamp_ns or time.time_ns(), self._row)
+        self.version += 1
+
+    def last(self, n=None, symbol=None):
+        """Vues (horodatages, prix, volumes) sur les n derniers ticks, d'un symbole ou de tous"""
+        times, data = self._buffer.last(n)
+        if symbol is None:
+            return times, data[:, :, 0], data[:, :, 1]
+        i = self._symbol_index[symbol]
+        return times, data[:, i, 0], data[:, i, 1]
+
+    def frame(self, symbol, n=None):
+        """Ticks d'un symbole sous forme de DataFrame (date, prix, volume)"""
+        times, prices, volumes = self.last(n, symbol)
+        return pd.DataFrame({'date': pd.to_datetime(times), 'prix': prices, 'volume': volumes})
+
+    def load(self, times, values):
+        """Recharge d'un bloc des ticks déjà alignés (horodatages, ticks x symboles x champs)"""
+        self._buffer.extend(times, values)
+        self.version += len(times)
+
+    def restore(self, ticks):
+        """Recharge des ticks enregistrés, où seules figurent les lignes modifiées à chaque tick"""
+        if ticks.empty:
+            return 0
+        # Seuls les `capacity` derniers ticks tiennent dans le tampon
+        kept = np.sort(ticks['timestamp'].unique())[-self.capacity:]
+        ticks = ticks[ticks['timestamp'] >= kept[0]]
+        wide = ticks.pivot_table(index='timestamp', columns='symbole',
+                                 values=['prix', 'volume_journalier'], aggfunc='last')
+        # Un symbole absent d'un tick garde sa dernière valeur connue (ou sa première, avant)
+        prices = wide['prix'].reindex(columns=self.symbols).ffill().bfill()
+        volumes = wide['volume_journalier'].reindex(columns=self.symbols).ffill().bfill()
+        times = pd.DatetimeIndex(prices.index).as_unit('ns').asi8
+        for t, price_row, volume_row in zip(times, prices.to_numpy(), volumes.to_numpy()):
+            self.record(price_row, volume_row, int(t))
+        return len(times)
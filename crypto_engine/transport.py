@@ -0,0 +1,48 @@
+"""Encodage compact des données des figures Plotly (tableaux typés base64 au lieu de texte JSON)"""
+import numpy as np
+import pandas as pd
+
+ARRAY_ATTRIBUTES = ('x', 'y', 'open', 'high', 'low', 'close')
+
+
+def compact_figure(fig, float_dtype=np.float32):
+    """Remplace les dates par un pas régulier ou des millisecondes epoch, et les flottants par le type donné.
+
+    Plotly sérialise les tableaux NumPy numériques en tableaux typés base64 (dtype + bdata),
+    mais les dates en chaînes ISO de 20 caractères. Des dates régulières deviennent une
+    origine et un pas (x0, dx) ; les autres passent en millisecondes epoch float64, car
+    Plotly.js ne décode pas les entiers 64 bits. Les axes x sont alors déclarés de type
+    date pour garder les mêmes graduations.
+    """
+    has_dates = False
+    for trace in fig.data:
+        for attribute in ARRAY_ATTRIBUTES:
+            values = getattr(trace, attribute, None) if attribute in trace else None
+            if values is None or isinstance(values, (str, dict)) or np.ndim(values) != 1:
+                continue
+            array = np.asarray(values)
+            if np.issubdtype(array.dtype, np.datetime64) or (
+                    array.dtype == object and len(array) and isinstance(array[0], pd.Timestamp)):
+                dates = pd.DatetimeIndex(array)
+                steps = np.diff(dates.as_unit('ms').asi8)
+                if attribute == 'x' and len(steps) and not dates.hasnans and (steps == steps[0]).all() and 'dx' in trace:
+                    # Dates régulières (séries journalières) : origine et pas suffisent
+                    trace.x = None
+                    trace.x0 = dates[0].isoformat()
+                    trace.dx = float(steps[0])
+                else:
+                    epoch = dates.as_unit('ms').asi8.astype(np.float64)
+                    epoch[dates.isna()] = np.nan
+                    trace[attribute] = epoch
+                has_dates = has_dates or attribute == 'x'
+            elif np.issubdtype(array.dtype, np.floating) and array.dtype != float_dtype:
+                # Plotly ignore une affectation égale à la valeur actuelle (float32 exact) : on vide d'abord
+                trace[attribute] = None
+                trace[attribute] = array.astype(float_dtype)
+                if float_dtype == np.float32 and f'{attribute}hoverformat' in trace:
+                    # Évite d'afficher au survol les décimales parasites du float32
+                    trace[f'{attribute}hoverformat'] = '.7~g'
+    if has_dates:
+        fig.update_xaxes(type='date')
+    return fig
+
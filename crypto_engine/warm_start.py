@@ -0,0 +1,155 @@
+"""Instantané binaire de l'état du dashboard, projeté en mémoire au redémarrage pour reprendre à chaud"""
+import atexit
+import json
+import os
+import struct
+import threading
+import time
+import weakref
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+MAGIC = b'CDWS'
+FORMAT_VERSION = 2  # À incrémenter à chaque changement du contenu : un ancien instantané est alors ignoré
+HEADER = struct.Struct('<4sII')  # magic, version du format, taille du manifeste
+ALIGNMENT = 64  # Début de chaque section aligné pour des vues numpy / Arrow sans copie
+SNAPSHOT_INTERVAL = 60.0  # Secondes entre deux écritures périodiques
+
+_writers = {}
+
+
+def get_snapshot_writer(path):
+    """Écrivain de l'instantané d'un fichier, partagé par les sessions du processus ; écrit aussi à l'arrêt"""
+    if path not in _writers:
+        _writers[path] = SnapshotWriter(path)
+        atexit.register(_writers[path].close)
+    return _writers[path]
+
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def write_snapshot(path, sections, meta):
+    """Écrit en-tête, manifeste JSON puis sections (DataFrame en Arrow IPC, tableaux numpy bruts).
+
+    Le fichier est écrit à côté puis renommé : un lecteur voit l'ancien instantané ou le
+    nouveau, jamais un fichier partiel. Retourne la taille écrite.
+    """
+    entries, payloads = {}, []
+    offset = 0
+    for name, value in sections.items():
+        if isinstance(value, pd.DataFrame):
+            table = pa.Table.from_pandas(value)
+            sink = pa.BufferOutputStream()
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            payload = sink.getvalue()
+            entry = {'type': 'arrow'}
+        else:
+            value = np.ascontiguousarray(value)
+            payload = value.reshape(-1).view(np.uint8)
+            entry = {'type': 'array', 'dtype': value.dtype.str, 'shape': list(value.shape)}
+        entry.update(offset=offset, length=len(payload))
+        entries[name] = entry
+        payloads.append(payload)
+        offset = _align(offset + len(payload))
+
+    manifest = json.dumps({'meta': meta, 'sections': entries}).encode()
+    start = _align(HEADER.size + len(manifest))
+    temp = f'{path}.{os.getpid()}.tmp'
+    with open(temp, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(manifest)))
+        f.write(manifest)
+        for entry, payload in zip(entries.values(), payloads):
+            f.seek(start + entry['offset'])
+            f.write(payload)
+        size = f.tell()
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp, path)
+    return size
+
+
+def read_snapshot(path):
+    """(méta, sections) d'un instantané projeté en mémoire, sans copie ; None s'il manque ou est illisible.
+
+    Les sections Arrow sont des tables dont les colonnes numériques pointent dans la
+    projection, les tableaux numpy des vues en lecture seule. Un instantané d'une autre
+    version du format est ignoré.
+    """
+    try:
+        buffer = pa.memory_map(path, 'r').read_buffer()
+        if buffer.size < HEADER.size:
+            return None
+        magic, version, size = HEADER.unpack_from(buffer)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            return None
+        manifest = json.loads(buffer.slice(HEADER.size, size).to_pybytes())
+        start = _align(HEADER.size + size)
+        sections = {}
+        for name, entry in manifest['sections'].items():
+            if start + entry['offset'] + entry['length'] > buffer.size:
+                return None
+            chunk = buffer.slice(start + entry['offset'], entry['length'])
+            if entry['type'] == 'arrow':
+                sections[name] = pa.ipc.open_file(chunk).read_all()
+            else:
+                sections[name] = np.frombuffer(chunk, dtype=entry['dtype']).reshape(entry['shape'])
+        return manifest['meta'], sections
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+class SnapshotWriter:
+    """Écrit l'instantané périodiquement en arrière-plan, puis une dernière fois à l'arrêt du processus.
+
+    `maybe_save(capture)` est appelé à chaque rerun : au plus une fois par `interval`
+    secondes, la fonction de capture est exécutée dans le thread appelant (copie cohérente
+    de l'état mutable) et l'encodage et l'écriture se font dans un thread. La dernière
+    capture fournie est gardée par référence faible pour l'écriture finale de `close()`,
+    sans retenir la session qui l'a fournie.
+    """
+
+    def __init__(self, path, interval=SNAPSHOT_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.saves = 0
+        self.nbytes = 0
+        self.duration = None  # Secondes de la dernière écriture
+        self.last_save = time.monotonic()  # Pas d'écriture dès le démarrage, qui reprend un état récent
+        self._capture = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def maybe_save(self, capture):
+        """Lance une écriture en arrière-plan si la précédente date de plus de `interval` secondes"""
+        self._capture = weakref.WeakMethod(capture) if hasattr(capture, '__self__') else lambda: capture
+        if time.monotonic() - self.last_save < self.interval or (self._thread and self._thread.is_alive()):
+            return False
+        self.last_save = time.monotonic()
+        self._thread = threading.Thread(target=self.save, args=capture(), daemon=True)
+        self._thread.start()
+        return True
+
+    def save(self, sections, meta):
+        """Écrit l'instantané (un seul écrivain à la fois)"""
+        with self._lock:
+            start = time.perf_counter()
+            self.nbytes = write_snapshot(self.path, sections, meta)
+            self.duration = time.perf_counter() - start
+            self.saves += 1
+
+    def stats(self):
+        """Écritures effectuées, taille et durée de la dernière"""
+        return {'ecritures': self.saves, 'octets': self.nbytes, 'duree_s': self.duration}
+
+    def close(self):
+        """Attend l'écriture en cours puis écrit l'état de la dernière capture"""
+        if self._thread is not None:
+            self._thread.join()
+        capture = self._capture() if self._capture is not None else None
+        if capture is not None:
+            self.save(*capture())